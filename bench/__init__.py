@@ -0,0 +1,8 @@
+"""Performance benchmarks for the static site generator.
+Run them from the repository root, e.g. `python3 -m bench.inline`."""
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
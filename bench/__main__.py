@@ -0,0 +1,45 @@
+"""Run the benchmark suite and write machine-readable results.
+
+    python3 -m bench --output results.json
+    python3 -m bench --output new.json --compare results.json
+
+With --compare, exits with status 1 if any benchmark got slower than the threshold allows."""
+import argparse
+import sys
+
+from bench import e2e, micro
+from bench.results import compare, load_results, write_results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before reporting a regression")
+    parser.add_argument("--pages", type=int, default=200, help="pages in the end-to-end corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for the end-to-end build")
+    parser.add_argument("--skip-e2e", action="store_true")
+    args = parser.parse_args()
+
+    timings = micro.run(args.seed, args.repeat)
+    if not args.skip_e2e:
+        timings.update(e2e.run(args.pages, args.seed, max(1, args.repeat // 2), args.jobs))
+    for name, timing in sorted(timings.items()):
+        print(f"{name:<44} {timing.best * 1000:>10.3f} ms (median {timing.median * 1000:.3f} ms)")
+
+    parameters = {"pages": args.pages, "seed": args.seed, "repeat": args.repeat, "jobs": args.jobs}
+    write_results(args.output, timings, parameters)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), timings, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Deterministic synthetic markdown corpus.
+`python3 -m bench.corpus OUT_DIR --pages 1000` writes content/, static/ and template.html under OUT_DIR."""
+import argparse
+from dataclasses import dataclass, field
+import os
+import random
+
+WORDS = (
+    "elf", "ring", "shadow", "mountain", "river", "council", "sword", "light", "tower", "road",
+    "forest", "king", "song", "star", "stone", "gate", "hobbit", "wizard", "ancient", "golden",
+    "the", "of", "and", "a", "in", "to", "with", "beyond", "under", "across",
+)
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+@dataclass(frozen=True)
+class CorpusMix:
+    """Relative weights of the block kinds in a page, and how inline-heavy the text is."""
+    blocks: dict[str, int] = field(default_factory=lambda: {
+        "heading": 2,
+        "paragraph": 8,
+        "unordered_list": 2,
+        "ordered_list": 1,
+        "quote": 1,
+        "code": 1,
+    })
+    blocks_per_page: int = 40
+    words_per_line: int = 24
+    links_per_line: float = 0.5
+    images_per_line: float = 0.1
+    formatting_per_line: float = 1.0
+
+
+def sentence(rnd: random.Random, mix: CorpusMix) -> str:
+    words = [rnd.choice(WORDS) for _ in range(mix.words_per_line)]
+    inserts: list[str] = []
+    for kind, rate in (("link", mix.links_per_line), ("image", mix.images_per_line), ("format", mix.formatting_per_line)):
+        count = int(rate) + (rnd.random() < rate - int(rate))
+        for _ in range(count):
+            word = rnd.choice(WORDS)
+            if kind == "link":
+                inserts.append(f"[{word} {rnd.choice(WORDS)}](/{word}/{rnd.randrange(1000)}/)")
+            elif kind == "image":
+                inserts.append(f"![{word}](/images/{word}.png)")
+            else:
+                inserts.append(rnd.choice((f"**{word}**", f"_{word}_", f"`{word}`")))
+    for insert in inserts:
+        words.insert(rnd.randrange(len(words) + 1), insert)
+    return " ".join(words)
+
+
+def block(rnd: random.Random, kind: str, mix: CorpusMix) -> str:
+    match kind:
+        case "heading":
+            return f"{'#' * rnd.randint(2, 4)} {' '.join(rnd.choices(WORDS, k=rnd.randint(2, 8)))}"
+        case "paragraph":
+            return "\n".join(sentence(rnd, mix) for _ in range(rnd.randint(1, 4)))
+        case "unordered_list":
+            return "\n".join(f"- {sentence(rnd, mix)}" for _ in range(rnd.randint(2, 6)))
+        case "ordered_list":
+            return "\n".join(f"{idx}. {sentence(rnd, mix)}" for idx in range(1, rnd.randint(2, 9)))
+        case "quote":
+            return "\n".join(f"> {sentence(rnd, mix)}" for _ in range(rnd.randint(1, 3)))
+        case "code":
+            lines = (f"    {' '.join(rnd.choices(WORDS, k=6))}" for _ in range(rnd.randint(2, 8)))
+            return "```\n" + "\n".join(lines) + "\n```"
+        case _:
+            raise ValueError(f"Unknown block kind: {kind}")
+
+
+def generate_markdown(rnd: random.Random, mix: CorpusMix = CorpusMix()) -> str:
+    kinds = list(mix.blocks)
+    weights = [mix.blocks[kind] for kind in kinds]
+    blocks = [f"# {' '.join(rnd.choices(WORDS, k=5))}"]
+    blocks.extend(block(rnd, kind, mix) for kind in rnd.choices(kinds, weights, k=mix.blocks_per_page))
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(
+        root: str,
+        pages: int,
+        seed: int = 0,
+        mix: CorpusMix = CorpusMix(),
+        static_files: int = 20,
+        static_file_size: int = 64 * 1024,
+    ) -> None:
+    """Write pages markdown files (in nested directories), a template and static files below root.
+    The same arguments always produce the same bytes."""
+    rnd = random.Random(seed)
+    for idx in range(pages):
+        page_dir = os.path.join(root, "content", f"section{idx % 10}", f"page{idx}")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.md"), 'w') as f:
+            f.write(generate_markdown(rnd, mix))
+
+    images_dir = os.path.join(root, "static", "images")
+    os.makedirs(images_dir, exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), 'w') as f:
+        f.write("body {\n  margin: 0 auto;\n  max-width: 40em;\n}\n" * 50)
+    for idx in range(static_files):
+        with open(os.path.join(images_dir, f"image{idx}.png"), 'wb') as f:
+            f.write(rnd.randbytes(static_file_size))
+
+    with open(os.path.join(root, "template.html"), 'w') as f:
+        f.write(TEMPLATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_corpus(args.root, args.pages, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""End-to-end benchmarks: building a synthetic site from scratch and rebuilding it unchanged."""
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import shutil
+import tempfile
+
+from bench import SRC_DIR  # noqa: F401  (puts src on sys.path)
+from bench.corpus import generate_corpus
+from bench.results import Timing, measure
+from file_operations import copy_dir, sync_dir
+from generator import generate_pages_recursive
+from manifest import BuildManifest
+
+
+def run(pages: int = 200, seed: int = 0, repeat: int = 3, jobs: int = 1) -> dict[str, Timing]:
+    with tempfile.TemporaryDirectory() as root, redirect_stdout(StringIO()):
+        generate_corpus(root, pages, seed)
+        content = os.path.join(root, "content")
+        static = os.path.join(root, "static")
+        template = os.path.join(root, "template.html")
+        output = os.path.join(root, "docs")
+        build_dir = os.path.join(root, ".build")
+
+        def full_build():
+            shutil.rmtree(output, ignore_errors=True)
+            generate_pages_recursive(content, template, output, '/', jobs=jobs)
+
+        def incremental_build():
+            manifest = BuildManifest.load(os.path.join(build_dir, "manifest.json"))
+            generate_pages_recursive(content, template, output, '/', manifest, jobs)
+
+        def static_sync():
+            sync_dir(static, output, os.path.join(build_dir, "static.json"))
+
+        timings = {
+            f"e2e.generate_pages_recursive[{pages} pages]": measure(full_build, repeat),
+            "e2e.copy_dir[static]": measure(lambda: copy_dir(static, output), repeat),
+        }
+        incremental_build()
+        static_sync()
+        timings[f"e2e.incremental_noop[{pages} pages]"] = measure(incremental_build, repeat)
+        timings["e2e.sync_dir_noop[static]"] = measure(static_sync, repeat)
+        return timings
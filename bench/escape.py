@@ -0,0 +1,50 @@
+"""Time building and rendering leaf nodes with their text escaped and as they are, on text without
+characters to escape and on text full of them, next to html.escape."""
+import argparse
+import html
+import timeit
+
+from bench import SRC_DIR  # noqa: F401  (puts src on sys.path)
+from htmlnode import escape
+from leafnode import LeafNode
+
+
+def sample_text(words: int, special: bool) -> str:
+    """words words of prose; if special, every fourth is a comparison or an ampersand."""
+    parts = []
+    for idx in range(words):
+        if special and idx % 4 == 3:
+            parts.append(("a < b", "x > y", "R&D")[idx % 3])
+        else:
+            parts.append(f"word{idx}")
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'text':>8} {'words':>6} {'raw ns':>8} {'escaped ns':>11} {'overhead':>9} {'escape ns':>10} {'html.escape ns':>15}")
+    for special in (False, True):
+        for words in args.words:
+            text = sample_text(words, special)
+            number = max(1, 200_000 // words)
+
+            def best(fn) -> float:
+                return min(timeit.repeat(fn, number=number, repeat=args.repeat)) / number * 1e9
+
+            raw = best(lambda: LeafNode("p", text, escaped=True).to_html())
+            escaped = best(lambda: LeafNode("p", text).to_html())
+            own = best(lambda: escape(text))
+            stdlib = best(lambda: html.escape(text, quote=False))
+            kind = "special" if special else "plain"
+            print(
+                f"{kind:>8} {words:>6} {raw:>8.0f} {escaped:>11.0f} {(escaped - raw) / raw:>8.1%} "
+                f"{own:>10.0f} {stdlib:>15.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
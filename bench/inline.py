@@ -0,0 +1,51 @@
+"""Compare the single-pass inline tokenizer with splitting on each delimiter, then links, then images."""
+import argparse
+import timeit
+
+from bench import SRC_DIR  # noqa: F401  (puts src on sys.path)
+from splitting import split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes
+from textnode import DELIMITERS, TextNode, TextType
+
+
+def text_to_textnodes_multipass(text: str) -> list[TextNode]:
+    """The previous implementation of text_to_textnodes."""
+    text_nodes = [TextNode(text, TextType.TEXT)]
+    for text_type, delimiter in DELIMITERS.items():
+        text_nodes = split_nodes_delimiter(text_nodes, delimiter, text_type)
+    return split_nodes_image(split_nodes_link(text_nodes))
+
+
+def link_heavy_paragraph(links: int, formatted: bool) -> str:
+    """A paragraph with the given number of links and images.
+    Unless formatted, there is no bold or italic text splitting it into short pieces."""
+    parts = []
+    for idx in range(links):
+        if idx % 5 == 4:
+            parts.append(f"see ![figure {idx}](/images/{idx}.png)")
+        else:
+            parts.append(f"read [page {idx}](/pages/{idx}/)")
+        if formatted:
+            parts.append(f"or **bold {idx}** and _this_")
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, nargs='+', default=[10, 100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'paragraph':>10} {'links':>6} {'multi-pass ms':>14} {'single-pass ms':>15} {'speedup':>8}")
+    for formatted in (False, True):
+        for links in args.links:
+            text = link_heavy_paragraph(links, formatted)
+            assert text_to_textnodes(text) == text_to_textnodes_multipass(text)
+            number = max(1, 2000 // links)
+            old = min(timeit.repeat(lambda: text_to_textnodes_multipass(text), number=number, repeat=args.repeat)) / number
+            new = min(timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=args.repeat)) / number
+            kind = "formatted" if formatted else "links"
+            print(f"{kind:>10} {links:>6} {old * 1000:>14.3f} {new * 1000:>15.3f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
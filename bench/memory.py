@@ -0,0 +1,90 @@
+"""Bytes per node for the slotted node classes, compared with the equivalent __dict__-based dataclasses."""
+import argparse
+from dataclasses import dataclass
+import gc
+import tracemalloc
+from typing import Callable, Optional, Sequence
+
+from bench import SRC_DIR  # noqa: F401  (puts src on sys.path)
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import Tags, TextNode, TextType, text_node_to_html_node
+
+
+@dataclass
+class DictTextNode:
+    text: str
+    text_type: TextType
+    url: Optional[str] = None
+
+
+@dataclass
+class DictHTMLNode:
+    tag: Optional[str] = None
+    value: Optional[str] = None
+    children: Optional[Sequence["DictHTMLNode"]] = None
+    props: Optional[dict[str, str]] = None
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag: str, value: str, props: Optional[dict[str, str]] = None):
+        super().__init__(tag=tag, children=None, value=value, props=props)
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag: str, children: Sequence[DictHTMLNode], props: Optional[dict[str, str]] = None):
+        super().__init__(tag=tag, children=children, value=None, props=props)
+
+
+def bytes_per_object(factory: Callable[[int], object], count: int) -> float:
+    """Allocated bytes per object, excluding the list holding them."""
+    gc.collect()
+    tracemalloc.start()
+    objects = [None] * count
+    baseline = tracemalloc.get_traced_memory()[0]
+    for idx in range(count):
+        objects[idx] = factory(idx)
+    allocated = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del objects
+    return allocated / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    text = "shared text"
+    text_node = TextNode(text, TextType.BOLD)
+    leaf = text_node_to_html_node(text_node)
+    dict_leaf = DictLeafNode("b", text)
+    cases = {
+        "TextNode": (
+            lambda _: DictTextNode(text, TextType.BOLD),
+            lambda _: TextNode(text, TextType.BOLD),
+        ),
+        "LeafNode (bold)": (
+            # the tag used to be converted from the enum member for every leaf
+            lambda _: DictLeafNode(str(Tags.BOLD), text),
+            lambda _: text_node_to_html_node(text_node),
+        ),
+        "LeafNode (text)": (
+            lambda _: DictLeafNode('', text),
+            lambda _: LeafNode.text_only(text),
+        ),
+        "ParentNode": (
+            lambda _: DictParentNode("p", [dict_leaf]),
+            lambda _: ParentNode("p", [leaf]),
+        ),
+    }
+
+    print(f"{'node':<16} {'dict bytes':>11} {'slots bytes':>12} {'saved':>7}")
+    for name, (before, after) in cases.items():
+        old = bytes_per_object(before, args.count)
+        new = bytes_per_object(after, args.count)
+        print(f"{name:<16} {old:>11.1f} {new:>12.1f} {1 - new / old:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
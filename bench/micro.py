@@ -0,0 +1,37 @@
+"""Microbenchmarks of the markdown pipeline stages on synthetic pages."""
+import random
+
+from bench import SRC_DIR  # noqa: F401  (puts src on sys.path)
+from bench.corpus import CorpusMix, generate_markdown, sentence
+from bench.results import Timing, measure
+from generator import extract_title
+from markdown_blocks import INLINE_CACHE_SIZE, configure_inline_cache, markdown_to_html_node
+from splitting import text_to_textnodes
+
+
+def run(seed: int = 0, repeat: int = 5) -> dict[str, Timing]:
+    rnd = random.Random(seed)
+    mix = CorpusMix()
+    lines = [sentence(rnd, mix) for _ in range(200)]
+    markdown = generate_markdown(rnd, mix)
+    tree = markdown_to_html_node(markdown)
+
+    def tokenize_lines():
+        for line in lines:
+            text_to_textnodes(line)
+
+    configure_inline_cache(0)
+    timings = {
+        "micro.text_to_textnodes[200 lines]": measure(tokenize_lines, repeat, number=5),
+        "micro.markdown_to_html_node[page]": measure(lambda: markdown_to_html_node(markdown), repeat, number=10),
+    }
+    # the same page again and again: every inline text is a memo hit after the first round
+    configure_inline_cache(INLINE_CACHE_SIZE)
+    timings["micro.markdown_to_html_node[page, memoized]"] = measure(
+        lambda: markdown_to_html_node(markdown), repeat, number=10,
+    )
+    timings.update({
+        "micro.to_html[page]": measure(tree.to_html, repeat, number=20),
+        "micro.extract_title[page]": measure(lambda: extract_title(markdown), repeat, number=200),
+    })
+    return timings
@@ -0,0 +1,67 @@
+"""Timing and the machine-readable result files written by `python3 -m bench`."""
+from dataclasses import asdict, dataclass
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Timing:
+    """Seconds per call: the best and median of repeat rounds of number calls each."""
+    best: float
+    median: float
+    repeat: int
+    number: int
+
+
+def measure(func: Callable[[], object], repeat: int = 5, number: int = 1) -> Timing:
+    times = [t / number for t in timeit.repeat(func, repeat=repeat, number=number)]
+    return Timing(min(times), statistics.median(times), repeat, number)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, timings: dict[str, Timing], parameters: dict[str, object]) -> None:
+    data = {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "parameters": parameters,
+        },
+        "results": {name: asdict(timing) for name, timing in sorted(timings.items())},
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def load_results(path: str) -> dict[str, Timing]:
+    with open(path) as f:
+        return {name: Timing(**timing) for name, timing in json.load(f)["results"].items()}
+
+
+def compare(baseline: dict[str, Timing], current: dict[str, Timing], threshold: float) -> list[str]:
+    """Print current against baseline; returns the benchmarks that got slower by more than threshold."""
+    regressions: list[str] = []
+    print(f"{'benchmark':<44} {'baseline ms':>12} {'current ms':>11} {'ratio':>7}")
+    for name in sorted(baseline.keys() & current.keys()):
+        ratio = current[name].best / baseline[name].best
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<44} {baseline[name].best * 1000:>12.3f} {current[name].best * 1000:>11.3f} {ratio:>6.2f}x{flag}")
+    return regressions
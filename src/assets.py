@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Iterable, Mapping, Optional
+
+from file_operations import Change, ChangeReport, FileTransform, hash_file, list_files, remove_empty_parents, write_if_changed
+from images import ImageSizeCache, image_sizes
+
+
+FINGERPRINT_EXTS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".woff", ".woff2")
+FINGERPRINT_LENGTH = 10
+DIGEST_CACHE_FORMAT = 1
+
+
+class StaticAssets:
+    """What pages need to know about the static files they reference: the content-hashed copies of
+    fingerprinted assets by root-relative URL (e.g. "/index.css" -> "/index.0123456789.css"), and the
+    width and height of images. Compares and hashes by a digest of both, so it is cheap to use as part
+    of a cache key."""
+
+    __slots__ = ("urls", "image_sizes", "digest")
+
+    def __init__(
+            self,
+            urls: Optional[Mapping[str, str]] = None,
+            image_sizes: Optional[Mapping[str, tuple[int, int]]] = None,
+        ):
+        self.urls = dict(urls or {})
+        self.image_sizes = dict(image_sizes or {})
+        data = [sorted(self.urls.items()), sorted(self.image_sizes.items())]
+        self.digest = hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, StaticAssets) and self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f"StaticAssets({self.urls!r}, {self.image_sizes!r})"
+
+    def state_of(self, url: str) -> str:
+        """What a page referencing the root-relative path url gets to see of it: the hashed name and the
+        image size, or "" for anything that isn't a known asset."""
+        parts: list[str] = []
+        if url in self.urls:
+            parts.append(self.urls[url])
+        if url in self.image_sizes:
+            width, height = self.image_sizes[url]
+            parts.append(f"{width}x{height}")
+        return " ".join(parts)
+
+
+class DigestCache:
+    """Persistent content hashes of the files fingerprint_urls names, so a file whose size and mtime are
+    unchanged isn't hashed again. A hash is only reused for the transform (if any) it was made with.
+    A read-only cache is loaded from path but never saved to it."""
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        # path -> (mtime_ns, size, transform name or "", hash)
+        self.files: dict[str, tuple[int, int, str, str]] = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data["format"] == DIGEST_CACHE_FORMAT:
+                self.files = {file_path: tuple(entry) for file_path, entry in data["files"].items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable digest cache {path}: {e}")
+
+    def hash_of(self, path: str, transform: Optional[FileTransform] = None) -> str:
+        """hash_file of path, or transform's hash of it."""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size, "" if transform is None else transform.name)
+        known = self.files.get(path)
+        if known is not None and known[:3] == key:
+            return known[3]
+        file_hash = hash_file(path) if transform is None else transform.hash(path)
+        self.files[path] = (*key, file_hash)
+        return file_hash
+
+    def save(self, live_paths: Iterable[str]) -> None:
+        """Write the cache, keeping only the entries of live_paths."""
+        if self.read_only:
+            return
+        data = {
+            "format": DIGEST_CACHE_FORMAT,
+            "files": {path: self.files[path] for path in sorted(live_paths) if path in self.files},
+        }
+        write_if_changed(self.path, json.dumps(data, indent=1).encode())
+
+
+def fingerprinted_path(rel_path: str, file_hash: str) -> str:
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{file_hash[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def fingerprint_urls(
+        root: str,
+        rel_paths: Iterable[str],
+        transform: Optional[FileTransform] = None,
+        cache: Optional[DigestCache] = None,
+    ) -> dict[str, str]:
+    """The root-relative URLs of the fingerprintable files among rel_paths (relative to root)
+    mapped to those of their content-hashed names. Files transform applies to are hashed as the
+    sync would write them, so the static sources give the names the synced output gets.
+    With a cache, only new and changed files are hashed."""
+    urls: dict[str, str] = {}
+    paths: list[str] = []
+    for rel_path in rel_paths:
+        if os.path.splitext(rel_path)[1].lower() not in FINGERPRINT_EXTS:
+            continue
+        path = os.path.join(root, rel_path)
+        paths.append(path)
+        file_transform = transform if transform is not None and transform.applies_to(rel_path) else None
+        if cache is not None:
+            file_hash = cache.hash_of(path, file_transform)
+        elif file_transform is not None:
+            file_hash = file_transform.hash(path)
+        else:
+            file_hash = hash_file(path)
+        hashed_rel_path = fingerprinted_path(rel_path, file_hash)
+        urls["/" + rel_path.replace(os.sep, "/")] = "/" + hashed_rel_path.replace(os.sep, "/")
+    if cache is not None:
+        cache.save(paths)
+    return urls
+
+
+def fingerprint_assets(
+        output_dir: str,
+        urls: Mapping[str, str],
+        record_path: str,
+        changes: Optional[ChangeReport] = None,
+    ) -> dict[str, str]:
+    """Give every file in output_dir that urls (from fingerprint_urls) maps a content-hashed sibling,
+    which can be served with immutable cache headers. The original names stay, so references the
+    generator can't rewrite (e.g. url() in stylesheets) keep working.
+    Hashed copies made by an earlier build for content that changed since are deleted.
+    Returns urls."""
+    try:
+        with open(record_path) as f:
+            previous = set(json.load(f))
+    except (FileNotFoundError, ValueError):
+        previous = set()
+
+    for url, hashed_url in urls.items():
+        hashed_path = os.path.join(output_dir, hashed_url[1:])
+        if not os.path.exists(hashed_path):
+            link_or_copy(os.path.join(output_dir, url[1:]), hashed_path)
+            if changes is not None:
+                changes.record(hashed_path, Change.ADDED)
+
+    current = {hashed_rel_path.lstrip("/") for hashed_rel_path in urls.values()}
+    for rel_path in sorted(previous - current):
+        path = os.path.join(output_dir, rel_path)
+        if os.path.isfile(path):
+            print(f"Removing outdated fingerprinted asset {path}")
+            os.remove(path)
+            remove_empty_parents(path, output_dir)
+            if changes is not None:
+                changes.record(path, Change.REMOVED)
+    write_if_changed(record_path, json.dumps(sorted(current), indent=1).encode())
+    return dict(urls)
+
+
+def collect_static_assets(
+        static_dir: str,
+        output_dir: str,
+        image_cache: ImageSizeCache,
+        fingerprint_record_path: Optional[str] = None,
+        changes: Optional[ChangeReport] = None,
+        digest_cache: Optional[DigestCache] = None,
+        transform: Optional[FileTransform] = None,
+    ) -> StaticAssets:
+    """Everything pages need to know about the static files once they are synced to output_dir
+    (with transform): the sizes of the images and, given a record path, the fingerprinted asset URLs.
+    The synced files are named after the static sources they were written from, so with digest_cache
+    a source isn't hashed again until it changes."""
+    static_files = list_files(static_dir)
+    urls: dict[str, str] = {}
+    if fingerprint_record_path is not None:
+        urls = fingerprint_assets(
+            output_dir, fingerprint_urls(static_dir, static_files, transform, digest_cache),
+            fingerprint_record_path, changes,
+        )
+    return StaticAssets(urls, image_sizes(static_dir, static_files, image_cache))
+
+
+def link_or_copy(src_path: str, dest_path: str) -> None:
+    """Hard link where the file system allows it: a hashed copy never changes, so sharing the bytes is safe.
+    Files are replaced by rename, never rewritten in place, so the link keeps the old content."""
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        shutil.copy2(src_path, dest_path)
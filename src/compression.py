@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import os
+import struct
+from typing import Optional
+import zlib
+
+from file_operations import Change, ChangeReport, list_files, write_if_changed
+
+
+COMPRESSIBLE_EXTS = (".html", ".css", ".js")
+# below this, the gzip header and the extra request negotiation outweigh the savings
+MIN_COMPRESS_BYTES = 1024
+GZIP_EXT = ".gz"
+# wbits for zlib with a gzip header and trailer; the header carries no timestamp, so output is reproducible
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# the last 8 bytes of a gzip stream: CRC-32 and length (mod 2**32) of the uncompressed data
+GZIP_TRAILER_SIZE = 8
+
+
+@dataclass
+class CompressStats:
+    compressed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.compressed} compressed, {self.unchanged} unchanged, {self.removed} removed"
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def should_compress(path: str) -> bool:
+    return (
+        os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTS
+        and os.path.getsize(path) >= MIN_COMPRESS_BYTES
+    )
+
+
+def gzip_trailer(data: bytes) -> bytes:
+    return struct.pack("<II", zlib.crc32(data), len(data) & 0xFFFFFFFF)
+
+
+def precompress_file(path: str) -> tuple[bool, Optional[Change]]:
+    """Write path.gz unless it was made from the current bytes of path, which the checksum and length
+    in its gzip trailer tell without decompressing it; mtimes don't, as synced files keep their source's.
+    Returns whether it compressed, and how the .gz changed."""
+    gz_path = path + GZIP_EXT
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        with open(gz_path, 'rb') as gz:
+            gz.seek(-GZIP_TRAILER_SIZE, os.SEEK_END)
+            if gz.read() == gzip_trailer(data):
+                return False, None
+    except OSError:
+        # missing, or too short to be a gzip file
+        pass
+    return True, write_if_changed(gz_path, gzip_bytes(data))
+
+
+def precompress_dir(root: str, jobs: int = 1, changes: Optional[ChangeReport] = None) -> CompressStats:
+    """Keep a maximally compressed .gz sibling next to every large enough HTML, CSS and JS file below root,
+    for servers that send precompressed files as they are. zlib releases the GIL, so jobs threads
+    compress in parallel. Siblings whose source is gone or no longer qualifies are deleted."""
+    stats = CompressStats()
+    files = [os.path.join(root, rel_path) for rel_path in list_files(root)]
+    sources = [path for path in files if should_compress(path)]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for path, (compressed, change) in zip(sources, executor.map(precompress_file, sources)):
+            if compressed:
+                stats.compressed += 1
+            else:
+                stats.unchanged += 1
+            if change is not None and changes is not None:
+                changes.record(path + GZIP_EXT, change)
+
+    wanted = {path + GZIP_EXT for path in sources}
+    stats.removed = _remove_precompressed(files, wanted, changes)
+    return stats
+
+
+def remove_precompressed(root: str, changes: Optional[ChangeReport] = None) -> int:
+    """Delete the .gz siblings an earlier precompress_dir left below root, so none outlive their source."""
+    return _remove_precompressed([os.path.join(root, rel_path) for rel_path in list_files(root)], set(), changes)
+
+
+def _remove_precompressed(files: list[str], keep: set[str], changes: Optional[ChangeReport]) -> int:
+    removed = 0
+    for path in files:
+        if not path.endswith(GZIP_EXT) or path in keep:
+            continue
+        if os.path.splitext(path.removesuffix(GZIP_EXT))[1].lower() not in COMPRESSIBLE_EXTS:
+            # not one of ours, e.g. a downloadable archive
+            continue
+        os.remove(path)
+        removed += 1
+        if changes is not None:
+            changes.record(path, Change.REMOVED)
+    return removed
@@ -0,0 +1,144 @@
+import json
+import os
+from typing import Iterable, Optional
+
+from assets import StaticAssets
+from file_operations import is_same_file
+from generator import discover_pages, page_record, template_inputs
+from manifest import BuildManifest, PageRecord, generator_version
+
+
+class DependencyGraph:
+    """Which inputs every output was built from, and which outputs every input went into.
+    Input paths are normalized, so "./static/a.css" and "static/a.css" are the same input;
+    outputs are kept as spelled, like the manifest's keys."""
+
+    def __init__(self):
+        self.inputs: dict[str, set[str]] = {}
+        self.outputs: dict[str, set[str]] = {}
+
+    @classmethod
+    def from_build(
+            cls,
+            manifest: BuildManifest,
+            template_path: str,
+            dir_path_static: str,
+            dir_path_output: str,
+            static_files: Iterable[str],
+        ) -> "DependencyGraph":
+        """The graph of the last build: pages from the manifest, static outputs from the synced files."""
+        graph = cls()
+        for dest_path, record in manifest.pages.items():
+            graph.add(dest_path, page_inputs(record, template_path, dir_path_static))
+        for rel_path in static_files:
+            graph.add(os.path.join(dir_path_output, rel_path), [os.path.join(dir_path_static, rel_path)])
+        return graph
+
+    def add(self, output: str, inputs: Iterable[str]) -> None:
+        """Record what output is built from, replacing what it was built from before."""
+        self.remove(output)
+        self.inputs[output] = {os.path.normpath(path) for path in inputs}
+        for path in self.inputs[output]:
+            self.outputs.setdefault(path, set()).add(output)
+
+    def remove(self, output: str) -> None:
+        for path in self.inputs.pop(output, ()):
+            outputs = self.outputs[path]
+            outputs.discard(output)
+            if not outputs:
+                del self.outputs[path]
+
+    def affected(self, changed: Iterable[str]) -> set[str]:
+        """The outputs built from any of the changed paths, found without looking at the others."""
+        outputs: set[str] = set()
+        for path in changed:
+            outputs.update(self.outputs.get(os.path.normpath(path), ()))
+        return outputs
+
+
+def page_inputs(record: PageRecord, template_path: str, dir_path_static: str) -> list[str]:
+    """A page's inputs: its markdown, the template and the static files it references."""
+    inputs = [record.source, template_path]
+    inputs.extend(os.path.join(dir_path_static, url[1:]) for url in record.assets)
+    return inputs
+
+
+def load_static_files(static_record_path: str) -> list[str]:
+    """The files the last build synced from the static directory, relative to it."""
+    try:
+        with open(static_record_path) as f:
+            return list(json.load(f))
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def explain(
+        output_path: str,
+        dir_path_content: str,
+        dir_path_static: str,
+        template_path: str,
+        dir_path_output: str,
+        basepath: str,
+        manifest: BuildManifest,
+        assets: Optional[StaticAssets] = None,
+        minify: bool = False,
+    ) -> list[str]:
+    """Describe what output_path is built from and why the next build would rebuild it."""
+    output_path = os.path.normpath(output_path)
+    for from_path, dest_path in discover_pages(dir_path_content, dir_path_output):
+        if os.path.normpath(dest_path) == output_path:
+            template_hash, template_urls = template_inputs(template_path, minify)
+            current = page_record(from_path, template_hash, template_urls, basepath, assets)
+            reasons = page_staleness(dest_path, manifest, current)
+            inputs = page_inputs(current, template_path, dir_path_static)
+            # links to other pages are recorded as well, in case a static file appears under their path
+            return describe(output_path, [path for path in inputs if os.path.isfile(path)], reasons)
+
+    rel_path = os.path.relpath(output_path, dir_path_output)
+    src_path = os.path.join(dir_path_static, rel_path)
+    if not rel_path.startswith(os.pardir) and os.path.isfile(src_path):
+        reasons: list[str] = []
+        if not os.path.isfile(output_path):
+            reasons.append("the output file is missing")
+        elif not is_same_file(src_path, output_path):
+            reasons.append(f"it differs from {src_path}")
+        return describe(output_path, [src_path], reasons)
+    return [f"{output_path} is not an output of {dir_path_content} or {dir_path_static}."]
+
+
+def page_staleness(dest_path: str, manifest: BuildManifest, current: PageRecord) -> list[str]:
+    """Why BuildManifest.is_fresh rejects current for dest_path, one reason per differing input."""
+    recorded = manifest.pages.get(dest_path)
+    if recorded is None:
+        return ["it isn't in the build manifest"]
+    reasons: list[str] = []
+    if manifest.version != generator_version():
+        reasons.append("the generator's code changed")
+    if not os.path.isfile(dest_path):
+        reasons.append("the output file is missing")
+    if recorded.source != current.source or recorded.source_hash != current.source_hash:
+        reasons.append(f"{current.source} changed")
+    if recorded.template_hash != current.template_hash:
+        reasons.append("the template changed")
+    if recorded.basepath != current.basepath:
+        reasons.append(f"the basepath changed from {recorded.basepath} to {current.basepath}")
+    for url in sorted(recorded.assets.keys() | current.assets.keys()):
+        before, after = recorded.assets.get(url), current.assets.get(url)
+        if before is None:
+            reasons.append(f"it now references {url}")
+        elif after is None:
+            reasons.append(f"it no longer references {url}")
+        elif before != after:
+            reasons.append(f"{url} changed from {before or 'not an asset'} to {after or 'not an asset'}")
+    return reasons
+
+
+def describe(output_path: str, inputs: Iterable[str], reasons: list[str]) -> list[str]:
+    lines = [f"{output_path} is built from:"]
+    lines.extend(f"  {os.path.normpath(path)}" for path in inputs)
+    if reasons:
+        lines.append("It is stale because:")
+        lines.extend(f"  {reason}" for reason in reasons)
+    else:
+        lines.append("It is up to date.")
+    return lines
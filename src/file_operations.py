@@ -1,5 +1,55 @@
+from dataclasses import dataclass
+from enum import StrEnum
+import hashlib
+import json
 import os
 import shutil
+from types import TracebackType
+from typing import BinaryIO, Callable, Iterator, Optional, Protocol, Union
+
+
+HASH_CHUNK_SIZE = 1 << 16
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def walk_tree(root: str) -> Iterator[tuple[str, os.DirEntry]]:
+    """Yield (relative path, entry) for every file and directory below root, depth first in sorted order,
+    each directory before its contents. Iterative, so only the listings of the directories on the current
+    path are held; the entries carry their type and cache their stat, so callers needn't stat again.
+    Subdirectories removed while being walked are skipped."""
+    with os.scandir(root) as it:
+        listing = sorted(it, key=lambda entry: entry.name)
+    # per directory being walked: its relative path and the entries of it still to yield
+    stack: list[tuple[str, Iterator[os.DirEntry]]] = [("", iter(listing))]
+    while stack:
+        rel_dir, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        rel_path = os.path.join(rel_dir, entry.name)
+        yield rel_path, entry
+        if entry.is_dir():
+            try:
+                with os.scandir(entry.path) as it:
+                    listing = sorted(it, key=lambda entry: entry.name)
+            except FileNotFoundError:
+                continue
+            stack.append((rel_path, iter(listing)))
+
+
+def walk_files(root: str) -> Iterator[tuple[str, os.DirEntry]]:
+    """walk_tree, leaving out the directories."""
+    for rel_path, entry in walk_tree(root):
+        if entry.is_file():
+            yield rel_path, entry
 
 
 def copy_dir(src_dir: str, dest_dir: str):
@@ -11,12 +61,316 @@ def copy_dir(src_dir: str, dest_dir: str):
         shutil.rmtree(dest_dir)
     os.mkdir(dest_dir)
 
-    for entry in sorted(os.listdir(src_dir)):
-        entry_path = os.path.join(src_dir, entry)
-        dest_path = os.path.join(dest_dir, entry)
+    for rel_path, entry in walk_tree(src_dir):
+        dest_path = os.path.join(dest_dir, rel_path)
+
+        if entry.is_file():
+            print(f"Copying {entry.path} to {dest_path}")
+            shutil.copy(entry.path, dest_path)
+        elif entry.is_dir():
+            os.mkdir(dest_path)
+
+
+class Change(StrEnum):
+    ADDED = "added"
+    CHANGED = "changed"
+    REMOVED = "removed"
+
+
+class ChangeReport:
+    """The output files a build added, changed or removed, relative to the output directory,
+    so a deploy only has to upload (and invalidate) those."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.changes: dict[str, Change] = {}
+
+    def record(self, path: str, change: Change) -> None:
+        rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+        previous = self.changes.get(rel_path)
+        if previous == Change.REMOVED and change == Change.ADDED:
+            # deleted and written again within one build
+            change = Change.CHANGED
+        elif previous == Change.ADDED and change == Change.CHANGED:
+            change = Change.ADDED
+        self.changes[rel_path] = change
+
+    def paths(self, change: Change) -> list[str]:
+        return sorted(path for path, kind in self.changes.items() if kind == change)
+
+    def __str__(self) -> str:
+        return ", ".join(f"{len(self.paths(change))} {change}" for change in Change)
+
+    def save(self, path: str) -> None:
+        data = {change.value: self.paths(change) for change in Change}
+        write_if_changed(path, json.dumps(data, indent=1).encode())
+
+
+def _tmp_path(path: str) -> str:
+    """The sibling temporary file path is written as, creating its directory."""
+    dest_dir = os.path.dirname(path)
+    if dest_dir:
+        os.makedirs(dest_dir, exist_ok=True)
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def _replace_with(path: str, write: Callable[[str], object]) -> None:
+    """Write a sibling temporary file with write(tmp_path) and rename it over path,
+    so readers (and a deploy running meanwhile) see either the old or the new file."""
+    tmp_path = _tmp_path(path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_if_changed(path: str, data: bytes) -> Optional[Change]:
+    """Atomically replace the file at path with data, unless it already holds exactly these bytes.
+    Returns how the file changed, or None if it was left alone (keeping its mtime)."""
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return None
+        change = Change.CHANGED
+    except FileNotFoundError:
+        change = Change.ADDED
+
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+
+    _replace_with(path, write)
+    return change
+
+
+class StreamingWriter:
+    """write_if_changed for text written in pieces, e.g. a page rendered into it, without ever holding it all.
+    While the written bytes match the file's they are only compared with it; at the first difference the
+    matching part is copied to a temporary file, which the rest goes to and which replaces the file on
+    leaving the with block. change then tells how the file changed, None if it was left alone."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.change: Optional[Change] = None
+        self.old: Optional[BinaryIO] = None
+        self.new: Optional[BinaryIO] = None
+        # bytes of the old file the written ones matched so far
+        self.matched = 0
+        # written text not compared or written yet, and its length
+        self.pending: list[str] = []
+        self.pending_size = 0
+
+    def __enter__(self) -> "StreamingWriter":
+        try:
+            self.old = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.change = Change.ADDED
+            self.new = open(_tmp_path(self.path), 'wb')
+        return self
+
+    def write(self, text: str) -> None:
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= HASH_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        data = "".join(self.pending).encode()
+        self.pending.clear()
+        self.pending_size = 0
+        if self.new is None:
+            if self.old.read(len(data)) == data:
+                self.matched += len(data)
+                return
+            self._diverge()
+        self.new.write(data)
+
+    def _diverge(self) -> None:
+        """Start the temporary file with the part of the old file that matched."""
+        self.change = Change.CHANGED
+        self.new = open(_tmp_path(self.path), 'wb')
+        self.old.seek(0)
+        remaining = self.matched
+        while remaining:
+            chunk = self.old.read(min(remaining, HASH_CHUNK_SIZE))
+            self.new.write(chunk)
+            remaining -= len(chunk)
+
+    def __exit__(
+            self,
+            exc_type: Optional[type[BaseException]],
+            exc: Optional[BaseException],
+            traceback: Optional[TracebackType],
+        ) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+                if self.new is None and self.old.read(1):
+                    # what was written is only the start of the old file
+                    self._diverge()
+        except BaseException:
+            self._discard()
+            raise
+        finally:
+            if self.old is not None:
+                self.old.close()
+        if exc_type is not None:
+            self._discard()
+        elif self.new is not None:
+            self.new.close()
+            os.replace(self.new.name, self.path)
+
+    def _discard(self) -> None:
+        self.change = None
+        if self.new is not None:
+            self.new.close()
+            os.remove(self.new.name)
+            self.new = None
+
+
+@dataclass
+class SyncStats:
+    copied: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.copied} copied, {self.unchanged} unchanged, {self.deleted} deleted"
+
+
+def list_files(root: str) -> list[str]:
+    """Relative paths of all files below root, in sorted order."""
+    return [rel_path for rel_path, _ in walk_files(root)]
+
+
+def is_same_file(src_path: str, dest_path: str, src_stat: Optional[os.stat_result] = None) -> bool:
+    """Compare by size and mtime, falling back to the content hash when only the mtime differs.
+    src_stat saves statting src_path again when the caller already has it."""
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if src_stat is None:
+        src_stat = os.stat(src_path)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if hash_file(src_path) != hash_file(dest_path):
+        return False
+    # same bytes: align the mtime so the next sync takes the fast path
+    shutil.copystat(src_path, dest_path)
+    return True
+
+
+class FileTransform(Protocol):
+    """Writes some synced files transformed (e.g. minified) instead of copying them as they are.
+    sync_dir records the source's size and mtime and the output's mtime, and transforms the file again
+    when any of them changes."""
+    name: str
+
+    def applies_to(self, rel_path: str) -> bool: ...
+
+    def write(self, src_path: str, dest_path: str) -> None: ...
+
+    def hash(self, src_path: str) -> str:
+        """hash_file of the file write would make of src_path, without writing it."""
+        ...
+
+
+# what the sync record holds for a transformed file: the transform's name, the source's mtime and size
+# and the output's mtime when it was written; a copied file is recorded as ""
+TransformedEntry = list[Union[str, int]]
+
+
+def transformed_entry(name: str, src_stat: os.stat_result, dest_path: str) -> TransformedEntry:
+    return [name, src_stat.st_mtime_ns, src_stat.st_size, os.stat(dest_path).st_mtime_ns]
+
+
+def is_same_transformed(entry: Union[str, TransformedEntry], name: str, src_stat: os.stat_result, dest_path: str) -> bool:
+    """Whether dest_path is still what transform name wrote from the source as it is now."""
+    try:
+        return entry == transformed_entry(name, src_stat, dest_path)
+    except FileNotFoundError:
+        return False
+
+
+def sync_dir(
+        src_dir: str,
+        dest_dir: str,
+        record_path: str,
+        changes: Optional[ChangeReport] = None,
+        transform: Optional[FileTransform] = None,
+    ) -> SyncStats:
+    """Mirror the files of src_dir into dest_dir, copying only new or changed files, each atomically.
+    Files transform applies to are written through it instead of copied.
+    Files copied by an earlier sync whose source is gone are deleted; anything else in dest_dir
+    (e.g. generated pages) is left alone. The synced files are recorded in record_path, with the
+    transform they went through, and what was copied or deleted in changes."""
+    if not os.path.isdir(src_dir):
+        raise RuntimeError(f"Source directory {src_dir} doesn't exist or is not directory")
+
+    try:
+        with open(record_path) as f:
+            data = json.load(f)
+        # relative path -> "" if copied, what the transform wrote otherwise
+        previously_synced: dict[str, Union[str, TransformedEntry]] = data if isinstance(data, dict) else dict.fromkeys(data, "")
+    except (FileNotFoundError, ValueError):
+        previously_synced = {}
+
+    stats = SyncStats()
+    synced: dict[str, Union[str, TransformedEntry]] = {}
+    for rel_path, entry in walk_files(src_dir):
+        src_path = entry.path
+        src_stat = entry.stat()
+        dest_path = os.path.join(dest_dir, rel_path)
+        transform_name = transform.name if transform is not None and transform.applies_to(rel_path) else ""
+        previous = previously_synced.get(rel_path, "")
+        if transform_name:
+            unchanged = is_same_transformed(previous, transform_name, src_stat, dest_path)
+        else:
+            # a transformed file is copied again when the transform is turned off
+            unchanged = previous == "" and is_same_file(src_path, dest_path, src_stat)
+        if unchanged:
+            synced[rel_path] = previous
+            stats.unchanged += 1
+            continue
+        print(f"Copying {src_path} to {dest_path}")
+        change = Change.CHANGED if os.path.exists(dest_path) else Change.ADDED
+        if transform is not None and transform_name:
+            _replace_with(dest_path, lambda tmp_path: transform.write(src_path, tmp_path))
+            synced[rel_path] = transformed_entry(transform_name, src_stat, dest_path)
+        else:
+            _replace_with(dest_path, lambda tmp_path: shutil.copy2(src_path, tmp_path))
+            synced[rel_path] = ""
+        stats.copied += 1
+        if changes is not None:
+            changes.record(dest_path, change)
+
+    for rel_path in sorted(previously_synced.keys() - synced.keys()):
+        dest_path = os.path.join(dest_dir, rel_path)
+        if os.path.isfile(dest_path):
+            print(f"Removing {dest_path}")
+            os.remove(dest_path)
+            remove_empty_parents(dest_path, dest_dir)
+            stats.deleted += 1
+            if changes is not None:
+                changes.record(dest_path, Change.REMOVED)
+
+    write_if_changed(record_path, json.dumps(synced, indent=1).encode())
+    return stats
+
 
-        if os.path.isfile(entry_path):
-            print(f"Copying {entry_path} to {dest_path}")
-            shutil.copy(entry_path, dest_path)
-        elif os.path.isdir(entry_path):
-            copy_dir(entry_path, dest_path)
+def remove_empty_parents(path: str, root: str) -> None:
+    """Remove the directories between path and root that are left empty."""
+    root = os.path.abspath(root)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != root and parent.startswith(root + os.sep):
+        if os.listdir(parent):
+            return
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
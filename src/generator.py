@@ -1,8 +1,42 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO, TextIOWrapper
+import hashlib
+from itertools import repeat
 import os
-from markdown_blocks import BlockType, markdown_to_html_node
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+from assets import StaticAssets
+from file_operations import Change, ChangeReport, StreamingWriter, walk_files, write_if_changed
+from htmlnode import FragmentSink, HTMLNode, Tags, configure_subtree_memo, escape, subtree_memo_counts, subtree_memo_size
+from manifest import BuildManifest, PageRecord
+from minify import minify_html
+from markdown_blocks import (
+    BlockType,
+    block_node_to_html_node,
+    configure_inline_cache,
+    inline_cache_counts,
+    inline_cache_size,
+    iter_blocks,
+)
+from parentnode import ParentNode
+from pipeline import QueueMetrics, run_pipeline
+from render_cache import RenderCache, RenderedArticle
+from splitting import extract_root_relative_urls
+from template import load_template, referenced_urls
+from textnode import UrlResolver
+import tracing
 
 MD_EXT = ".md"
 
+
+class PageGenerationError(RuntimeError):
+    def __init__(self, failures: Sequence[tuple[str, BaseException]]):
+        self.failures = list(failures)
+        details = "\n".join(f"  {path}: {error!r}" for path, error in self.failures)
+        super().__init__(f"Failed to generate {len(self.failures)} page(s):\n{details}")
+
+
 def extract_title(markdown: str) -> str:
     h1 = f"{BlockType.HEADING} "
     for line in markdown.split('\n'):
@@ -11,34 +45,320 @@ def extract_title(markdown: str) -> str:
     raise ValueError(f"No first-level heading found in {"\n".join(markdown.split('\n'))}")
 
 
+class TitleScanner:
+    """Passes lines through while remembering the title, the way extract_title finds it."""
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = lines
+        self.title: Optional[str] = None
+
+    def __iter__(self) -> Iterator[str]:
+        h1 = f"{BlockType.HEADING} "
+        for line in self.lines:
+            if self.title is None and line.startswith(h1):
+                self.title = line.removesuffix("\n")[2:]
+            yield line
+
+
 def generate_page(
         from_path: str,
         template_path: str,
         dest_path: str,
-        basepath: str
+        basepath: str,
+        render_cache: Optional[RenderCache] = None,
+        assets: Optional[StaticAssets] = None,
+        minify: bool = False,
+    ) -> Optional[Change]:
+    """Write the page for the markdown at from_path to dest_path, unless it already holds the same bytes.
+    Root-relative URLs point below basepath, and at the fingerprinted copies of assets.
+    With minify, the template's whitespace between tags is left out.
+    The markdown is parsed block by block as its lines are read, never held as a whole; with a render
+    cache, it is hashed a chunk at a time first, and only read again to be parsed on a miss.
+    The page is rendered straight into dest_path (see StreamingWriter), never held as a whole either.
+    Returns how dest_path changed, or None if it didn't."""
+    urls = UrlResolver(basepath, assets)
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}.")
+    with tracing.span("page", tracing.PAGE_CATEGORY, path=from_path):
+        content: Union[str, HTMLNode]
+        if render_cache is None:
+            with open(from_path) as from_file:
+                title, content = parse_article(from_file, from_path, urls)
+        else:
+            with tracing.span("read"):
+                key = render_cache.file_key(from_path, urls.key)
+            with tracing.span("cache lookup"):
+                article = render_cache.get(key)
+            if article is None:
+                with open(from_path) as from_file:
+                    article = render_article(from_file, from_path, urls)
+                with tracing.span("cache store"):
+                    render_cache.put(key, article)
+            title, content = article.title, article.html
+        with tracing.span("write"), StreamingWriter(dest_path) as out:
+            compose_page_into(out, title, content, template_path, urls, minify)
+        return out.change
+
+
+def parse_article(lines: Iterable[str], from_path: str, urls: UrlResolver) -> tuple[str, HTMLNode]:
+    """The title and tree of the page at from_path, parsed from its markdown lines block by block as they
+    are read, so neither the whole text nor a list of its blocks is held next to the tree.
+    A traced build gets a span for parsing each block and for converting it."""
+    lines = TitleScanner(lines)
+    blocks = iter_blocks(lines)
+    children: list[HTMLNode] = []
+    while True:
+        with tracing.span("block parse"):
+            block = next(blocks, None)
+        if block is None:
+            break
+        with tracing.span("inline parse"):
+            children.append(block_node_to_html_node(block, urls))
+    if lines.title is None:
+        raise ValueError(f"No first-level heading found in {from_path}")
+    return lines.title, memoizable(ParentNode(Tags.div, children))
+
+
+def render_article(lines: Iterable[str], from_path: str, urls: UrlResolver) -> RenderedArticle:
+    """Run the markdown pipeline on the lines of the page at from_path."""
+    title, root = parse_article(lines, from_path, urls)
+    with tracing.span("render"):
+        return RenderedArticle(title, root.to_html())
+
+
+def memoizable(root: HTMLNode) -> HTMLNode:
+    """root, frozen if the subtree memo is on, so rendering it reuses the HTML of subtrees seen before."""
+    # freezing walks the whole tree, which only pays off when the memo can skip rendering parts of it
+    return root.freeze() if subtree_memo_size() else root
+
+
+def compose_page(
+        title: str,
+        content: Union[str, HTMLNode],
+        template_path: str,
+        urls: UrlResolver,
+        minify: bool = False,
+    ) -> bytes:
+    """The bytes of the page showing title and content, rendered HTML or a tree, in the template."""
+    parts: list[str] = []
+    compose_page_into(parts, title, content, template_path, urls, minify)
+    return "".join(parts).encode()
+
+
+def compose_page_into(
+        out: FragmentSink,
+        title: str,
+        content: Union[str, HTMLNode],
+        template_path: str,
+        urls: UrlResolver,
+        minify: bool = False,
     ) -> None:
+    """Stream the page showing title and content in the template into out."""
+    with tracing.span("template"):
+        template = load_template(template_path, urls.basepath, urls.assets, minify)
+        template.render_into(out, Title=escape(title), Content=content)
+
+
+def read_page(page: tuple[str, str]) -> bytes:
+    """The markdown of the (source, destination) page; the read stage of generate_pages."""
+    with tracing.span("read"):
+        with open(page[0], 'rb') as from_file:
+            return from_file.read()
+
+
+def render_page(
+        page: tuple[str, str],
+        markdown: bytes,
+        template_path: str,
+        urls: UrlResolver,
+        render_cache: Optional[RenderCache] = None,
+        minify: bool = False,
+    ) -> bytes:
+    """The bytes of the (source, destination) page for its markdown; the CPU stage of generate_pages."""
+    from_path, dest_path = page
     print(f"Generating page from {from_path} to {dest_path} using {template_path}.")
-    with open(from_path) as from_file:
-        from_content = from_file.read()
+    with tracing.span("page", tracing.PAGE_CATEGORY, path=from_path):
+        return page_bytes(from_path, markdown, template_path, urls, render_cache, minify)
+
+
+def page_bytes(
+        from_path: str,
+        markdown: bytes,
+        template_path: str,
+        urls: UrlResolver,
+        render_cache: Optional[RenderCache] = None,
+        minify: bool = False,
+    ) -> bytes:
+    """The bytes of the page for the markdown of from_path, reusing the article rendered from identical
+    markdown by an earlier build if render_cache has it. The markdown is the read stage's bytes; it is
+    parsed a line at a time from them, without a decoded copy of the text or a list of its blocks."""
+    key = render_cache.key(markdown, urls.key) if render_cache is not None else None
+    article = None
+    if render_cache is not None:
+        with tracing.span("cache lookup"):
+            article = render_cache.get(key)
+    if article is None:
+        # decode the way open() in text mode would have, a line at a time
+        article = render_article(TextIOWrapper(BytesIO(markdown)), from_path, urls)
+        if render_cache is not None:
+            with tracing.span("cache store"):
+                render_cache.put(key, article)
+    return compose_page(article.title, article.html, template_path, urls, minify)
 
-    with open(template_path) as template_file:
-        template_content = template_file.read()
 
-    content = markdown_to_html_node(from_content).to_html()
-    title = extract_title(from_content)
+def write_page_data(page: tuple[str, str], data: bytes) -> Optional[Change]:
+    """Write the bytes of the (source, destination) page; the write stage of generate_pages."""
+    with tracing.span("write"):
+        return write_if_changed(page[1], data)
 
-    template_content = template_content.replace("{{ Title }}", title)
-    template_content = template_content.replace("{{ Content }}", content)
-    template_content = template_content.replace("href=\"/", f"href=\"{basepath}")
-    template_content = template_content.replace("src=\"/", f"src=\"{basepath}")
 
-    # make sure dest_path directory exists
-    dest_dir = os.path.dirname(dest_path)
-    if dest_dir:
-        os.makedirs(dest_dir, exist_ok=True)
+def page_dest_path(from_path: str, dir_path_content: str, dest_dir_path: str) -> str:
+    """Where the page generated from the markdown file at from_path goes."""
+    f, _ = os.path.splitext(os.path.relpath(from_path, dir_path_content))
+    return os.path.join(dest_dir_path, f"{f}.html")
 
-    with open(dest_path, 'w') as dest_file:
-        dest_file.write(template_content)
+
+def discover_pages(dir_path_content: str, dest_dir_path: str) -> list[tuple[str, str]]:
+    """Collect (source, destination) pairs for every markdown file below dir_path_content, in sorted order."""
+    pages: list[tuple[str, str]] = []
+    for rel_path, entry in walk_files(dir_path_content):
+        f, ext = os.path.splitext(rel_path)
+        if ext.lower() == MD_EXT:
+            pages.append((entry.path, os.path.join(dest_dir_path, f"{f}.html")))
+        else:
+            print(f"ignore {entry.name}")
+    return pages
+
+
+def _init_worker(
+        template_path: str,
+        basepath: str,
+        assets: Optional[StaticAssets],
+        minify: bool,
+        inline_cache_size: int,
+        subtree_memo_size: int,
+        trace: bool,
+    ) -> None:
+    load_template(template_path, basepath, assets, minify)
+    configure_inline_cache(inline_cache_size)
+    configure_subtree_memo(subtree_memo_size)
+    if trace:
+        tracing.start()
+
+
+def _generate_page_job(
+        page: tuple[str, str],
+        template_path: str,
+        basepath: str,
+        render_cache: Optional[RenderCache],
+        assets: Optional[StaticAssets],
+        minify: bool,
+    ) -> tuple[str, Optional[Change], Optional[BaseException], list[dict], tuple[int, ...]]:
+    """Run generate_page in a pool worker, handing its log, output change, error, trace events
+    and memo hits and misses back to the parent."""
+    log = StringIO()
+    change: Optional[Change] = None
+    error: Optional[BaseException] = None
+    counts = memo_counts()
+    with redirect_stdout(log):
+        try:
+            change = generate_page(page[0], template_path, page[1], basepath, render_cache, assets, minify)
+        except Exception as e:
+            error = e
+    tracer = tracing.active()
+    events = tracer.drain() if tracer is not None else []
+    return log.getvalue(), change, error, events, memo_counts_since(counts)
+
+
+def generate_pages(
+        pages: Sequence[tuple[str, str]],
+        template_path: str,
+        basepath: str,
+        jobs: int = 1,
+        render_cache: Optional[RenderCache] = None,
+        changes: Optional[ChangeReport] = None,
+        assets: Optional[StaticAssets] = None,
+        minify: bool = False,
+    ) -> list[Optional[BaseException]]:
+    """Generate (source, destination) pages, in a pipeline of reader threads, parsing and rendering
+    in this process and writer threads, or over a pool of jobs processes.
+    Returns the error for every page, or None if it succeeded, in the order of pages.
+    Worker logs are printed in that order as well, so the output doesn't depend on scheduling.
+    Pages whose output changed are recorded in changes."""
+    if jobs <= 1 or len(pages) <= 1:
+        urls = UrlResolver(basepath, assets)
+        counts = memo_counts()
+        errors: list[Optional[BaseException]] = []
+        metrics: list[QueueMetrics] = []
+        results = run_pipeline(
+            pages,
+            read_page,
+            lambda page, markdown: render_page(page, markdown, template_path, urls, render_cache, minify),
+            write_page_data,
+            metrics,
+        )
+        for (_, dest_path), result in results:
+            if isinstance(result, BaseException):
+                errors.append(result)
+                continue
+            errors.append(None)
+            if result is not None and changes is not None:
+                changes.record(dest_path, result)
+        print_memo_counts(memo_counts_since(counts))
+        if len(pages) > 1:
+            for queue_metrics in metrics:
+                print(f"Pipeline {queue_metrics}.")
+        return errors
+
+    jobs = min(jobs, len(pages))
+    tracer = tracing.active()
+    # a few chunks per worker keeps the IPC overhead low while still balancing uneven pages
+    chunksize = max(1, len(pages) // (jobs * 8))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            template_path, basepath, assets, minify, inline_cache_size(), subtree_memo_size(), tracer is not None,
+        ),
+    ) as executor:
+        errors = []
+        job_counts: list[tuple[int, ...]] = []
+        results = executor.map(
+            _generate_page_job,
+            pages,
+            repeat(template_path),
+            repeat(basepath),
+            repeat(render_cache),
+            repeat(assets),
+            repeat(minify),
+            chunksize=chunksize,
+        )
+        for (_, dest_path), (log, change, error, events, counts) in zip(pages, results):
+            print(log, end='')
+            errors.append(error)
+            if change is not None and changes is not None:
+                changes.record(dest_path, change)
+            if tracer is not None:
+                tracer.events.extend(events)
+            job_counts.append(counts)
+    print_memo_counts(tuple(map(sum, zip(*job_counts))))
+    return errors
+
+
+def memo_counts() -> tuple[int, ...]:
+    """Hits and misses of this process's inline memo, then of its subtree memo."""
+    return (*inline_cache_counts(), *subtree_memo_counts())
+
+
+def memo_counts_since(counts: tuple[int, ...]) -> tuple[int, ...]:
+    return tuple(now - before for now, before in zip(memo_counts(), counts))
+
+
+def print_memo_counts(counts: tuple[int, ...]) -> None:
+    inline_hits, inline_misses, subtree_hits, subtree_misses = counts
+    if inline_hits or inline_misses:
+        print(f"Inline memo: {inline_hits} hits, {inline_misses} misses.")
+    if subtree_hits or subtree_misses:
+        print(f"Subtree memo: {subtree_hits} hits, {subtree_misses} misses.")
 
 
 def generate_pages_recursive(
@@ -46,24 +366,92 @@ def generate_pages_recursive(
         template_path: str,
         dest_dir_path: str,
         basepath: str,
+        manifest: Optional[BuildManifest] = None,
+        jobs: int = 1,
+        render_cache: Optional[RenderCache] = None,
+        changes: Optional[ChangeReport] = None,
+        assets: Optional[StaticAssets] = None,
+        minify: bool = False,
     ) -> None:
+    """Generate every page below dir_path_content, using up to jobs processes.
+    With a manifest, pages whose inputs are unchanged since the last build are skipped
+    and outputs of deleted sources are removed.
+    With a render cache, pages whose markdown was rendered before only go through the template.
+    Outputs are only rewritten when their bytes change; those that did are recorded in changes.
+    With assets, pages reference the fingerprinted copies of static files.
+    With minify, they are rendered with the template minified.
+    Raises PageGenerationError listing every page that failed after all others are written."""
     print(f"Generating pages in {dir_path_content} to {dest_dir_path} using {template_path}.")
-    for entry in os.listdir(dir_path_content):
-        entry_path = os.path.join(dir_path_content, entry)
-        f, ext = os.path.splitext(entry)
-        if os.path.isdir(entry_path):
-            generate_pages_recursive(
-                entry_path,
-                template_path,
-                os.path.join(dest_dir_path, entry),
-                basepath,
-            )
-        elif ext.lower() == MD_EXT:
-            generate_page(
-                entry_path,
-                template_path,
-                os.path.join(dest_dir_path, f"{f}.html"),
-                basepath,
-            )
+    with tracing.span("directory scan"):
+        pages = discover_pages(dir_path_content, dest_dir_path)
+    if manifest is None:
+        errors = generate_pages(pages, template_path, basepath, jobs, render_cache, changes, assets, minify)
+        trim_render_cache(render_cache)
+        failures = [(from_path, error) for (from_path, _), error in zip(pages, errors) if error is not None]
+        if failures:
+            raise PageGenerationError(failures) from failures[0][1]
+        return
+
+    with tracing.span("freshness check"):
+        template_hash, template_urls = template_inputs(template_path, minify)
+        stale: list[tuple[str, str, PageRecord]] = []
+        for from_path, dest_path in pages:
+            record = page_record(from_path, template_hash, template_urls, basepath, assets)
+            if not manifest.is_fresh(dest_path, record):
+                stale.append((from_path, dest_path, record))
+
+    errors = generate_pages(
+        [(from_path, dest_path) for from_path, dest_path, _ in stale],
+        template_path, basepath, jobs, render_cache, changes, assets, minify,
+    )
+    trim_render_cache(render_cache)
+    failures: list[tuple[str, BaseException]] = []
+    for (from_path, dest_path, record), error in zip(stale, errors):
+        if error is None:
+            manifest.record(dest_path, record)
         else:
-            print(f"ignore {entry}")
+            failures.append((from_path, error))
+    with tracing.span("manifest update"):
+        removed = manifest.prune((dest_path for _, dest_path in pages), dest_dir_path)
+        manifest.save()
+    if changes is not None:
+        for dest_path in removed:
+            changes.record(dest_path, Change.REMOVED)
+    print(f"{len(stale) - len(failures)} pages generated, {len(pages) - len(stale)} unchanged, {len(removed)} removed.")
+    if failures:
+        raise PageGenerationError(failures) from failures[0][1]
+
+
+def template_inputs(template_path: str, minify: bool = False) -> tuple[str, list[str]]:
+    """The hash of the template as pages are rendered with it, and the root-relative paths it references."""
+    with open(template_path, 'rb') as f:
+        data = f.read()
+    text = TextIOWrapper(BytesIO(data)).read()
+    if minify:
+        data = minify_html(text).encode()
+    return hashlib.sha256(data).hexdigest(), referenced_urls(text)
+
+
+def page_record(
+        from_path: str,
+        template_hash: str,
+        template_urls: Iterable[str],
+        basepath: str,
+        assets: Optional[StaticAssets] = None,
+    ) -> PageRecord:
+    """What the page built from from_path depends on as things are now."""
+    with open(from_path, 'rb') as f:
+        markdown = f.read()
+    urls = set(template_urls)
+    urls.update(extract_root_relative_urls(TextIOWrapper(BytesIO(markdown)).read()))
+    states = {url: assets.state_of(url) if assets is not None else "" for url in sorted(urls)}
+    return PageRecord(from_path, hashlib.sha256(markdown).hexdigest(), template_hash, basepath, states)
+
+
+def trim_render_cache(render_cache: Optional[RenderCache]) -> None:
+    if render_cache is None:
+        return
+    with tracing.span("cache trim"):
+        evicted = render_cache.trim()
+    if evicted:
+        print(f"Evicted {evicted} render cache entries.")
@@ -1,6 +1,116 @@
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import StrEnum, auto
-from typing import Optional, Sequence
+from functools import cache
+import hashlib
+from types import MappingProxyType
+from typing import Callable, ClassVar, Optional, Protocol, Sequence, Union
+
+
+class SupportsWrite(Protocol):
+    def write(self, s: str, /) -> object: ...
+
+
+# where rendered HTML fragments go: a list buffer or a file-like object
+FragmentSink = Union[list[str], SupportsWrite]
+Writer = Callable[[str], object]
+
+
+# bytes of a node's structural hash
+NODE_DIGEST_SIZE = 16
+# rendered subtrees memoized per process, so identical ones within a page, across pages and across
+# rebuilds in watch mode are rendered once; off by default, as hashing a tree costs about as much
+# as rendering it
+SUBTREE_MEMO_SIZE = 0
+
+
+def fragment_writer(out: FragmentSink) -> Writer:
+    return out.append if isinstance(out, list) else out.write
+
+
+# what each special character becomes in text content, and in a double-quoted attribute value;
+# "&" goes first, so the entities the others become aren't escaped again
+TEXT_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
+ATTRIBUTE_ESCAPES = TEXT_ESCAPES + (('"', "&quot;"),)
+
+
+def escape(value: str, table: Sequence[tuple[str, str]] = TEXT_ESCAPES) -> str:
+    """value with the characters in table replaced by their entities.
+    Text without any is returned as it is, after a fast scan for each character and no copy
+    (a regex character class scans once, but far slower than these on plain text)."""
+    for char, entity in table:
+        if char in value:
+            value = value.replace(char, entity)
+    return value
+
+
+def escape_attribute(value: str) -> str:
+    return escape(value, ATTRIBUTE_ESCAPES)
+
+
+def needs_attribute_escape(value: str) -> bool:
+    return '&' in value or '<' in value or '>' in value or '"' in value
+
+
+def escape_props(props: Optional[dict[str, str]]) -> Optional[dict[str, str]]:
+    """props with their values escaped as attribute values; props itself, not a copy, if none needs it."""
+    if not props:
+        return props
+    for value in props.values():
+        if needs_attribute_escape(value):
+            return {name: escape_attribute(value) for name, value in props.items()}
+    return props
+
+
+class SubtreeMemo:
+    """The HTML of frozen subtrees by structural hash, evicting the least recently used beyond maxsize."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[bytes, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[str]:
+        html = self.entries.get(digest)
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(digest)
+        return html
+
+    def put(self, digest: bytes, html: str) -> None:
+        self.entries[digest] = html
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+_subtree_memo = SubtreeMemo(SUBTREE_MEMO_SIZE)
+
+
+def configure_subtree_memo(maxsize: int) -> None:
+    """Memoize the HTML of up to maxsize frozen subtrees (0 turns the memo off), dropping what is memoized."""
+    global _subtree_memo
+    _subtree_memo = SubtreeMemo(maxsize)
+
+
+def subtree_memo_size() -> int:
+    return _subtree_memo.maxsize
+
+
+def subtree_memo_counts() -> tuple[int, int]:
+    """Hits and misses of this process's subtree memo so far."""
+    return _subtree_memo.hits, _subtree_memo.misses
+
+
+class _EndOfSubtree:
+    """Stack item marking where a subtree being memoized ends, and where its fragments begin."""
+    __slots__ = ("digest", "start")
+
+    def __init__(self, digest: bytes, start: int):
+        self.digest = digest
+        self.start = start
 
 # Define the StrEnum for HTML tags
 class Tags(StrEnum):
@@ -24,7 +134,7 @@ class Tags(StrEnum):
     div = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class HTMLNode:
     """- A string representing the HTML tag name (e.g. "p", "a", "h1", etc.)"""
     tag: Optional[str] = None
@@ -39,36 +149,96 @@ class HTMLNode:
     For example, a link (<a> tag) might have {"href": "https://www.google.com"}"""
     props: Optional[dict[str, str]] = None
 
+    """True for the copies freeze() makes, which have a _digest slot for their structural hash.
+    A class attribute, so nodes that are never frozen don't grow by it"""
+    _frozen: ClassVar[bool] = False
+
     def __eq__(self, other: object):
         if not isinstance(other, HTMLNode):
             # If 'other' is not an HTMLNode, they are not equal
             return False
+        if self._frozen and other._frozen:
+            # two hashes instead of two walks, and each is computed once per node
+            return self.structural_hash() == other.structural_hash()
 
         # Compare the attributes. If any differ, they are not equal.
-        # Include checks for children being None vs empty list if necessary based on your implementation
         if self.tag != other.tag:
-            # Optional: print a specific message about the difference
-            # print(f"HTMLNode equality check failed: Tags differ - self.tag='{self.tag}', other.tag='{other.tag}'")
             return False
         if self.value != other.value:
-            # Optional: print a specific message about the difference
-            # print(f"HTMLNode equality check failed: Values differ - self.value='{self.value}', other.value='{other.value}'")
             return False
-        # Comparing lists of children needs careful handling if order matters or if comparing None vs empty list
-        if (self.children is None and other.children is not None) or \
-           (self.children is not None and other.children is None) or \
-           (self.children is not None and other.children is not None and list(self.children) != list(other.children)):
-             # Optional: print a specific message about the difference
-            #  print(f"HTMLNode equality check failed: Children differ - self.children={self.children}, other.children={other.children}")
-             return False
+        # None and empty children differ; children may be lists or tuples
+        if (self.children is None) != (other.children is None):
+            return False
+        if self.children is not None and other.children is not None:
+            if len(self.children) != len(other.children):
+                return False
+            if any(child != other_child for child, other_child in zip(self.children, other.children)):
+                return False
         if self.props != other.props:
-            # Optional: print a specific message about the difference
-            # print(f"HTMLNode equality check failed: Props differ - self.props={self.props}, other.props={other.props}")
             return False
 
         # If all attributes are equal, the nodes are equal
         return True
 
+    def freeze(self) -> "HTMLNode":
+        """An immutable copy of this subtree: children become tuples and props read-only.
+        Like the nodes shared by the inline memo, frozen nodes must not be reassigned attributes either.
+        Frozen subtrees compare by structural hash and have their HTML memoized.
+        Frozen nodes are instances of a subclass of their node's class (see frozen_class)."""
+        if self._frozen:
+            return self
+        # every node to copy, parents before children, so in reverse each node's children come first
+        unfrozen: list[HTMLNode] = []
+        stack: list[HTMLNode] = [self]
+        while stack:
+            node = stack.pop()
+            unfrozen.append(node)
+            if node.children:
+                stack.extend(child for child in node.children if not child._frozen)
+        copies: dict[int, HTMLNode] = {}
+        for node in reversed(unfrozen):
+            copy = object.__new__(frozen_class(type(node)))
+            copy.tag = node.tag
+            copy.value = node.value
+            copy.children = None if node.children is None else tuple(copies.get(id(child), child) for child in node.children)
+            copy.props = None if node.props is None else MappingProxyType(dict(node.props))
+            copy._digest = None
+            copies[id(node)] = copy
+        return copies[id(self)]
+
+    def structural_hash(self) -> bytes:
+        """Digest of the frozen subtree's tags, values, props (in order) and children, computed bottom up
+        and kept on each node. Subtrees with the same hash render the same HTML."""
+        if not self._frozen:
+            raise ValueError("Only frozen nodes have a structural hash")
+        if self._digest is not None:
+            return self._digest
+        # every unhashed node, parents before children, so in reverse each node's children come first
+        unhashed: list[HTMLNode] = []
+        stack: list[HTMLNode] = [self]
+        while stack:
+            node = stack.pop()
+            unhashed.append(node)
+            if node.children:
+                stack.extend(child for child in node.children if child._digest is None)
+        for node in reversed(unhashed):
+            # every string length-prefixed and None tagged, so no two different nodes encode the same,
+            # whatever characters their text holds
+            fields = [hash_field(node.tag), hash_field(node.value)]
+            if node.props is None:
+                fields.append("N")
+            else:
+                fields.append(f"P{len(node.props)}:")
+                for name, value in node.props.items():
+                    fields += (hash_field(name), hash_field(value))
+            # the children's digests follow, all NODE_DIGEST_SIZE bytes long
+            fields.append("N" if node.children is None else f"C{len(node.children)}:")
+            digest = hashlib.blake2b("".join(fields).encode(), digest_size=NODE_DIGEST_SIZE)
+            if node.children:
+                digest.update(b"".join(child._digest for child in node.children))
+            node._digest = digest.digest()
+        return self._digest
+
     def __repr__(self):
         # This method returns a string that is a clear and unambiguous
         # representation of the object, ideally one that could be used
@@ -95,6 +265,49 @@ class HTMLNode:
 
     def to_html(self)-> str:
         raise NotImplementedError("Child classes will override this method to render themselves as HTML")
+
+    def render_into(self, out: FragmentSink) -> None:
+        """Write the HTML of this node into out fragment by fragment.
+        The tree is walked with an explicit stack, so no subtree is ever built up as one string
+        and deep nesting can't hit the recursion limit.
+        Frozen parent nodes are the exception: their HTML is taken from the subtree memo, or collected
+        while it is written and memoized once the subtree ends."""
+        sink = fragment_writer(out)
+        memo = _subtree_memo if _subtree_memo.maxsize else None
+        # fragments written since the outermost subtree being memoized began
+        collected: list[str] = []
+        open_subtrees = 0
+
+        def collect(fragment: str) -> None:
+            sink(fragment)
+            collected.append(fragment)
+
+        stack: list[Union["HTMLNode", str, _EndOfSubtree]] = [self]
+        while stack:
+            item = stack.pop()
+            write = collect if open_subtrees else sink
+            if isinstance(item, str):
+                write(item)
+            elif isinstance(item, _EndOfSubtree):
+                memo.put(item.digest, "".join(collected[item.start:]))
+                open_subtrees -= 1
+                if not open_subtrees:
+                    collected.clear()
+            elif memo is not None and item._frozen and item.children:
+                digest = item.structural_hash()
+                html = memo.get(digest)
+                if html is not None:
+                    write(html)
+                    continue
+                stack.append(_EndOfSubtree(digest, len(collected)))
+                open_subtrees += 1
+                item._render_step(collect, stack)
+            else:
+                item._render_step(write, stack)
+
+    def _render_step(self, write: Writer, stack: list[Union["HTMLNode", str]]) -> None:
+        """Write this node's own fragments; push children and pending closing tags onto the stack (last in, first out)."""
+        raise NotImplementedError("Child classes will override this method to render themselves as HTML")
     
     def props_to_html(self) -> str:
         if not self.props:
@@ -103,4 +316,15 @@ class HTMLNode:
     
     def validate(self) -> bool:
         return self.value is not None or self.children is not None
+
+
+def hash_field(value: Optional[str]) -> str:
+    """A string field as structural_hash encodes it: N for None, else S, its length, ":" and itself."""
+    return "N" if value is None else f"S{len(value)}:{value}"
+
+
+@cache
+def frozen_class(cls: type[HTMLNode]) -> type[HTMLNode]:
+    """The class of frozen copies of cls's nodes: cls with a slot for the structural hash."""
+    return type(f"Frozen{cls.__name__}", (cls,), {"__slots__": ("_digest",), "_frozen": True})
     
\ No newline at end of file
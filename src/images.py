@@ -0,0 +1,126 @@
+import json
+import os
+import struct
+from typing import BinaryIO, Iterable, Optional
+
+from file_operations import hash_file, write_if_changed
+
+
+IMAGE_EXTS = (".png", ".gif", ".jpg", ".jpeg")
+IMAGE_CACHE_FORMAT = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+GIF_SIGNATURES = (b"GIF87a", b"GIF89a")
+JPEG_SOI = b"\xff\xd8"
+# start-of-frame markers carry the dimensions; C4 (huffman tables), C8 (reserved) and CC (arithmetic coding) don't
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# markers without a length field
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+
+def read_image_size(path: str) -> Optional[tuple[int, int]]:
+    """Width and height from a PNG, GIF or JPEG header, or None if the file is none of these."""
+    with open(path, 'rb') as f:
+        head = f.read(26)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in GIF_SIGNATURES:
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(JPEG_SOI):
+            f.seek(2)
+            return _read_jpeg_size(f)
+    return None
+
+
+def _read_jpeg_size(f: BinaryIO) -> Optional[tuple[int, int]]:
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if code in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            _, height, width = struct.unpack(">BHH", frame)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageSizeCache:
+    """Persistent image dimensions keyed by file hash, so each image is only parsed once.
+    A file whose size and mtime are unchanged isn't even hashed again. A read-only cache is loaded
+    from path but never saved to it."""
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        # path -> (mtime_ns, size, hash)
+        self.files: dict[str, tuple[int, int, str]] = {}
+        # hash -> (width, height), or None for files that turned out not to be images
+        self.sizes: dict[str, Optional[tuple[int, int]]] = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data["format"] == IMAGE_CACHE_FORMAT:
+                self.files = {file_path: tuple(entry) for file_path, entry in data["files"].items()}
+                self.sizes = {file_hash: tuple(size) if size else None for file_hash, size in data["sizes"].items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable image size cache {path}: {e}")
+
+    def size_of(self, path: str) -> Optional[tuple[int, int]]:
+        stat = os.stat(path)
+        known = self.files.get(path)
+        if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            file_hash = known[2]
+        else:
+            file_hash = hash_file(path)
+            self.files[path] = (stat.st_mtime_ns, stat.st_size, file_hash)
+        if file_hash not in self.sizes:
+            self.sizes[file_hash] = read_image_size(path)
+        return self.sizes[file_hash]
+
+    def save(self, live_paths: Iterable[str]) -> None:
+        """Write the cache, keeping only the entries of live_paths."""
+        if self.read_only:
+            return
+        files = {path: self.files[path] for path in sorted(live_paths) if path in self.files}
+        hashes = {entry[2] for entry in files.values()}
+        data = {
+            "format": IMAGE_CACHE_FORMAT,
+            "files": files,
+            "sizes": {file_hash: size for file_hash, size in sorted(self.sizes.items()) if file_hash in hashes},
+        }
+        write_if_changed(self.path, json.dumps(data, indent=1).encode())
+
+
+def image_sizes(static_dir: str, rel_paths: Iterable[str], cache: ImageSizeCache) -> dict[str, tuple[int, int]]:
+    """Dimensions of the images among rel_paths (relative to static_dir) by root-relative URL."""
+    sizes: dict[str, tuple[int, int]] = {}
+    image_paths: list[str] = []
+    for rel_path in rel_paths:
+        if os.path.splitext(rel_path)[1].lower() not in IMAGE_EXTS:
+            continue
+        path = os.path.join(static_dir, rel_path)
+        image_paths.append(path)
+        size = cache.size_of(path)
+        if size is not None:
+            sizes["/" + rel_path.replace(os.sep, "/")] = size
+    cache.save(image_paths)
+    return sizes
@@ -1,15 +1,23 @@
-from typing import Optional
+from typing import Optional, Union
 
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, Writer, escape, escape_props
 
 
 class LeafNode(HTMLNode):
+    """A tag around text, or text alone. The value is text and the props are attribute values, escaped
+    once here, unless escaped says they already are HTML, so rendering writes them as they are."""
+    __slots__ = ()
+
     def __init__(
             self,
             tag: str,
             value: str,
-            props: Optional[dict[str, str]] = None
+            props: Optional[dict[str, str]] = None,
+            escaped: bool = False,
         ):
+        if not escaped:
+            value = escape(value) if value is not None else value
+            props = escape_props(props)
         super().__init__(tag=tag, children=None, value=value, props=props)
 
     def __repr__(self):
@@ -17,8 +25,8 @@ class LeafNode(HTMLNode):
                 f"props={repr(self.props)})")
 
     @classmethod
-    def text_only(cls, value: str):
-        return cls(tag='', value=value)
+    def text_only(cls, value: str, escaped: bool = False):
+        return cls(tag='', value=value, escaped=escaped)
 
     def to_html(self):
         if self.value is None:
@@ -31,3 +39,6 @@ class LeafNode(HTMLNode):
         if self.props:
             return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
         return f"<{self.tag}>{self.value}</{self.tag}>"
+
+    def _render_step(self, write: Writer, stack: list[Union[HTMLNode, str]]) -> None:
+        write(self.to_html())
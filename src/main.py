@@ -1,21 +1,224 @@
-import sys
-from file_operations import copy_dir
+import argparse
+import os
+import shutil
+import threading
+from assets import DigestCache, StaticAssets, collect_static_assets, fingerprint_assets, fingerprint_urls
+from compression import precompress_dir, remove_precompressed
+from depgraph import explain
+from file_operations import ChangeReport, list_files, sync_dir
 from generator import generate_pages_recursive
+from htmlnode import SUBTREE_MEMO_SIZE, configure_subtree_memo
+from images import ImageSizeCache, image_sizes
+from manifest import BuildManifest
+from markdown_blocks import INLINE_CACHE_SIZE, configure_inline_cache
+from minify import CssMinifyTransform, minify_savings
+from render_cache import DEFAULT_MAX_BYTES, RenderCache
+from search import remove_search_index, update_search_index
+from serve import ReloadBroadcaster, start_server
+import tracing
+from watch import Rebuilder, make_watcher, watch
 
 
 dir_path_static = "./static"
 dir_path_content = "./content"
 dir_path_output = "./docs"
+template_path = "template.html"
+dir_path_build = "./.build"
+manifest_path = os.path.join(dir_path_build, "manifest.json")
+render_cache_path = os.path.join(dir_path_build, "render-cache")
+changes_path = os.path.join(dir_path_build, "changes.json")
+fingerprint_record_path = os.path.join(dir_path_build, "fingerprints.json")
+static_record_path = os.path.join(dir_path_build, "static.json")
+image_cache_path = os.path.join(dir_path_build, "images.json")
+digest_cache_path = os.path.join(dir_path_build, "digests.json")
+search_record_path = os.path.join(dir_path_build, "search.json")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a static HTML site from markdown files.")
+    parser.add_argument("basepath", nargs='?', default='/', help="URL prefix the site is served from")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="wipe the output directory and rebuild every page instead of building incrementally",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="generate pages in N worker processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=f"keep running and rebuild whatever changes in {dir_path_content}, {dir_path_static} and {template_path}",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help=f"serve {dir_path_output} on localhost, reloading open pages when they are rebuilt",
+    )
+    parser.add_argument("--port", type=int, default=8000, help="port for --serve")
+    parser.add_argument(
+        "--render-cache",
+        default=render_cache_path,
+        metavar="DIR",
+        help="directory of rendered articles to reuse, e.g. shared between CI runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--render-cache-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        metavar="MB",
+        help="evict the least recently used rendered articles beyond this size (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--inline-memo",
+        type=int,
+        default=INLINE_CACHE_SIZE,
+        metavar="N",
+        help="remember the rendering of up to N distinct inline texts per process, 0 to turn off (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--subtree-memo",
+        type=int,
+        default=SUBTREE_MEMO_SIZE,
+        metavar="N",
+        help="remember the HTML of up to N rendered subtrees per process, 0 to turn off (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="add content-hashed copies of static assets (e.g. index.0123456789.css) and link pages to them",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write gzip-compressed .gz siblings of the HTML, CSS and JS files in the output",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="leave the whitespace between tags out of the template and minify static CSS, reporting the savings",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded search index of the pages and its loader, search.js, to the output's search/ directory",
+    )
+    parser.add_argument(
+        "--explain",
+        metavar="PATH",
+        help="instead of building, print what the output file PATH is built from and why the next build "
+        "would rebuild it (pass the basepath and --fingerprint as for that build)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="record the build's stages and pages in Chrome trace-event format to PATH and print the slowest ones",
+    )
+    return parser.parse_args()
 
 
 def main():
-    basepath = sys.argv[1] if len(sys.argv) >1 else '/'
+    args = parse_args()
+    basepath = args.basepath
+    jobs = args.jobs or os.cpu_count() or 1
+    configure_inline_cache(args.inline_memo)
+    configure_subtree_memo(args.subtree_memo)
+    changes = ChangeReport(dir_path_output)
+    render_cache = RenderCache(args.render_cache, args.render_cache_mb * 1024 * 1024)
     print(f"basepath is {basepath}")
 
-    print("Copying static files to output directory...")
-    copy_dir(dir_path_static, dir_path_output)
-    generate_pages_recursive(dir_path_content, "template.html", dir_path_output, basepath)
+    if args.explain:
+        # what the build would see after syncing, read from the static sources without writing any output
+        static_files = list_files(dir_path_static)
+        assets = StaticAssets(
+            fingerprint_urls(
+                dir_path_static, static_files, CssMinifyTransform() if args.minify else None,
+                DigestCache(digest_cache_path, read_only=True),
+            ) if args.fingerprint else {},
+            image_sizes(dir_path_static, static_files, ImageSizeCache(image_cache_path, read_only=True)),
+        )
+        manifest = BuildManifest.load(manifest_path)
+        for line in explain(
+            args.explain, dir_path_content, dir_path_static, template_path, dir_path_output,
+            basepath, manifest, assets, args.minify,
+        ):
+            print(line)
+        return
+
+    if args.full and os.path.exists(dir_path_output):
+        shutil.rmtree(dir_path_output)
+
+    if args.trace:
+        tracing.start()
+    try:
+        print("Syncing static files to output directory...")
+        with tracing.span("static copy"):
+            transform = CssMinifyTransform() if args.minify else None
+            stats = sync_dir(dir_path_static, dir_path_output, static_record_path, changes, transform)
+        print(f"Static files: {stats}.")
+        if not args.fingerprint and os.path.exists(fingerprint_record_path):
+            # remove the hashed copies an earlier build made
+            fingerprint_assets(dir_path_output, {}, fingerprint_record_path, changes)
+            os.remove(fingerprint_record_path)
+        image_cache = ImageSizeCache(image_cache_path)
+        digest_cache = DigestCache(digest_cache_path)
+        with tracing.span("static assets"):
+            assets = collect_static_assets(
+                dir_path_static, dir_path_output, image_cache,
+                fingerprint_record_path if args.fingerprint else None, changes, digest_cache, transform,
+            )
+        manifest = BuildManifest(manifest_path, "", {}) if args.full else BuildManifest.load(manifest_path)
+        generate_pages_recursive(
+            dir_path_content, template_path, dir_path_output, basepath,
+            manifest, jobs, render_cache, changes, assets, args.minify,
+        )
+        if args.minify:
+            for line in minify_savings(dir_path_static, dir_path_output, template_path, manifest.pages).lines():
+                print(f"Minified {line}")
+        with tracing.span("search index"):
+            if args.search:
+                stats = update_search_index(dir_path_content, dir_path_output, search_record_path, basepath, changes)
+                print(f"Search index: {stats}.")
+            else:
+                remove_search_index(dir_path_output, search_record_path, changes)
+        with tracing.span("precompress"):
+            if args.precompress:
+                print(f"Precompressed files: {precompress_dir(dir_path_output, jobs, changes)}.")
+            else:
+                remove_precompressed(dir_path_output, changes)
+        changes.save(changes_path)
+        print(f"Output files: {changes}; listed in {changes_path}.")
+    finally:
+        tracer = tracing.stop()
+        if tracer is not None:
+            tracer.write(args.trace)
+            tracer.print_summary()
+            print(f"Trace written to {args.trace}")
+
+    broadcaster = ReloadBroadcaster()
+    if args.serve:
+        start_server(dir_path_output, args.port, broadcaster, basepath)
+        print(f"Serving {dir_path_output} at http://127.0.0.1:{args.port}{basepath}")
+    try:
+        if args.watch:
+            rebuilder = Rebuilder(
+                dir_path_content, dir_path_static, template_path, dir_path_output,
+                basepath, manifest, static_record_path, jobs, render_cache,
+                fingerprint_record_path if args.fingerprint else None, image_cache, assets, args.precompress,
+                search_record_path if args.search else None, args.minify, digest_cache,
+            )
+            watcher = make_watcher([dir_path_content, dir_path_static, template_path])
+            print(f"Watching for changes ({type(watcher).__name__})...")
+            watch(rebuilder, watcher, broadcaster.publish)
+        elif args.serve:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
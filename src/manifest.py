@@ -0,0 +1,105 @@
+from dataclasses import asdict, dataclass, field
+from functools import cache
+import hashlib
+import json
+import os
+from typing import Iterable
+
+from file_operations import remove_empty_parents
+
+
+MANIFEST_FORMAT = 2
+
+
+@cache
+def generator_version() -> str:
+    """Hash of the generator's own source code.
+    Any change to the pipeline invalidates every page, so there is no version number to forget to bump."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for entry in sorted(os.listdir(src_dir)):
+        if not entry.endswith(".py") or entry.startswith("test"):
+            continue
+        digest.update(entry.encode())
+        with open(os.path.join(src_dir, entry), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class PageRecord:
+    """Everything a generated page depends on."""
+    source: str
+    source_hash: str
+    template_hash: str
+    basepath: str
+    # the root-relative paths the page and its template reference, with what the page sees of each
+    # (StaticAssets.state_of), so changing one static file only invalidates the pages that use it
+    assets: dict[str, str] = field(default_factory=dict)
+
+
+class BuildManifest:
+    """Persistent record of the pages produced by the last build, keyed by output path."""
+
+    def __init__(self, path: str, version: str, pages: dict[str, PageRecord]):
+        self.path = path
+        self.version = version
+        self.pages = pages
+
+    @classmethod
+    def load(cls, path: str) -> "BuildManifest":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data["format"] != MANIFEST_FORMAT:
+                raise ValueError(f"Unsupported manifest format {data['format']}")
+            pages = {dest: PageRecord(**record) for dest, record in data["pages"].items()}
+            return cls(path, data["version"], pages)
+        except FileNotFoundError:
+            return cls(path, "", {})
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable build manifest {path}: {e}")
+            return cls(path, "", {})
+
+    def is_fresh(self, dest_path: str, record: PageRecord) -> bool:
+        return (
+            self.version == generator_version()
+            and self.pages.get(dest_path) == record
+            and os.path.isfile(dest_path)
+        )
+
+    def record(self, dest_path: str, record: PageRecord) -> None:
+        self.pages[dest_path] = record
+
+    def prune(self, live_dest_paths: Iterable[str], dest_root: str) -> list[str]:
+        """Delete outputs recorded by a previous build whose source is gone."""
+        live = set(live_dest_paths)
+        removed: list[str] = []
+        for dest_path in sorted(self.pages.keys() - live):
+            self.remove(dest_path, dest_root)
+            removed.append(dest_path)
+        return removed
+
+    def remove(self, dest_path: str, dest_root: str) -> None:
+        """Forget a page and delete its output."""
+        self.pages.pop(dest_path, None)
+        if os.path.isfile(dest_path):
+            print(f"Removing stale output {dest_path}")
+            os.remove(dest_path)
+            remove_empty_parents(dest_path, dest_root)
+
+    def save(self) -> None:
+        self.version = generator_version()
+        data = {
+            "format": MANIFEST_FORMAT,
+            "version": self.version,
+            "pages": {dest: asdict(record) for dest, record in sorted(self.pages.items())},
+        }
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
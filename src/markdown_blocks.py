@@ -1,13 +1,26 @@
+from dataclasses import dataclass
 from enum import StrEnum
+from functools import cache, lru_cache
+import re
+from typing import Iterable, Iterator, Optional, Sequence, Union
 
 from htmlnode import HTMLNode, Tags
 from leafnode import LeafNode
 from parentnode import ParentNode
-from splitting import markdown_to_blocks, text_to_textnodes
-from textnode import TextNode, TextType, text_node_to_html_node
+from splitting import iter_block_lines, text_to_textnodes
+from textnode import ROOT_URLS, TextNode, TextType, UrlResolver, text_node_to_html_node
 
 
 MAX_HEADER_LEVELS = 6
+HEADING_TAGS = {level: Tags(f"h{level}") for level in range(1, MAX_HEADER_LEVELS + 1)}
+CODE_FENCE = "```"
+# a run of non-empty lines
+BLOCK_PATTERN = re.compile(r"[^\n]+(?:\n[^\n]+)*")
+NON_SPACE_PATTERN = re.compile(r"\S")
+QUOTE_PATTERN = re.compile(r">[^\n]*(?:\n>[^\n]*)*")
+UNORDERED_LIST_PATTERN = re.compile(r"- [^\n]*(?:\n- [^\n]*)*")
+# distinct inline texts (paragraphs, list items, headings, quotes) memoized per process
+INLINE_CACHE_SIZE = 4096
 
 class BlockType(StrEnum):
     PARAGRAPH = ''
@@ -18,156 +31,239 @@ class BlockType(StrEnum):
     ORDERED_LIST = '1'
 
 
+@dataclass(slots=True, frozen=True)
+class Block:
+    """A block of markdown as the span source[start:end], already stripped. Its lines are found by scanning
+    the span, and no text is copied out of source until a converter has the final text of a node."""
+    type: BlockType
+    source: str
+    start: int
+    end: int
+
+    @classmethod
+    def of(cls, source: str, start: int = 0, end: Optional[int] = None) -> "Block":
+        end = len(source) if end is None else end
+        return cls(span_block_type(source, start, end), source, start, end)
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[str]) -> "Block":
+        """The block of already split lines, e.g. as read from a file."""
+        return cls.of("\n".join(lines))
+
+    @property
+    def lines(self) -> list[str]:
+        return self.source[self.start:self.end].split('\n')
+
+
 def block_to_block_type(block: str) -> BlockType:
-    if not block:
+    return span_block_type(block, 0, len(block))
+
+def span_block_type(source: str, start: int, end: int) -> BlockType:
+    """The type of the block source[start:end]."""
+    if start == end or source[start] == '\n':
         # empty paragraph
         return BlockType.PARAGRAPH
 
-    match block[0]:
+    match source[start]:
         case BlockType.HEADING:
-            return BlockType.HEADING if __is_heading(block) else BlockType.PARAGRAPH
+            return BlockType.HEADING if __is_heading(source, start, end) else BlockType.PARAGRAPH
         case BlockType.CODE:
-            return BlockType.CODE if __is_code(block) else BlockType.PARAGRAPH
+            return BlockType.CODE if __is_code(source, start, end) else BlockType.PARAGRAPH
         case BlockType.QUOTE:
-            return BlockType.QUOTE if __is_quote(block) else BlockType.PARAGRAPH
+            return BlockType.QUOTE if QUOTE_PATTERN.fullmatch(source, start, end) else BlockType.PARAGRAPH
         case BlockType.UNORDERED_LIST:
-            return BlockType.UNORDERED_LIST if __is_unordered_list(block) else BlockType.PARAGRAPH
+            return BlockType.UNORDERED_LIST if UNORDERED_LIST_PATTERN.fullmatch(source, start, end) else BlockType.PARAGRAPH
         case BlockType.ORDERED_LIST:
-            return BlockType.ORDERED_LIST if __is_ordered_list(block) else BlockType.PARAGRAPH
+            return BlockType.ORDERED_LIST if __is_ordered_list(source, start, end) else BlockType.PARAGRAPH
         case _:
             block_type = BlockType.PARAGRAPH
 
     return block_type
 
-def __is_heading(block: str) -> bool:
-    if "\n" in block:
+def __is_heading(source: str, start: int, end: int) -> bool:
+    if source.find('\n', start, end) >= 0:
         # headings must be single line
         return False
-    if len(block) < 3:
+    if end - start < 3:
         return False
-    idx = 1
-    while idx < len(block) and idx < MAX_HEADER_LEVELS and block[idx] == BlockType.HEADING:
+    idx = start + 1
+    while idx < end and idx - start < MAX_HEADER_LEVELS and source[idx] == BlockType.HEADING:
         idx +=1
-    if len(block) < idx + 2:
+    if end < idx + 2:
         # need at least two more characters if this is a heading
         return False
-    return block[idx].isspace() and not block[idx + 1].isspace()
+    return source[idx].isspace() and not source[idx + 1].isspace()
 
-def __is_code(block: str) -> bool:
-    if len(block) < 6:
-        # codeblocks need at least 6 characters
+def __is_code(source: str, start: int, end: int) -> bool:
+    if end - start < 6:
+        # codeblocks need at least 6 characters (counting the newlines)
         return False
-    return block[:3] == block[-3:] == BlockType.CODE * 3
+    return source.startswith(CODE_FENCE, start, end) and source.endswith(CODE_FENCE, start, end)
 
-def __is_quote(block: str) -> bool:
-    for line in block.split('\n'):
-        if not line.startswith(BlockType.QUOTE):
+def __is_ordered_list(source: str, start: int, end: int) -> bool:
+    idx = 1
+    while True:
+        if not source.startswith(ordered_list_marker(idx), start, end):
             return False
-    return True
+        start = source.find('\n', start, end) + 1
+        if start == 0:
+            return True
+        idx += 1
 
-def __is_unordered_list(block: str) -> bool:
-    for line in block.split('\n'):
-        if not line.startswith(BlockType.UNORDERED_LIST + ' '):
-            return False
-    return True
 
-def __is_ordered_list(block: str) -> bool:
-    for idx, line in enumerate(block.split('\n'), start=1):
-        if not line.startswith(f"{idx}. "):
-            return False
-    return True
+@cache
+def ordered_list_marker(idx: int) -> str:
+    return f"{idx}. "
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Block]:
+    """Lazily parse lines (e.g. an open markdown file) into typed blocks."""
+    for block_lines in iter_block_lines(lines):
+        yield Block.from_lines(block_lines)
+
+
+def iter_source_blocks(source: str) -> Iterator[Block]:
+    """Parse a markdown string into typed blocks the way iter_blocks parses its lines,
+    as spans of source rather than copies of its lines."""
+    for match in BLOCK_PATTERN.finditer(source):
+        start, end = match.span()
+        # strip the block, as iter_block_lines does; most blocks have nothing to strip
+        if source[start].isspace():
+            text = NON_SPACE_PATTERN.search(source, start, end)
+            if text is None:
+                continue
+            start = text.start()
+        # back to the last non-whitespace character, which may be lines before end; source[start] is one
+        while source[end - 1].isspace():
+            end -= 1
+        yield Block.of(source, start, end)
+
+
+def markdown_to_html_node(markdown: Union[str, Iterable[str]], urls: UrlResolver = ROOT_URLS) -> ParentNode:
+    """Convert a markdown document, given as a string or as an iterable of lines such as an open file.
+    Root-relative link and image URLs are resolved with urls."""
+    blocks = iter_source_blocks(markdown) if isinstance(markdown, str) else iter_blocks(markdown)
+    return blocks_to_html_node(blocks, urls)
 
-def markdown_to_html_node(markdown: str) -> ParentNode:
-    blocks = markdown_to_blocks(markdown)
+
+def blocks_to_html_node(blocks: Iterable[Block], urls: UrlResolver = ROOT_URLS) -> ParentNode:
     children: list[HTMLNode] = []
     for block in blocks:
-        html_node = block_to_html_node(block)
+        html_node = block_node_to_html_node(block, urls)
         children.append(html_node)
     return ParentNode(Tags.div, children, None)
 
 
-def block_to_html_node(block: str) -> HTMLNode:
-    block_type = block_to_block_type(block)
-    match block_type:
+def block_to_html_node(block: str, urls: UrlResolver = ROOT_URLS) -> HTMLNode:
+    return block_node_to_html_node(Block.of(block), urls)
+
+
+def block_node_to_html_node(block: Block, urls: UrlResolver = ROOT_URLS) -> HTMLNode:
+    match block.type:
         case BlockType.PARAGRAPH:
-            return paragraph_to_html_node(block)
+            return paragraph_to_html_node(block, urls)
         case BlockType.HEADING:
-            return heading_to_html_node(block)
+            return heading_to_html_node(block, urls)
         case BlockType.CODE:
             return code_to_html_node(block)
         case BlockType.ORDERED_LIST:
-            return olist_to_html_node(block)
+            return olist_to_html_node(block, urls)
         case BlockType.UNORDERED_LIST:
-            return ulist_to_html_node(block)
+            return ulist_to_html_node(block, urls)
         case BlockType.QUOTE:
-            return quote_to_html_node(block)
+            return quote_to_html_node(block, urls)
         case _: # This is the catch-all case
-            raise ValueError(f"invalid block type: {block_type}")
+            raise ValueError(f"invalid block type: {block.type}")
 
 
-def text_to_children(text: str) -> list[LeafNode]:
+def text_to_children(text: str, urls: UrlResolver = ROOT_URLS) -> list[LeafNode]:
     text_nodes = text_to_textnodes(text)
     children: list[LeafNode] = []
     for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
+        html_node = text_node_to_html_node(text_node, urls)
         children.append(html_node)
     return children
 
 
-def paragraph_to_html_node(block: str) -> ParentNode:
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
+def _text_to_shared_children(text: str, urls: UrlResolver) -> tuple[LeafNode, ...]:
+    return tuple(text_to_children(text, urls))
+
+
+_inline_cache = lru_cache(maxsize=INLINE_CACHE_SIZE)(_text_to_shared_children)
+
+
+def configure_inline_cache(maxsize: int) -> None:
+    """Memoize up to maxsize distinct inline texts (0 turns the memo off), dropping what is cached."""
+    global _inline_cache
+    _inline_cache = lru_cache(maxsize=maxsize)(_text_to_shared_children)
+
+
+def inline_cache_size() -> int:
+    return _inline_cache.cache_parameters()["maxsize"]
+
+
+def inline_cache_counts() -> tuple[int, int]:
+    """Hits and misses of this process's inline memo so far."""
+    info = _inline_cache.cache_info()
+    return info.hits, info.misses
+
+
+def cached_text_to_children(text: str, urls: UrlResolver = ROOT_URLS) -> list[LeafNode]:
+    """text_to_children, memoized for text repeated within and across pages (boilerplate, nav lists).
+    The leaf nodes are shared between every tree containing the text, so they must not be modified."""
+    return list(_inline_cache(text, urls))
+
+
+def paragraph_to_html_node(block: Block, urls: UrlResolver = ROOT_URLS) -> ParentNode:
+    # joining the lines with spaces is replacing the newlines between them
+    paragraph = block.source[block.start:block.end].replace('\n', ' ')
+    children = cached_text_to_children(paragraph, urls)
     return ParentNode(Tags.p, children)
 
 
-def heading_to_html_node(block: str) -> ParentNode:
+def heading_to_html_node(block: Block, urls: UrlResolver = ROOT_URLS) -> ParentNode:
+    source, start, end = block.source, block.start, block.end
     level = 0
-    for char in block:
-        if char == "#":
-            level += 1
-        else:
-            break
-    if level + 1 >= len(block):
+    while start + level < end and source[start + level] == "#":
+        level += 1
+    if level + 1 >= end - start:
         raise ValueError(f"invalid heading level: {level}")
-    text = block[level + 1 :]
-    children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    text = source[start + level + 1:end]
+    children = cached_text_to_children(text, urls)
+    return ParentNode(HEADING_TAGS.get(level) or f"h{level}", children)
 
 
-def code_to_html_node(block: str) -> ParentNode:
-    if not block.startswith("```") or not block.endswith("```"):
+def code_to_html_node(block: Block) -> ParentNode:
+    source, start, end = block.source, block.start, block.end
+    if not source.startswith(CODE_FENCE, start, end) or not source.endswith(CODE_FENCE, start, end):
         raise ValueError("invalid code block")
-    text = block[4:-3]
+    text = source[start + 4:end - 3]
     raw_text_node = TextNode(text, TextType.TEXT)
     child = text_node_to_html_node(raw_text_node)
     code = ParentNode(Tags.code, [child])
     return ParentNode(Tags.pre, [code])
 
 
-def olist_to_html_node(block: str) -> ParentNode:
-    items = block.split("\n")
+def olist_to_html_node(block: Block, urls: UrlResolver = ROOT_URLS) -> ParentNode:
     html_items: list[ParentNode] = []
-    for item in items:
+    for item in block.lines:
         text = item[3:].strip()
-        children = text_to_children(text)
+        children = cached_text_to_children(text, urls)
         html_items.append(ParentNode(Tags.li, children))
     return ParentNode(Tags.ol, html_items)
 
 
-def ulist_to_html_node(block: str) -> ParentNode:
-    items = block.split("\n")
+def ulist_to_html_node(block: Block, urls: UrlResolver = ROOT_URLS) -> ParentNode:
     html_items: list[ParentNode] = []
-    for item in items:
+    for item in block.lines:
         text = item[2:].strip()
-        children = text_to_children(text)
+        children = cached_text_to_children(text, urls)
         html_items.append(ParentNode(Tags.li, children))
-    return ParentNode("ul", html_items)
+    return ParentNode(Tags.ul, html_items)
 
 
-def quote_to_html_node(block: str) -> ParentNode:
-    lines = block.split("\n")
-    new_lines = [line.lstrip(">").strip() for line in lines]
+def quote_to_html_node(block: Block, urls: UrlResolver = ROOT_URLS) -> ParentNode:
+    new_lines = [line.lstrip(">").strip() for line in block.lines]
     content = " ".join(new_lines)
-    children = text_to_children(content)
+    children = cached_text_to_children(content, urls)
     return ParentNode(Tags.blockquote, children)
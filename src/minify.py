@@ -0,0 +1,227 @@
+from collections import defaultdict
+from dataclasses import dataclass
+import hashlib
+import os
+import re
+from typing import Iterable, Iterator
+
+from file_operations import HASH_CHUNK_SIZE, list_files
+
+
+# a whole element whose whitespace is part of its content, a comment or doctype, or any other tag
+HTML_TAG_PATTERN = re.compile(
+    r"<(?P<preserved>pre|code|textarea|script|style)\b.*?</(?P=preserved)\s*>|<!--.*?-->|<![^>]*>"
+    r"|</?(?P<name>[A-Za-z][\w-]*)[^>]*>",
+    re.DOTALL | re.IGNORECASE,
+)
+# elements that browsers lay out as blocks or don't show at all, so whitespace between two of them never
+# shows; between inline elements (a, b, img, code, ...) it renders as one space
+HTML_BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript", "template",
+    "div", "p", "pre", "blockquote", "hr", "ul", "ol", "li", "dl", "dt", "dd", "figure", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "footer", "nav", "main", "section", "article", "aside",
+    "address", "details", "summary", "form", "fieldset", "legend", "table", "caption", "colgroup", "col",
+    "thead", "tbody", "tfoot", "tr", "th", "td",
+))
+MINIFIABLE_CSS_EXT = ".css"
+# whitespace after these is never needed; before ":" it is, as "a :hover" differs from "a:hover"
+CSS_NO_SPACE_AFTER = frozenset("{};,>:")
+# nor before these; not "+" or "-" either way, which calc() needs spaced out
+CSS_NO_SPACE_BEFORE = frozenset("{};,>")
+
+
+def minify_html(html: str) -> str:
+    """Collapse each run of whitespace between two tags to one space, and drop it between two block-level
+    ones and around the document, outside of pre, code, textarea, script and style.
+    Meant for templates, where that whitespace is indentation; whitespace next to text stays."""
+    parts: list[str] = []
+    end = 0
+    # the document's start, like a block-level tag, needs no whitespace after it
+    previous_is_block = True
+    for match in HTML_TAG_PATTERN.finditer(html):
+        name = match.group("preserved") or match.group("name")
+        is_block = name is None or name.lower() in HTML_BLOCK_TAGS
+        gap = html[end:match.start()]
+        if not gap.isspace():
+            parts.append(gap)
+        elif not (previous_is_block and is_block):
+            parts.append(" ")
+        parts.append(match.group())
+        previous_is_block = is_block
+        end = match.end()
+    parts.append(html[end:])
+    return "".join(parts).strip()
+
+
+class CssMinifier:
+    """Strips comments and needless whitespace from CSS fed to it in chunks of any size.
+    Strings are copied as they are, and a run of whitespace that separates two words becomes one space."""
+
+    def __init__(self):
+        # the quote while inside a string, "*" inside a comment
+        self.state = ""
+        self.escaped = False
+        self.pending_space = False
+        # held back until the next character shows whether it ends a block, which makes it redundant
+        self.pending_semicolon = False
+        self.previous = ""
+        # the end of a chunk that may be half of "/*" or "*/"
+        self.held = ""
+
+    def feed(self, chunk: str) -> str:
+        out: list[str] = []
+        chunk = self.held + chunk
+        self.held = ""
+        i = 0
+        while i < len(chunk):
+            char = chunk[i]
+            if self.state == "*":
+                end = chunk.find("*/", i)
+                if end < 0:
+                    self.held = "*" if chunk.endswith("*") else ""
+                    break
+                self.state = ""
+                # a comment separates like whitespace does
+                self.pending_space = True
+                i = end + 2
+            elif self.state:
+                out.append(char)
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == self.state:
+                    self.state = ""
+                self.previous = char
+                i += 1
+            elif char == "/" and i + 1 == len(chunk):
+                self.held = char
+                break
+            elif char == "/" and chunk[i + 1] == "*":
+                self.state = "*"
+                i += 2
+            elif char.isspace():
+                self.pending_space = True
+                i += 1
+            else:
+                self._emit(out, char)
+                i += 1
+        return "".join(out)
+
+    def _emit(self, out: list[str], char: str) -> None:
+        if self.pending_semicolon:
+            self.pending_semicolon = False
+            if char == "}":
+                self.pending_space = False
+            else:
+                out.append(";")
+                self.previous = ";"
+        if (
+            self.pending_space
+            and self.previous
+            and self.previous not in CSS_NO_SPACE_AFTER
+            and char not in CSS_NO_SPACE_BEFORE
+        ):
+            out.append(" ")
+        self.pending_space = False
+        if char == ";":
+            self.pending_semicolon = True
+            return
+        if char in "\"'":
+            self.state = char
+        out.append(char)
+        self.previous = char
+
+    def finish(self) -> str:
+        """Whatever is still held back once the input has ended."""
+        out: list[str] = []
+        if self.held and self.state != "*":
+            self._emit(out, self.held)
+        if self.pending_semicolon:
+            out.append(";")
+        self.held = ""
+        self.pending_semicolon = False
+        return "".join(out)
+
+
+def minify_css_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    minifier = CssMinifier()
+    for chunk in chunks:
+        yield minifier.feed(chunk)
+    yield minifier.finish()
+
+
+def minify_css(css: str) -> str:
+    return "".join(minify_css_chunks([css]))
+
+
+class CssMinifyTransform:
+    """sync_dir transform writing static CSS files minified, a chunk at a time."""
+    name = "minify-css"
+
+    def applies_to(self, rel_path: str) -> bool:
+        return os.path.splitext(rel_path)[1].lower() == MINIFIABLE_CSS_EXT
+
+    def chunks(self, src_path: str) -> Iterator[str]:
+        with open(src_path) as src:
+            yield from minify_css_chunks(iter(lambda: src.read(HASH_CHUNK_SIZE), ""))
+
+    def write(self, src_path: str, dest_path: str) -> None:
+        with open(dest_path, 'w') as dest:
+            for chunk in self.chunks(src_path):
+                dest.write(chunk)
+
+    def hash(self, src_path: str) -> str:
+        digest = hashlib.sha256()
+        for chunk in self.chunks(src_path):
+            digest.update(chunk.encode())
+        return digest.hexdigest()
+
+
+@dataclass
+class Savings:
+    files: int = 0
+    original: int = 0
+    minified: int = 0
+
+    def __str__(self) -> str:
+        saved = self.original - self.minified
+        percent = saved / self.original * 100 if self.original else 0.0
+        return f"{self.files} files, {self.original} -> {self.minified} bytes ({saved} saved, {percent:.1f}%)"
+
+
+class SavingsReport:
+    """Bytes before and after minification, by file type."""
+
+    def __init__(self):
+        self.by_type: dict[str, Savings] = defaultdict(Savings)
+
+    def add(self, ext: str, original: int, minified: int, files: int = 1) -> None:
+        savings = self.by_type[ext]
+        savings.files += files
+        savings.original += original
+        savings.minified += minified
+
+    def lines(self) -> list[str]:
+        return [f"{ext}: {savings}" for ext, savings in sorted(self.by_type.items())]
+
+
+def minify_savings(static_dir: str, output_dir: str, template_path: str, page_paths: Iterable[str]) -> SavingsReport:
+    """What minification saves across the output: static CSS against its source, and pages by the
+    whitespace left out of their template."""
+    report = SavingsReport()
+    transform = CssMinifyTransform()
+    for rel_path in list_files(static_dir):
+        if transform.applies_to(rel_path):
+            report.add(
+                MINIFIABLE_CSS_EXT,
+                os.path.getsize(os.path.join(static_dir, rel_path)),
+                os.path.getsize(os.path.join(output_dir, rel_path)),
+            )
+    with open(template_path) as f:
+        template = f.read()
+    saved_per_page = len(template.encode()) - len(minify_html(template).encode())
+    for path in page_paths:
+        size = os.path.getsize(path)
+        report.add(".html", size + saved_per_page, size)
+    return report
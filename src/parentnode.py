@@ -1,16 +1,20 @@
-from typing import Optional, Sequence
+from typing import Optional, Sequence, Union
 
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, Writer, escape_props
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
             self,
             tag: str,
             children: Sequence[HTMLNode],
-            props: Optional[dict[str, str]] = None
+            props: Optional[dict[str, str]] = None,
+            escaped: bool = False,
         ):
-        super().__init__(tag=tag, children=children, value=None, props=props)
+        """props are attribute values, escaped here unless escaped says they already are."""
+        super().__init__(tag=tag, children=children, value=None, props=props if escaped else escape_props(props))
 
     def __repr__(self):
         # Representation should focus on the ParentNode's key attributes: tag and children.
@@ -33,9 +37,16 @@ class ParentNode(HTMLNode):
                 f"props={props_repr})")
 
     def to_html(self) -> str:
+        parts: list[str] = []
+        self.render_into(parts)
+        return "".join(parts)
+
+    def _render_step(self, write: Writer, stack: list[Union[HTMLNode, str]]) -> None:
         if not self.tag:
             raise ValueError("Parent nodes need a tag!")
         if self.children is None:
             raise ValueError("Parent nodes need children (even if the list is empty)")
-        return f"<{self.tag}>{''.join(child.to_html() for child in self.children)}</{self.tag}>"
+        write(f"<{self.tag}{self.props_to_html()}>")
+        stack.append(f"</{self.tag}>")
+        stack.extend(reversed(self.children))
 
@@ -0,0 +1,136 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import time
+from typing import Callable, Generic, Iterable, Iterator, TypeVar, Union
+
+import tracing
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+W = TypeVar("W")
+X = TypeVar("X")
+
+READ_THREADS = 4
+WRITE_THREADS = 4
+# items each queue holds at most, read ahead of or waiting behind the CPU stage
+QUEUE_DEPTH = 16
+_END = object()
+
+
+@dataclass
+class QueueMetrics:
+    """How full a queue between two stages was each time the CPU stage took an item from it or added one,
+    and how long the CPU stage waited on it: for the next item to be read, or for room to write."""
+    name: str
+    capacity: int
+    samples: int = 0
+    depth_sum: int = 0
+    peak: int = 0
+    wait_ns: int = 0
+
+    def sample(self, depth: int) -> None:
+        self.samples += 1
+        self.depth_sum += depth
+        self.peak = max(self.peak, depth)
+        tracing.counter(f"{self.name} queue", depth=depth)
+
+    def __str__(self) -> str:
+        mean = self.depth_sum / self.samples if self.samples else 0.0
+        return (
+            f"{self.name} queue: mean depth {mean:.1f}, peak {self.peak} of {self.capacity}, "
+            f"waited {self.wait_ns / 1e6:.1f} ms"
+        )
+
+
+class BoundedQueue(Generic[T]):
+    """In-order queue of the results of work submitted to a thread pool, holding at most capacity of them.
+    Results come out in submission order, whatever order the threads finish in."""
+
+    def __init__(self, executor: ThreadPoolExecutor, metrics: QueueMetrics):
+        self.executor = executor
+        self.metrics = metrics
+        self.futures: deque[Future] = deque()
+
+    def full(self) -> bool:
+        return len(self.futures) >= self.metrics.capacity
+
+    def __len__(self) -> int:
+        return len(self.futures)
+
+    def submit(self, fn: Callable[..., T], *args) -> None:
+        self.futures.append(self.executor.submit(fn, *args))
+
+    def pop(self) -> Union[T, BaseException]:
+        """The oldest result, waiting for it if needed; an exception if the work raised one."""
+        future = self.futures.popleft()
+        start = time.perf_counter_ns()
+        error = future.exception()
+        self.metrics.wait_ns += time.perf_counter_ns() - start
+        return error if error is not None else future.result()
+
+
+def run_pipeline(
+        items: Iterable[T],
+        read: Callable[[T], R],
+        process: Callable[[T, R], W],
+        write: Callable[[T, W], X],
+        metrics: list[QueueMetrics],
+        read_threads: int = READ_THREADS,
+        write_threads: int = WRITE_THREADS,
+        depth: int = QUEUE_DEPTH,
+    ) -> Iterator[tuple[T, Union[X, BaseException]]]:
+    """Read items in a thread pool, process them in the calling thread, and write them in another pool,
+    so reads and writes overlap with processing. Items are processed in order, as few as depth are read
+    ahead or waiting to be written, and each item's result is yielded in order: what write returned,
+    or the exception of the stage that failed. The queue metrics are appended to metrics."""
+    read_metrics = QueueMetrics("read", depth)
+    write_metrics = QueueMetrics("write", depth)
+    metrics.extend([read_metrics, write_metrics])
+    with (
+        ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix="read") as readers,
+        ThreadPoolExecutor(max_workers=write_threads, thread_name_prefix="write") as writers,
+    ):
+        reads: BoundedQueue[R] = BoundedQueue(readers, read_metrics)
+        writes: BoundedQueue[X] = BoundedQueue(writers, write_metrics)
+        # items whose result isn't yielded yet, with the error that stopped them before the write stage
+        pending: deque[tuple[T, Union[BaseException, None]]] = deque()
+        scanned = iter(items)
+        reading: deque[T] = deque()
+
+        def fill() -> None:
+            while not reads.full():
+                item = next(scanned, _END)
+                if item is _END:
+                    return
+                reads.submit(read, item)
+                reading.append(item)
+
+        def drain(until: int) -> Iterator[tuple[T, Union[X, BaseException]]]:
+            """Yield finished results until at most until items are waiting to be written."""
+            while len(writes) > until or (pending and pending[0][1] is not None):
+                item, error = pending.popleft()
+                yield item, error if error is not None else writes.pop()
+
+        fill()
+        while reading:
+            item = reading.popleft()
+            read_metrics.sample(len(reads))
+            data = reads.pop()
+            fill()
+            if isinstance(data, BaseException):
+                pending.append((item, data))
+            else:
+                try:
+                    output = process(item, data)
+                except Exception as e:
+                    pending.append((item, e))
+                else:
+                    if writes.full():
+                        yield from drain(len(writes) - 1)
+                    writes.submit(write, item, output)
+                    write_metrics.sample(len(writes))
+                    pending.append((item, None))
+            yield from drain(len(writes))
+        yield from drain(0)
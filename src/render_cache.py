@@ -0,0 +1,107 @@
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterable, Optional
+
+from file_operations import HASH_CHUNK_SIZE, walk_files
+from manifest import generator_version
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+ENTRY_EXT = ".json"
+
+
+@dataclass(frozen=True)
+class RenderedArticle:
+    """What the markdown pipeline makes of a page: its title and the article HTML."""
+    title: str
+    html: str
+
+
+class RenderCache:
+    """Content-addressed store of rendered articles, keyed by the markdown bytes, URL resolution and generator version.
+    Entries are written atomically and never modified, so several builds may share the directory;
+    a hit refreshes the entry's mtime, which trim() uses to evict the least recently used entries."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def key(self, markdown: bytes, urls_key: str = '/') -> str:
+        """urls_key identifies where URLs point (UrlResolver.key), since they are resolved in the cached HTML."""
+        return self._key([markdown], urls_key)
+
+    def file_key(self, path: str, urls_key: str = '/') -> str:
+        """key of the markdown in the file at path, hashed a chunk at a time."""
+        with open(path, 'rb') as f:
+            return self._key(iter(lambda: f.read(HASH_CHUNK_SIZE), b""), urls_key)
+
+    @staticmethod
+    def _key(chunks: Iterable[bytes], urls_key: str) -> str:
+        digest = hashlib.sha256(generator_version().encode())
+        digest.update(b"\0")
+        digest.update(urls_key.encode())
+        digest.update(b"\0")
+        for chunk in chunks:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ENTRY_EXT)
+
+    def get(self, key: str) -> Optional[RenderedArticle]:
+        path = self.entry_path(key)
+        try:
+            with open(path) as f:
+                article = RenderedArticle(**json.load(f))
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            print(f"Ignoring unreadable render cache entry {path}: {e}")
+            return None
+        return article
+
+    def put(self, key: str, article: RenderedArticle) -> None:
+        path = self.entry_path(key)
+        entry_dir = os.path.dirname(path)
+        os.makedirs(entry_dir, exist_ok=True)
+        # a unique temporary name, so concurrent writers of the same entry can't interleave
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(asdict(article), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def trim(self) -> int:
+        """Delete the least recently used entries until the cache fits max_bytes; returns how many were deleted."""
+        entries: list[tuple[int, int, str]] = []
+        total = 0
+        if not os.path.isdir(self.root):
+            return 0
+        for _, entry in walk_files(self.root):
+            if not entry.name.endswith(ENTRY_EXT):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        deleted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # another build evicted it first
+                pass
+            total -= size
+            deleted += 1
+        return deleted
@@ -0,0 +1,55 @@
+// Client for the search index main.py --search writes next to this file.
+// Only the shards holding the query's terms are fetched, each at most once per page view.
+// Usage: SiteSearch.search("tom bombadil").then(results => ...) with results as [{url, title}].
+const SiteSearch = (() => {
+  const SHARD_PREFIX_LENGTH = 2;
+  const MIN_TERM_LENGTH = 2;
+  const base = new URL(".", document.currentScript.src);
+  const cache = new Map();
+
+  function fetchJson(name) {
+    if (!cache.has(name)) {
+      cache.set(name, fetch(new URL(name, base)).then(response => (response.ok ? response.json() : {})));
+    }
+    return cache.get(name);
+  }
+
+  // the same terms search.py's tokenize finds: runs of letters and digits, lowercased
+  function tokenize(text) {
+    const terms = text.toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+    // lengths in code points, as Python counts them, not UTF-16 units
+    return [...new Set(terms)].filter(term => Array.from(term).length >= MIN_TERM_LENGTH);
+  }
+
+  function shardName(term) {
+    const bytes = new TextEncoder().encode(Array.from(term).slice(0, SHARD_PREFIX_LENGTH).join(""));
+    return Array.from(bytes, byte => byte.toString(16).padStart(2, "0")).join("") + ".json";
+  }
+
+  // postings are stored as the first document id and the gaps after it
+  function decode(deltas) {
+    let total = 0;
+    return deltas.map(delta => (total += delta));
+  }
+
+  async function search(query) {
+    const terms = tokenize(query);
+    if (!terms.length) {
+      return [];
+    }
+    const postings = await Promise.all(
+      terms.map(async term => decode((await fetchJson(shardName(term)))[term] || []))
+    );
+    // pages containing every term
+    postings.sort((a, b) => a.length - b.length);
+    let matches = postings[0];
+    for (const ids of postings.slice(1)) {
+      const other = new Set(ids);
+      matches = matches.filter(id => other.has(id));
+    }
+    const docs = await fetchJson("docs.json");
+    return matches.filter(id => docs[id]).map(id => ({ url: docs[id][0], title: docs[id][1] }));
+  }
+
+  return { search, tokenize };
+})();
@@ -0,0 +1,196 @@
+from array import array
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+import hashlib
+from io import BytesIO, TextIOWrapper
+import json
+import os
+import re
+from typing import Iterable, Optional
+
+from file_operations import Change, ChangeReport, write_if_changed
+from generator import discover_pages, extract_title
+from splitting import INLINE_LINK_PATTERN
+
+
+SEARCH_DIR = "search"
+# 2: text is lowercased before it is split into terms
+SEARCH_INDEX_FORMAT = 2
+# terms are sharded by their first characters, so a query only loads the shards of its own terms
+SHARD_PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+DOCS_FILE = "docs.json"
+LOADER_FILE = "search.js"
+LOADER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), LOADER_FILE)
+# letters and digits; unlike \w without the underscore, which is markdown's italic delimiter
+TERM_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """The distinct search terms in text, lowercased, in order of first appearance.
+    search.js splits queries the same way: lowercasing first, as lowercasing can add combining marks
+    (e.g. "İ" becomes "i" and a combining dot), which then split terms."""
+    terms = dict.fromkeys(TERM_PATTERN.findall(text.lower()))
+    return [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+
+
+def markdown_terms(markdown: str) -> list[str]:
+    """Search terms of a page: its text, and the text of its links and images instead of their URLs."""
+    return tokenize(INLINE_LINK_PATTERN.sub(lambda match: f" {match.group('text')} ", markdown))
+
+
+def shard_name(term: str) -> str:
+    """File name of the shard holding term: the hex UTF-8 bytes of its prefix, which are safe in any URL."""
+    return term[:SHARD_PREFIX_LENGTH].encode().hex() + ".json"
+
+
+def delta_encode(doc_ids: array) -> list[int]:
+    """Sorted document ids as the first id and the gaps after it, which stay small in JSON."""
+    return [doc_id - previous for previous, doc_id in zip([0, *doc_ids], doc_ids)]
+
+
+def delta_decode(deltas: Iterable[int]) -> list[int]:
+    doc_ids: list[int] = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        doc_ids.append(total)
+    return doc_ids
+
+
+@dataclass
+class IndexedPage:
+    """A page as the search index knows it. ids stay with their page, so unchanged pages keep
+    their postings and only the shards of the terms of changed pages are rewritten."""
+    doc_id: int
+    path: str
+    title: str
+    source_hash: str
+    terms: list[str] = field(default_factory=list)
+
+
+@dataclass
+class SearchStats:
+    indexed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    shards: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.indexed} indexed, {self.unchanged} unchanged, {self.removed} removed, {self.shards} shards"
+
+
+def load_search_record(record_path: str) -> tuple[dict[str, IndexedPage], list[str]]:
+    """The pages indexed by the last build by output path, and the index files it wrote."""
+    try:
+        with open(record_path) as f:
+            data = json.load(f)
+        if data["format"] != SEARCH_INDEX_FORMAT:
+            raise ValueError(f"Unsupported search index format {data['format']}")
+        pages = {dest_path: IndexedPage(**page) for dest_path, page in data["pages"].items()}
+        return pages, data["files"]
+    except FileNotFoundError:
+        return {}, []
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring unreadable search index record {record_path}: {e}")
+        return {}, []
+
+
+def page_path(dest_path: str, dest_dir_path: str) -> str:
+    """Root-relative URL path of an output page, directory-style for index pages."""
+    path = "/" + os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    return path.removesuffix("index.html")
+
+
+def update_search_index(
+        dir_path_content: str,
+        dest_dir_path: str,
+        record_path: str,
+        basepath: str,
+        changes: Optional[ChangeReport] = None,
+    ) -> SearchStats:
+    """Bring the inverted index of the pages below dir_path_content, in dest_dir_path/search/, up to date.
+    Only pages whose markdown changed are tokenized again, and shards are only rewritten when their bytes change."""
+    previous, previous_files = load_search_record(record_path)
+    stats = SearchStats()
+    pages: dict[str, IndexedPage] = {}
+    new_pages: list[tuple[str, str, str]] = []
+    discovered = sorted(discover_pages(dir_path_content, dest_dir_path))
+    for from_path, dest_path in discovered:
+        with open(from_path, 'rb') as f:
+            data = f.read()
+        source_hash = hashlib.sha256(data).hexdigest()
+        known = previous.get(dest_path)
+        if known is not None and known.source_hash == source_hash:
+            pages[dest_path] = known
+            stats.unchanged += 1
+        else:
+            # decode the way open() in text mode would have
+            new_pages.append((dest_path, source_hash, TextIOWrapper(BytesIO(data)).read()))
+    stats.removed = len(previous.keys() - {dest_path for _, dest_path in discovered})
+
+    # new pages take the lowest ids no remaining page holds
+    used = {page.doc_id for page in pages.values()}
+    free_ids = (doc_id for doc_id in range(len(used) + len(new_pages)) if doc_id not in used)
+    for (dest_path, source_hash, markdown), doc_id in zip(new_pages, free_ids):
+        path = page_path(dest_path, dest_dir_path)
+        try:
+            title = extract_title(markdown)
+        except ValueError:
+            title = path
+        pages[dest_path] = IndexedPage(doc_id, path, title, source_hash, markdown_terms(markdown))
+        stats.indexed += 1
+
+    postings: dict[str, array] = defaultdict(lambda: array('I'))
+    for page in sorted(pages.values(), key=lambda page: page.doc_id):
+        for term in page.terms:
+            postings[term].append(page.doc_id)
+    shards: dict[str, dict[str, list[int]]] = defaultdict(dict)
+    for term in sorted(postings):
+        shards[shard_name(term)][term] = delta_encode(postings[term])
+
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    # freed ids stay empty until a new page takes them
+    docs: list[Optional[list[str]]] = [None] * (max((page.doc_id for page in pages.values()), default=-1) + 1)
+    for page in pages.values():
+        docs[page.doc_id] = [basepath + page.path[1:], page.title]
+    files = {DOCS_FILE: json.dumps(docs, ensure_ascii=False, separators=(',', ':')).encode()}
+    for name, shard in shards.items():
+        files[name] = json.dumps(shard, ensure_ascii=False, separators=(',', ':')).encode()
+    with open(LOADER_SOURCE, 'rb') as f:
+        files[LOADER_FILE] = f.read()
+    for name, data in sorted(files.items()):
+        change = write_if_changed(os.path.join(search_dir, name), data)
+        if change is not None and changes is not None:
+            changes.record(os.path.join(search_dir, name), change)
+    stats.shards = len(shards)
+
+    remove_search_files(dest_dir_path, set(previous_files) - files.keys(), changes)
+    record = {
+        "format": SEARCH_INDEX_FORMAT,
+        "files": sorted(files),
+        "pages": {dest_path: asdict(page) for dest_path, page in sorted(pages.items())},
+    }
+    write_if_changed(record_path, json.dumps(record, indent=1).encode())
+    return stats
+
+
+def remove_search_index(dest_dir_path: str, record_path: str, changes: Optional[ChangeReport] = None) -> None:
+    """Delete the index an earlier build wrote, along with its record."""
+    if not os.path.exists(record_path):
+        return
+    _, files = load_search_record(record_path)
+    remove_search_files(dest_dir_path, files, changes)
+    os.remove(record_path)
+
+
+def remove_search_files(dest_dir_path: str, names: Iterable[str], changes: Optional[ChangeReport]) -> None:
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    for name in sorted(names):
+        path = os.path.join(search_dir, name)
+        if os.path.isfile(path):
+            os.remove(path)
+            if changes is not None:
+                changes.record(path, Change.REMOVED)
+    if os.path.isdir(search_dir) and not os.listdir(search_dir):
+        os.rmdir(search_dir)
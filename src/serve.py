@@ -0,0 +1,124 @@
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+from typing import Sequence
+from urllib.parse import urlsplit
+
+
+RELOAD_PATH = "/__reload"
+KEEPALIVE_SECONDS = 15
+# reload when one of the changed URLs is the open page, or when everything changed
+RELOAD_SCRIPT = b"""<script>
+new EventSource("%s").onmessage = (event) => {
+  const urls = JSON.parse(event.data);
+  const path = location.pathname.endsWith("/") ? location.pathname + "index.html" : location.pathname;
+  if (urls.includes("*") || urls.includes(path)) location.reload();
+};
+</script>""" % RELOAD_PATH.encode()
+
+
+class ReloadBroadcaster:
+    """Hands lists of changed URLs to every connected browser."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._urls: Sequence[str] = ()
+
+    def publish(self, urls: Sequence[str]) -> None:
+        with self._condition:
+            self._generation += 1
+            self._urls = tuple(urls)
+            self._condition.notify_all()
+
+    @property
+    def generation(self) -> int:
+        with self._condition:
+            return self._generation
+
+    def wait(self, generation: int, timeout: float) -> tuple[int, Sequence[str]]:
+        """Wait until something newer than generation is published; returns the latest generation and its URLs."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._generation != generation, timeout)
+            return self._generation, self._urls
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Serves the output directory under basepath, adding the live reload script to HTML pages."""
+
+    def __init__(self, *args, broadcaster: ReloadBroadcaster, basepath: str = '/', **kwargs):
+        self.broadcaster = broadcaster
+        self.basepath = basepath
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path: str) -> str:
+        if path.startswith(self.basepath):
+            path = "/" + path[len(self.basepath):]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        url_path = urlsplit(self.path).path
+        if url_path == RELOAD_PATH:
+            self.stream_reloads()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self.send_page(path)
+            return
+        super().do_GET()
+
+    def send_page(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            page = f.read()
+        body_end = page.rfind(b"</body>")
+        if body_end == -1:
+            page += RELOAD_SCRIPT
+        else:
+            page = page[:body_end] + RELOAD_SCRIPT + page[body_end:]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(page)
+
+    def stream_reloads(self) -> None:
+        """Server-sent events: one message with the changed URLs per rebuild."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        generation = self.broadcaster.generation
+        try:
+            while True:
+                latest, urls = self.broadcaster.wait(generation, KEEPALIVE_SECONDS)
+                if latest == generation:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    generation = latest
+                    self.wfile.write(f"data: {json.dumps(list(urls))}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        # one line per request drowns the build output
+        pass
+
+
+def start_server(
+        directory: str,
+        port: int,
+        broadcaster: ReloadBroadcaster,
+        basepath: str = '/',
+    ) -> ThreadingHTTPServer:
+    """Serve directory at basepath on localhost from a background thread."""
+    handler = partial(PreviewHandler, directory=directory, broadcaster=broadcaster, basepath=basepath)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,7 +1,8 @@
+from io import StringIO
 from itertools import chain
 import re
-from typing import Callable, Iterable
-from textnode import DELIMITERS, TextNode, TextType
+from typing import Callable, Iterable, Iterator
+from textnode import DELIMITERS, TextNode, TextType, split_query
 
 
 def split_nodes_delimiter(old_nodes: Iterable[TextNode], delimiter: str, text_type: TextType) -> list[TextNode]:
@@ -36,6 +37,14 @@ def extract_markdown_images(text: str) -> list[tuple[str, str]]:
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
     return list(re.findall(r"(?<!!)\[(?P<text>[^\]]+)\]\((?P<link>[^\)]+)\)", text))
 
+def extract_root_relative_urls(text: str) -> list[str]:
+    """Paths of the root-relative links and images in markdown text, without query string or fragment."""
+    return [
+        split_query(match.group("link"))[0]
+        for match in INLINE_LINK_PATTERN.finditer(text)
+        if match.group("link").startswith('/') and not match.group("link").startswith('//')
+    ]
+
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
     return split_nodes(old_nodes, extract_markdown_images, TextType.IMAGE)
@@ -65,16 +74,93 @@ def split_nodes(
             nodes_to_process.insert(0, TextNode(tail, TextType.TEXT))
     return processed_nodes
 
+# delimiters ordered by precedence: earlier ones split the text first, later ones only apply between them
+DELIMITER_PRECEDENCE = {delimiter: idx for idx, delimiter in enumerate(DELIMITERS.values())}
+DELIMITER_TEXT_TYPES = {delimiter: text_type for text_type, delimiter in DELIMITERS.items()}
+DELIMITER_PATTERN = re.compile("|".join(re.escape(delimiter) for delimiter in sorted(DELIMITERS.values(), key=len, reverse=True)))
+INLINE_LINK_PATTERN = re.compile(r"(?P<image>!?)\[(?P<text>[^\]]+)\]\((?P<link>[^\)]+)\)")
+
+
 def text_to_textnodes(text: str) -> list[TextNode]:
-    text_nodes = [TextNode(text, TextType.TEXT)]
-    for text_type, delimiter in DELIMITERS.items():
-        text_nodes = split_nodes_delimiter(text_nodes, delimiter, text_type)
+    """Tokenize inline markdown in a single left-to-right pass.
+    Produces the same nodes as splitting on each of DELIMITERS in turn and then extracting links and images:
+    inside a span, delimiters of lower precedence are literal text, while a delimiter of higher precedence
+    means the span can never be closed."""
+    nodes: list[TextNode] = []
+    open_delimiter = None
+    start = 0
+    for match in DELIMITER_PATTERN.finditer(text):
+        delimiter = match.group()
+        if open_delimiter is None:
+            _append_plain_text(nodes, text[start:match.start()])
+            open_delimiter = delimiter
+            start = match.end()
+        elif delimiter == open_delimiter:
+            nodes.append(TextNode(text[start:match.start()], DELIMITER_TEXT_TYPES[delimiter]))
+            open_delimiter = None
+            start = match.end()
+        elif DELIMITER_PRECEDENCE[delimiter] < DELIMITER_PRECEDENCE[open_delimiter]:
+            _raise_unmatched_delimiter(text, open_delimiter)
+    if open_delimiter is not None:
+        _raise_unmatched_delimiter(text, open_delimiter)
+    _append_plain_text(nodes, text[start:])
+    return nodes
 
-    return split_nodes_image(
-        split_nodes_link(
-            text_nodes
-        )
-    )
+
+def _append_plain_text(nodes: list[TextNode], text: str) -> None:
+    """Append text outside any delimiters, split into links, images and the text between them."""
+    start = 0
+    for match in INLINE_LINK_PATTERN.finditer(text):
+        if match.start() > start:
+            nodes.append(TextNode(text[start:match.start()], TextType.TEXT))
+        text_type = TextType.IMAGE if match.group("image") else TextType.LINK
+        nodes.append(TextNode(match.group("text"), text_type, match.group("link")))
+        start = match.end()
+    if not start:
+        # no links or images: keep the text as it is, even if empty
+        nodes.append(TextNode(text, TextType.TEXT))
+    elif start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+
+
+def _raise_unmatched_delimiter(text: str, delimiter: str) -> None:
+    """Raise the same error the delimiter-by-delimiter split would have raised for text."""
+    text_nodes = [TextNode(text, TextType.TEXT)]
+    for text_type, split_delimiter in DELIMITERS.items():
+        text_nodes = split_nodes_delimiter(text_nodes, split_delimiter, text_type)
+    raise ValueError(UNMATCHED_DELIMITER_ERROR_MSG.format(delimiter=delimiter, text=text))
 
 def markdown_to_blocks(markdown: str) -> list[str]:
-    return [stripped for block in markdown.split("\n\n") if (stripped := block.strip())]
\ No newline at end of file
+    return ["\n".join(block_lines) for block_lines in iter_block_lines(StringIO(markdown))]
+
+
+def iter_block_lines(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Group lines (e.g. of an open file) into the lines of each block, the way markdown_to_blocks splits a string.
+    Blocks are separated by empty lines and stripped; only the current block is held in memory."""
+    block: list[str] = []
+    for line in lines:
+        line = line.removesuffix("\n")
+        if line:
+            block.append(line)
+        elif block:
+            if stripped := strip_block_lines(block):
+                yield stripped
+            block = []
+    if block and (stripped := strip_block_lines(block)):
+        yield stripped
+
+
+def strip_block_lines(block: list[str]) -> list[str]:
+    """The lines of "\n".join(block).strip(), without joining and resplitting them."""
+    start = 0
+    while start < len(block) and block[start].isspace():
+        start += 1
+    end = len(block)
+    while end > start and block[end - 1].isspace():
+        end -= 1
+    if start == end:
+        return []
+    stripped = block[start:end]
+    stripped[0] = stripped[0].lstrip()
+    stripped[-1] = stripped[-1].rstrip()
+    return stripped
\ No newline at end of file
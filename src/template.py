@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+import os
+import re
+from typing import Optional, Protocol, Union
+
+from assets import StaticAssets
+from htmlnode import FragmentSink, fragment_writer
+from minify import minify_html
+from textnode import ROOT_URLS, UrlResolver, split_query
+
+
+class Renderable(Protocol):
+    def render_into(self, out: FragmentSink) -> None: ...
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src)="(/[^"]*)"')
+
+
+def rewrite_urls(html: str, urls: UrlResolver) -> str:
+    """Resolve the root-relative href and src attributes in the template.
+    Content URLs are resolved while the markdown is converted instead, see UrlResolver."""
+    if urls == ROOT_URLS:
+        return html
+    return URL_ATTRIBUTE_PATTERN.sub(lambda match: f'{match.group(1)}="{urls.resolve(match.group(2))}"', html)
+
+
+def referenced_urls(html: str) -> list[str]:
+    """Paths of the root-relative href and src attributes in html, without query string or fragment."""
+    return [
+        split_query(match.group(2))[0]
+        for match in URL_ATTRIBUTE_PATTERN.finditer(html)
+        if not match.group(2).startswith('//')
+    ]
+
+
+@dataclass(frozen=True)
+class Template:
+    """A template split into literal segments around its {{ Name }} placeholders.
+    There is always one more segment than there are slots."""
+    segments: tuple[str, ...]
+    slots: tuple[str, ...]
+
+    @classmethod
+    def compile(
+            cls,
+            text: str,
+            basepath: str = '/',
+            assets: Optional[StaticAssets] = None,
+            minify: bool = False,
+        ) -> "Template":
+        """With minify, the whitespace between the template's tags is dropped once here instead of in every page."""
+        if minify:
+            text = minify_html(text)
+        text = rewrite_urls(text, UrlResolver(basepath, assets))
+        segments: list[str] = []
+        slots: list[str] = []
+        start = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            segments.append(text[start:match.start()])
+            slots.append(match.group(1))
+            start = match.end()
+        segments.append(text[start:])
+        return cls(tuple(segments), tuple(slots))
+
+    def render(self, **values: Union[str, Renderable]) -> str:
+        """The page as one string, for values that are already rendered."""
+        parts: list[str] = []
+        self.render_into(parts, **values)
+        return "".join(parts)
+
+    def render_into(self, out: FragmentSink, **values: Union[str, Renderable]) -> None:
+        """Stream the page into out; values may be strings or nodes rendering themselves into out."""
+        missing = set(self.slots) - values.keys()
+        if missing:
+            raise ValueError(f"No value for template placeholder(s) {', '.join(sorted(missing))}")
+        write = fragment_writer(out)
+        write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values[slot]
+            if isinstance(value, str):
+                write(value)
+            else:
+                value.render_into(out)
+            write(segment)
+
+
+# (path, basepath, assets, minify) -> (mtime_ns, compiled template)
+_template_cache: dict[tuple[str, str, Optional[StaticAssets], bool], tuple[int, Template]] = {}
+
+
+def load_template(
+        path: str,
+        basepath: str = '/',
+        assets: Optional[StaticAssets] = None,
+        minify: bool = False,
+    ) -> Template:
+    """Compile the template at path, reusing the compiled version until the file is modified."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    key = (path, basepath, assets, minify)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    with open(path) as template_file:
+        template = Template.compile(template_file.read(), basepath, assets, minify)
+    _template_cache[key] = (mtime_ns, template)
+    return template
@@ -0,0 +1,98 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from assets import DigestCache, StaticAssets, fingerprint_assets, fingerprint_urls, fingerprinted_path
+from file_operations import Change, ChangeReport, hash_file, write_if_changed
+from minify import CssMinifyTransform
+from template import Template
+
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.record = os.path.join(self.root, ".build", "fingerprints.json")
+        self.output = os.path.join(self.root, "docs")
+        self.css = os.path.join(self.output, "index.css")
+        write_if_changed(self.css, b"body {}")
+        write_if_changed(os.path.join(self.output, "images", "a.png"), b"png")
+        write_if_changed(os.path.join(self.output, "robots.txt"), b"User-agent: *")
+        self.files = ["images/a.png", "index.css", "robots.txt"]
+
+    def fingerprint(self, changes=None) -> dict[str, str]:
+        with redirect_stdout(StringIO()):
+            return fingerprint_assets(self.output, fingerprint_urls(self.output, self.files), self.record, changes)
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprinted_path("css/site.css", "0123456789abcdef"), "css/site.0123456789.css")
+
+    def test_hashed_copies(self):
+        changes = ChangeReport(self.output)
+        assets = self.fingerprint(changes)
+        css_url = "/" + fingerprinted_path("index.css", hash_file(self.css))
+        self.assertEqual(sorted(assets), ["/images/a.png", "/index.css"])
+        self.assertEqual(assets["/index.css"], css_url)
+        with open(os.path.join(self.output, css_url[1:])) as f:
+            self.assertEqual(f.read(), "body {}")
+        self.assertTrue(os.path.exists(self.css))
+        self.assertEqual(changes.paths(Change.ADDED), sorted(url[1:] for url in assets.values()))
+        self.assertEqual(self.fingerprint(), assets)
+
+    def test_changed_asset_replaces_old_copy(self):
+        old = self.fingerprint()
+        write_if_changed(self.css, b"body { margin: 0 }")
+        changes = ChangeReport(self.output)
+        new = self.fingerprint(changes)
+        self.assertNotEqual(new, old)
+        self.assertEqual(changes.changes, {
+            new["/index.css"][1:]: Change.ADDED,
+            old["/index.css"][1:]: Change.REMOVED,
+        })
+        # the hashed copy of the old bytes is gone, the current one holds the new bytes
+        self.assertFalse(os.path.exists(os.path.join(self.output, old["/index.css"][1:])))
+        with open(os.path.join(self.output, new["/index.css"][1:])) as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_digest_cache_hashes_only_changed_files(self):
+        cache_path = os.path.join(self.root, ".build", "digests.json")
+        urls = fingerprint_urls(self.output, self.files, cache=DigestCache(cache_path))
+        self.assertEqual(urls, fingerprint_urls(self.output, self.files))
+
+        with mock.patch("assets.hash_file", wraps=hash_file) as hashed:
+            self.assertEqual(fingerprint_urls(self.output, self.files, cache=DigestCache(cache_path)), urls)
+            self.assertEqual(hashed.call_count, 0)
+            write_if_changed(self.css, b"body { margin: 0 }")
+            urls = fingerprint_urls(self.output, self.files, cache=DigestCache(cache_path))
+            self.assertEqual([call.args[0] for call in hashed.call_args_list], [self.css])
+        self.assertEqual(urls["/index.css"], "/" + fingerprinted_path("index.css", hash_file(self.css)))
+
+    def test_digest_cache_keeps_hashes_per_transform(self):
+        cache_path = os.path.join(self.root, ".build", "digests.json")
+        write_if_changed(self.css, b"body {\n  margin: 0;\n}\n")
+        minified = fingerprint_urls(self.output, self.files, CssMinifyTransform(), DigestCache(cache_path))
+        self.assertEqual(minified, fingerprint_urls(self.output, self.files, CssMinifyTransform()))
+        # the plain hash isn't taken for the minified one, or the other way round
+        self.assertEqual(fingerprint_urls(self.output, self.files, cache=DigestCache(cache_path)), fingerprint_urls(self.output, self.files))
+        self.assertNotEqual(fingerprint_urls(self.output, self.files), minified)
+
+    def test_read_only_digest_cache_is_not_saved(self):
+        cache_path = os.path.join(self.root, ".build", "digests.json")
+        fingerprint_urls(self.output, self.files, cache=DigestCache(cache_path, read_only=True))
+        self.assertFalse(os.path.exists(cache_path))
+
+    def test_template_links_to_hashed_assets(self):
+        assets = StaticAssets({"/index.css": "/index.0123456789.css"})
+        template = Template.compile('<link href="/index.css" /><a href="/about">{{ Content }}</a>', "/site/", assets)
+        self.assertEqual(
+            template.render(Content=""),
+            '<link href="/site/index.0123456789.css" /><a href="/site/about"></a>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
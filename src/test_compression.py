@@ -0,0 +1,59 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compression import MIN_COMPRESS_BYTES, CompressStats, gzip_bytes, precompress_dir, remove_precompressed
+from file_operations import Change, ChangeReport, write_if_changed
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.page = os.path.join(self.root, "blog", "index.html")
+        self.write(self.page, "<p>hello</p>" * 200)
+        self.write(os.path.join(self.root, "index.css"), "body {}" * 300)
+        self.write(os.path.join(self.root, "small.js"), "x")
+        self.write(os.path.join(self.root, "image.png"), "png" * 1000)
+        self.write(os.path.join(self.root, "archive.tar.gz"), "not ours")
+
+    @staticmethod
+    def write(path: str, text: str) -> None:
+        write_if_changed(path, text.encode())
+
+    def test_gzip_bytes(self):
+        data = b"<p>hello</p>" * 100
+        self.assertEqual(gzip.decompress(gzip_bytes(data)), data)
+        self.assertEqual(gzip_bytes(data), gzip_bytes(data))
+
+    def test_only_large_text_files_are_compressed(self):
+        self.assertEqual(precompress_dir(self.root, jobs=2), CompressStats(compressed=2))
+        with gzip.open(self.page + ".gz", 'rt') as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 200)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "small.js.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+        self.assertGreaterEqual(os.path.getsize(os.path.join(self.root, "index.css")), MIN_COMPRESS_BYTES)
+
+    def test_incremental(self):
+        precompress_dir(self.root)
+        self.assertEqual(precompress_dir(self.root), CompressStats(unchanged=2))
+
+        changes = ChangeReport(self.root)
+        self.write(self.page, "<p>changed</p>" * 200)
+        os.remove(os.path.join(self.root, "index.css"))
+        self.assertEqual(precompress_dir(self.root, changes=changes), CompressStats(compressed=1, removed=1))
+        self.assertEqual(changes.changes, {"blog/index.html.gz": Change.CHANGED, "index.css.gz": Change.REMOVED})
+        with gzip.open(self.page + ".gz", 'rt') as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 200)
+
+    def test_remove_precompressed(self):
+        precompress_dir(self.root)
+        self.assertEqual(remove_precompressed(self.root), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "archive.tar.gz")))
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
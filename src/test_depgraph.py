@@ -0,0 +1,104 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import tempfile
+import unittest
+
+from assets import StaticAssets, collect_static_assets, fingerprint_urls
+from depgraph import DependencyGraph, explain
+from file_operations import list_files, sync_dir
+from generator import generate_pages_recursive
+from images import ImageSizeCache
+from manifest import BuildManifest
+from minify import CssMinifyTransform
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_affected(self):
+        graph = DependencyGraph()
+        graph.add("docs/index.html", ["content/index.md", "template.html", "static/index.css"])
+        graph.add("docs/post.html", ["content/post.md", "template.html", "./static/images/a.png"])
+        graph.add("docs/index.css", ["static/index.css"])
+        self.assertEqual(graph.affected(["static/images/a.png"]), {"docs/post.html"})
+        self.assertEqual(graph.affected(["./static/index.css"]), {"docs/index.html", "docs/index.css"})
+        self.assertEqual(graph.affected(["template.html", "content/other.md"]), {"docs/index.html", "docs/post.html"})
+
+        graph.add("docs/post.html", ["content/post.md", "template.html"])
+        self.assertEqual(graph.affected(["static/images/a.png"]), set())
+        graph.remove("docs/index.html")
+        self.assertEqual(graph.affected(["template.html"]), {"docs/post.html"})
+
+
+class TestExplain(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = root = tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.output = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = BuildManifest(os.path.join(root, ".build", "manifest.json"), "", {})
+        os.makedirs(self.content)
+        os.makedirs(self.static)
+        self.write(self.template, '<link href="/index.css" />{{ Content }}')
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        self.assets = StaticAssets(image_sizes={"/a.png": (640, 480)})
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, self.output, '/', self.manifest, assets=self.assets)
+
+    @staticmethod
+    def write(path: str, text: str) -> None:
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def explain(self, path: str, assets: StaticAssets) -> list[str]:
+        return explain(path, self.content, self.static, self.template, self.output, '/', self.manifest, assets)
+
+    def test_up_to_date(self):
+        lines = self.explain(os.path.join(self.output, "index.html"), self.assets)
+        self.assertIn(f"  {os.path.normpath(self.template)}", lines)
+        self.assertIn(f"  {os.path.normpath(os.path.join(self.static, 'index.css'))}", lines)
+        self.assertEqual(lines[-1], "It is up to date.")
+
+    def test_stale_page(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        lines = self.explain(os.path.join(self.output, "index.html"), StaticAssets(image_sizes={"/a.png": (1, 1)}))
+        self.assertEqual(lines[-3:], [
+            "It is stale because:",
+            f"  {os.path.join(self.content, 'index.md')} changed",
+            "  it no longer references /a.png",
+        ])
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        lines = self.explain(os.path.join(self.output, "index.html"), StaticAssets(image_sizes={"/a.png": (1, 1)}))
+        self.assertEqual(lines[-1], "  /a.png changed from 640x480 to 1x1")
+
+    def test_static_output(self):
+        lines = self.explain(os.path.join(self.output, "index.css"), self.assets)
+        self.assertEqual(lines[-2:], ["It is stale because:", "  the output file is missing"])
+        self.assertEqual(len(self.explain(os.path.join(self.output, "other.html"), self.assets)), 1)
+
+    def test_minified_fingerprints(self):
+        # a --minify --fingerprint build fingerprints the minified CSS it synced
+        build = os.path.join(self.root, ".build")
+        with redirect_stdout(StringIO()):
+            sync_dir(self.static, self.output, os.path.join(build, "static.json"), transform=CssMinifyTransform())
+            assets = collect_static_assets(
+                self.static, self.output, ImageSizeCache(os.path.join(build, "images.json")),
+                os.path.join(build, "fingerprints.json"), transform=CssMinifyTransform(),
+            )
+            generate_pages_recursive(self.content, self.template, self.output, '/', self.manifest, assets=assets, minify=True)
+        static_files = list_files(self.static)
+        self.assertNotEqual(fingerprint_urls(self.static, static_files), assets.urls)
+        explained = StaticAssets(fingerprint_urls(self.static, static_files, CssMinifyTransform()))
+        self.assertEqual(explained, assets)
+        lines = explain(
+            os.path.join(self.output, "index.html"), self.content, self.static, self.template, self.output, '/',
+            self.manifest, explained, minify=True,
+        )
+        self.assertEqual(lines[-1], "It is up to date.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import json
+import os
+import tempfile
+from typing import Optional
+import unittest
+from unittest import mock
+
+from file_operations import Change, ChangeReport, StreamingWriter, SyncStats, copy_dir, list_files, sync_dir, walk_tree, write_if_changed
+
+
+class TestSyncDir(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.src = os.path.join(tmp.name, "static")
+        self.dest = os.path.join(tmp.name, "docs")
+        self.record = os.path.join(tmp.name, ".build", "static.json")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png bytes")
+
+    @staticmethod
+    def write(path: str, text: str) -> None:
+        with open(path, 'w') as f:
+            f.write(text)
+
+    @staticmethod
+    def read(path: str) -> str:
+        with open(path) as f:
+            return f.read()
+
+    def sync(self) -> SyncStats:
+        with redirect_stdout(StringIO()):
+            return sync_dir(self.src, self.dest, self.record)
+
+    def test_first_sync_copies_everything(self):
+        self.assertEqual(self.sync(), SyncStats(copied=2))
+        self.assertEqual(self.read(os.path.join(self.dest, "images", "a.png")), "png bytes")
+
+    def test_second_sync_is_a_no_op(self):
+        self.sync()
+        os.utime(self.record, ns=(0, 0))
+        self.assertEqual(self.sync(), SyncStats(unchanged=2))
+        # nor is the unchanged record rewritten
+        self.assertEqual(os.stat(self.record).st_mtime_ns, 0)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.src, "index.css"), "body { color: red }")
+        self.assertEqual(self.sync(), SyncStats(copied=1, unchanged=1))
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body { color: red }")
+
+    def test_touched_file_with_same_content_is_not_copied(self):
+        self.sync()
+        css = os.path.join(self.src, "index.css")
+        os.utime(css, ns=(0, os.stat(css).st_mtime_ns + 1_000_000_000))
+        self.assertEqual(self.sync(), SyncStats(unchanged=2))
+        self.assertEqual(os.stat(css).st_mtime_ns, os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns)
+
+    def test_orphans_are_deleted_but_other_outputs_kept(self):
+        self.sync()
+        page = os.path.join(self.dest, "index.html")
+        self.write(page, "<html></html>")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        self.assertEqual(self.sync(), SyncStats(unchanged=1, deleted=1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_changes_are_reported(self):
+        changes = ChangeReport(self.dest)
+        with redirect_stdout(StringIO()):
+            sync_dir(self.src, self.dest, self.record, changes)
+        self.assertEqual(changes.paths(Change.ADDED), ["images/a.png", "index.css"])
+
+        changes = ChangeReport(self.dest)
+        self.write(os.path.join(self.src, "index.css"), "body { color: red }")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        with redirect_stdout(StringIO()):
+            sync_dir(self.src, self.dest, self.record, changes)
+        self.assertEqual(changes.changes, {"index.css": Change.CHANGED, "images/a.png": Change.REMOVED})
+        self.assertEqual(sorted(os.listdir(self.dest)), ["index.css"])
+
+    def test_missing_source_raises(self):
+        with self.assertRaises(RuntimeError):
+            sync_dir(os.path.join(self.src, "missing"), self.dest, self.record)
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.path = os.path.join(self.root, "out", "page.html")
+
+    def test_write_if_changed(self):
+        self.assertEqual(write_if_changed(self.path, b"<p>one</p>"), Change.ADDED)
+        os.utime(self.path, ns=(0, 0))
+        self.assertIsNone(write_if_changed(self.path, b"<p>one</p>"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertEqual(write_if_changed(self.path, b"<p>two</p>"), Change.CHANGED)
+        self.assertEqual(write_if_changed(self.path, b"<p>three</p>"), Change.CHANGED)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b"<p>three</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+
+    def stream(self, *pieces: str, chunk_size: int = 4) -> Optional[Change]:
+        with mock.patch("file_operations.HASH_CHUNK_SIZE", chunk_size), StreamingWriter(self.path) as out:
+            for piece in pieces:
+                out.write(piece)
+        return out.change
+
+    def test_streaming_writer(self):
+        self.assertEqual(self.stream("<p>", "one", "</p>"), Change.ADDED)
+        os.utime(self.path, ns=(0, 0))
+        self.assertIsNone(self.stream("<p>o", "ne</p>"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        # differing after the first chunks compared, shorter, and longer than the file
+        for pieces in (("<p>one", "", "</b>"), ("<p>", "on"), ("<p>", "one</p>", "<p>two</p>")):
+            with self.subTest(pieces=pieces):
+                self.assertEqual(self.stream(*pieces), Change.CHANGED)
+                with open(self.path) as f:
+                    self.assertEqual(f.read(), "".join(pieces))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+
+    def test_streaming_writer_keeps_the_file_on_errors(self):
+        write_if_changed(self.path, b"<p>one</p>")
+        with self.assertRaises(ValueError), StreamingWriter(self.path) as out:
+            out.write("<p>two</p>" * 10000)
+            raise ValueError("rendering failed")
+        self.assertIsNone(out.change)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>one</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+
+    def test_change_report(self):
+        changes = ChangeReport(self.root)
+        changes.record(os.path.join(self.root, "a.html"), Change.REMOVED)
+        changes.record(os.path.join(self.root, "a.html"), Change.ADDED)
+        changes.record(os.path.join(self.root, "b", "c.html"), Change.ADDED)
+        changes.record(os.path.join(self.root, "b", "c.html"), Change.CHANGED)
+        changes.record(os.path.join(self.root, "d.css"), Change.REMOVED)
+        self.assertEqual(str(changes), "1 added, 1 changed, 1 removed")
+        report_path = os.path.join(self.root, "changes.json")
+        changes.save(report_path)
+        with open(report_path) as f:
+            self.assertEqual(json.load(f), {"added": ["b/c.html"], "changed": ["a.html"], "removed": ["d.css"]})
+
+
+class TestWalkTree(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.src = os.path.join(self.root, "src")
+        for rel_path in ("b.txt", "a/z.txt", "a/c/d.txt", "c.txt"):
+            write_if_changed(os.path.join(self.src, rel_path), rel_path.encode())
+        os.makedirs(os.path.join(self.src, "e"))
+
+    def test_sorted_depth_first(self):
+        walked = [(rel_path, entry.is_dir()) for rel_path, entry in walk_tree(self.src)]
+        join = os.path.join
+        self.assertEqual(walked, [
+            ("a", True), (join("a", "c"), True), (join("a", "c", "d.txt"), False), (join("a", "z.txt"), False),
+            ("b.txt", False), ("c.txt", False), ("e", True),
+        ])
+        self.assertEqual(list_files(self.src), [join("a", "c", "d.txt"), join("a", "z.txt"), "b.txt", "c.txt"])
+
+    def test_copy_dir_keeps_empty_directories(self):
+        dest = os.path.join(self.root, "dest")
+        with redirect_stdout(StringIO()):
+            copy_dir(self.src, dest)
+        self.assertEqual(list_files(dest), list_files(self.src))
+        self.assertTrue(os.path.isdir(os.path.join(dest, "e")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,22 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import tempfile
 import unittest
+from unittest import mock
 
-from generator import extract_title
+from file_operations import Change, ChangeReport
+from generator import (
+    PageGenerationError,
+    TitleScanner,
+    discover_pages,
+    extract_title,
+    generate_pages,
+    generate_pages_recursive,
+    parse_article,
+)
+from markdown_blocks import block_node_to_html_node
+from textnode import ROOT_URLS
 from testscenarios import ErrorRaisingScenario, StringConversionScenario, run_subtest_cases_equal, run_subtest_cases_error
 
 
@@ -46,3 +62,104 @@ class TestBlockToBlockType(unittest.TestCase):
             for markup in markups
         }
         run_subtest_cases_error(self, extract_title, test_cases)
+
+    def test_title_scanner(self):
+        for markdown in ("# Title\n\ntext", "intro\n# C# Programming\n# Second", "## Sub\n#  Spaced \n"):
+            with self.subTest(markdown=markdown):
+                lines = TitleScanner(StringIO(markdown))
+                self.assertEqual(list(lines), StringIO(markdown).readlines())
+                self.assertEqual(lines.title, extract_title(markdown))
+
+        lines = TitleScanner(StringIO("## no title\ntext"))
+        list(lines)
+        self.assertIsNone(lines.title)
+
+    def test_parse_article_converts_blocks_as_lines_are_read(self):
+        read: list[str] = []
+
+        def lines():
+            for line in ("# Title\n", "\n", "text\n", "\n", "- a\n", "- b\n"):
+                read.append(line)
+                yield line
+
+        lines_read_per_block: list[int] = []
+
+        def convert(*args):
+            lines_read_per_block.append(len(read))
+            return block_node_to_html_node(*args)
+
+        with mock.patch("generator.block_node_to_html_node", convert):
+            title, root = parse_article(lines(), "page.md", ROOT_URLS)
+        self.assertEqual(title, "Title")
+        self.assertEqual(root.to_html(), "<div><h1>Title</h1><p>text</p><ul><li>a</li><li>b</li></ul></div>")
+        # each block is converted once the empty line after it is read, not after the whole file
+        self.assertEqual(lines_read_per_block, [2, 4, 6])
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, 'w') as f:
+            f.write("<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}")
+        for idx in range(6):
+            page_dir = os.path.join(self.content, f"page{idx}")
+            os.makedirs(page_dir)
+            with open(os.path.join(page_dir, "index.md"), 'w') as f:
+                f.write(f"# Page {idx}\n\nSome **bold** text and a [link](/page{idx}/)")
+
+    def build(self, dest_dir: str, jobs: int) -> dict[str, str]:
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, dest_dir, "/base/", jobs=jobs)
+        outputs: dict[str, str] = {}
+        for _, dest_path in discover_pages(self.content, dest_dir):
+            with open(dest_path) as f:
+                outputs[os.path.relpath(dest_path, dest_dir)] = f.read()
+        return outputs
+
+    def test_parallel_matches_serial(self):
+        serial = self.build(os.path.join(self.root, "serial"), jobs=1)
+        parallel = self.build(os.path.join(self.root, "parallel"), jobs=3)
+        self.assertEqual(len(serial), 6)
+        self.assertEqual(serial, parallel)
+
+    def test_errors_are_collected_in_page_order(self):
+        for idx in (4, 1):
+            with open(os.path.join(self.content, f"page{idx}", "index.md"), 'w') as f:
+                f.write("no title here")
+        pages = sorted(discover_pages(self.content, os.path.join(self.root, "out")))
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                with redirect_stdout(StringIO()):
+                    errors = generate_pages(pages, self.template, "/", jobs)
+                self.assertEqual([error is not None for error in errors], [False, True, False, False, True, False])
+                self.assertTrue(all(isinstance(error, ValueError) for error in errors if error is not None))
+
+    def test_unchanged_outputs_are_not_rewritten(self):
+        dest_dir = os.path.join(self.root, "out")
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                changes = ChangeReport(dest_dir)
+                with redirect_stdout(StringIO()):
+                    generate_pages_recursive(self.content, self.template, dest_dir, "/", jobs=jobs, changes=changes)
+                expected = {} if jobs > 1 else {f"page{idx}/index.html": Change.ADDED for idx in range(6)}
+                self.assertEqual(changes.changes, expected)
+
+        with open(os.path.join(self.content, "page3", "index.md"), 'a') as f:
+            f.write("\n\nmore")
+        changes = ChangeReport(dest_dir)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, dest_dir, "/", jobs=3, changes=changes)
+        self.assertEqual(changes.changes, {"page3/index.html": Change.CHANGED})
+
+    def test_failures_are_raised_after_other_pages_are_written(self):
+        with open(os.path.join(self.content, "page2", "index.md"), 'w') as f:
+            f.write("no title here")
+        dest_dir = os.path.join(self.root, "out")
+        with redirect_stdout(StringIO()), self.assertRaises(PageGenerationError) as cm:
+            generate_pages_recursive(self.content, self.template, dest_dir, "/", jobs=2)
+        self.assertEqual([path for path, _ in cm.exception.failures], [os.path.join(self.content, "page2", "index.md")])
+        self.assertTrue(os.path.exists(os.path.join(dest_dir, "page5", "index.html")))
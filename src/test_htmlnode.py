@@ -1,6 +1,15 @@
 import unittest
 
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, configure_subtree_memo, subtree_memo_counts, subtree_memo_size
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+def page(item: str) -> ParentNode:
+    return ParentNode("div", [
+        ParentNode("ul", [ParentNode("li", [LeafNode(None, "one")]), ParentNode("li", [LeafNode("b", item)])]),
+        ParentNode("p", [LeafNode("a", "home", {"href": "/"})]),
+    ])
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -43,3 +52,70 @@ class TestHTMLNode(unittest.TestCase):
         # set both
         html_node = HTMLNode(value="some text", children=[HTMLNode(), HTMLNode()])
         self.assertEqual(html_node.validate(), True)
+
+
+class TestFrozenNodes(unittest.TestCase):
+    def setUp(self):
+        size = subtree_memo_size()
+        self.addCleanup(configure_subtree_memo, size)
+
+    def test_freeze(self):
+        original = page("two")
+        node = original.freeze()
+        self.assertIsInstance(node.children, tuple)
+        self.assertIsInstance(node, ParentNode)
+        self.assertEqual(node.to_html(), original.to_html())
+        # a copy: the original stays mutable and has no room for a hash
+        self.assertIsInstance(original.children, list)
+        self.assertFalse(hasattr(original, "_digest"))
+        self.assertIs(node.freeze(), node)
+        with self.assertRaises(TypeError):
+            node.children[1].children[0].props["href"] = "/elsewhere"
+        with self.assertRaises(ValueError):
+            page("two").structural_hash()
+
+    def test_structural_hash(self):
+        self.assertEqual(page("two").freeze().structural_hash(), page("two").freeze().structural_hash())
+        self.assertNotEqual(page("two").freeze().structural_hash(), page("three").freeze().structural_hash())
+        # props render in order, so their order is part of the structure
+        a = LeafNode("a", "x", {"href": "/", "title": "t"}).freeze()
+        b = LeafNode("a", "x", {"title": "t", "href": "/"}).freeze()
+        self.assertNotEqual(a.structural_hash(), b.structural_hash())
+        self.assertNotEqual(LeafNode("b", "None").freeze().structural_hash(), HTMLNode("b").freeze().structural_hash())
+
+    def test_structural_hash_has_no_collisions_across_fields(self):
+        # pairs that joining fields with separators, or marking None with a control character, hashed alike
+        pairs = [
+            (LeafNode("a", "x", {"href": "b\0title\0c"}, escaped=True), LeafNode("a", "x", {"href": "b", "title": "c"}, escaped=True)),
+            (LeafNode("b", None), LeafNode("b", "\x01")),
+            (LeafNode("b\0c", "d"), LeafNode("b", "c\0d")),
+            (HTMLNode("p", None, None, {}), HTMLNode("p", None, None, None)),
+            (ParentNode("p", []), HTMLNode("p", None, None, None)),
+        ]
+        for first, second in pairs:
+            with self.subTest(first=first, second=second):
+                self.assertNotEqual(first.freeze().structural_hash(), second.freeze().structural_hash())
+                self.assertNotEqual(first.freeze(), second.freeze())
+
+    def test_equality(self):
+        self.assertEqual(page("two").freeze(), page("two").freeze())
+        self.assertNotEqual(page("two").freeze(), page("three").freeze())
+        # frozen or not, with tuple or list children
+        self.assertEqual(page("two").freeze(), page("two"))
+        self.assertNotEqual(page("two"), page("three").freeze())
+
+    def test_memoized_rendering(self):
+        configure_subtree_memo(16)
+        expected = page("two").to_html()
+        self.assertEqual(page("two").freeze().to_html(), expected)
+        self.assertEqual(subtree_memo_counts(), (0, 5))
+        self.assertEqual(page("two").freeze().to_html(), expected)
+        self.assertEqual(subtree_memo_counts(), (1, 5))
+        # a changed item misses, as do the list and the page holding it; the other item and the paragraph hit
+        html = page("three").freeze().to_html()
+        self.assertEqual(html, page("three").to_html())
+        self.assertEqual(subtree_memo_counts(), (3, 8))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import images
+from file_operations import write_if_changed
+from images import ImageSizeCache, image_sizes, read_image_size
+
+
+def png(width: int, height: int) -> bytes:
+    return images.PNG_SIGNATURE + struct.pack(">I4sII", 13, b"IHDR", width, height) + bytes(5)
+
+
+def jpeg(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + bytes(9)
+    # a huffman table segment uses a C-range marker too, but carries no size
+    dht = b"\xff\xc4" + struct.pack(">H", 5) + b"\xff\xff\xff"
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return images.JPEG_SOI + app0 + dht + b"\xff" + sof + b"\xff\xd9"
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.static = os.path.join(self.root, "static")
+
+    def write(self, rel_path: str, data: bytes) -> str:
+        path = os.path.join(self.static, rel_path)
+        write_if_changed(path, data)
+        return path
+
+    def test_read_image_size(self):
+        self.assertEqual(read_image_size(self.write("a.png", png(640, 480))), (640, 480))
+        self.assertEqual(read_image_size(self.write("a.gif", b"GIF89a" + struct.pack("<HH", 32, 16) + bytes(8))), (32, 16))
+        self.assertEqual(read_image_size(self.write("a.jpg", jpeg(1024, 768))), (1024, 768))
+        self.assertIsNone(read_image_size(self.write("a.txt", b"not an image")))
+        self.assertIsNone(read_image_size(self.write("b.jpg", jpeg(1, 1)[:30])))
+
+    def test_sizes_are_cached_by_hash(self):
+        self.write("images/a.png", png(640, 480))
+        self.write("images/copy.png", png(640, 480))
+        self.write("images/broken.png", b"oops")
+        self.write("index.css", b"body {}")
+        files = ["images/a.png", "images/broken.png", "images/copy.png", "index.css"]
+        cache_path = os.path.join(self.root, ".build", "images.json")
+        sizes = {"/images/a.png": (640, 480), "/images/copy.png": (640, 480)}
+
+        with mock.patch("images.read_image_size", wraps=read_image_size) as read:
+            self.assertEqual(image_sizes(self.static, files, ImageSizeCache(cache_path)), sizes)
+            # identical bytes are only parsed once
+            self.assertEqual(read.call_count, 2)
+            self.assertEqual(image_sizes(self.static, files, ImageSizeCache(cache_path)), sizes)
+            self.assertEqual(read.call_count, 2)
+
+            # same length; a different mtime is what tells the cache to hash it again
+            os.utime(self.write("images/a.png", png(320, 240)), ns=(1, 1))
+            cache = ImageSizeCache(cache_path)
+            self.assertEqual(image_sizes(self.static, files[:2], cache)["/images/a.png"], (320, 240))
+            self.assertEqual(read.call_count, 3)
+        # entries of files that are gone don't linger
+        self.assertEqual(len(ImageSizeCache(cache_path).sizes), 2)
+
+    def test_read_only_cache_is_not_saved(self):
+        self.write("a.png", png(2, 1))
+        cache_path = os.path.join(self.root, ".build", "images.json")
+        self.assertEqual(image_sizes(self.static, ["a.png"], ImageSizeCache(cache_path, read_only=True)), {"/a.png": (2, 1)})
+        self.assertFalse(os.path.exists(cache_path))
+
+        image_sizes(self.static, ["a.png"], ImageSizeCache(cache_path))
+        with open(cache_path, 'rb') as f:
+            saved = f.read()
+        self.write("b.png", png(4, 3))
+        image_sizes(self.static, ["a.png", "b.png"], ImageSizeCache(cache_path, read_only=True))
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), saved)
+
+
+if __name__ == "__main__":
+    unittest.main()
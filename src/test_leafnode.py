@@ -16,3 +16,28 @@ class TestLeafNode(unittest.TestCase):
 
         node = LeafNode.text_only(value="Hello, world!")
         self.assertEqual(node.to_html(), "Hello, world!")
+
+    def test_text_and_attributes_are_escaped(self):
+        node = LeafNode("a", 'Tom & "Jerry" <3', props={"href": '/search?q="a"&b=<c>'})
+        self.assertEqual(
+            node.to_html(),
+            '<a href="/search?q=&quot;a&quot;&amp;b=&lt;c&gt;">Tom &amp; "Jerry" &lt;3</a>',
+        )
+
+    def test_text_without_special_characters_is_kept(self):
+        text = "Nothing to escape here."
+        props = {"href": "/about/"}
+        node = LeafNode("a", text, props=props)
+        self.assertIs(node.value, text)
+        self.assertIs(node.props, props)
+
+    def test_props_are_copied_only_when_a_value_is_escaped(self):
+        props = {"href": "/about/", "title": 'Tom & "Jerry"'}
+        node = LeafNode("a", "about", props=props)
+        self.assertEqual(node.props, {"href": "/about/", "title": "Tom &amp; &quot;Jerry&quot;"})
+        self.assertEqual(props["title"], 'Tom & "Jerry"')
+
+    def test_escaped_values_are_not_escaped_again(self):
+        node = LeafNode("p", "a &lt; b", escaped=True)
+        self.assertEqual(node.to_html(), "<p>a &lt; b</p>")
+        self.assertEqual(LeafNode("p", "a &lt; b").to_html(), "<p>a &amp;lt; b</p>")
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from generator import generate_pages_recursive
+from manifest import BuildManifest
+
+
+TEMPLATE = "<title>{{ Title }}</title><article>{{ Content }}</article>"
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.output = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest_path = os.path.join(root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+
+    @staticmethod
+    def write(path: str, text: str) -> None:
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def build(self) -> str:
+        """Run an incremental build and return its log."""
+        log = StringIO()
+        with redirect_stdout(log):
+            manifest = BuildManifest.load(self.manifest_path)
+            generate_pages_recursive(self.content, self.template, self.output, '/', manifest)
+        return log.getvalue()
+
+    def test_unchanged_pages_are_skipped(self):
+        self.assertIn("2 pages generated, 0 unchanged, 0 removed.", self.build())
+        self.assertIn("0 pages generated, 2 unchanged, 0 removed.", self.build())
+
+    def test_changed_source_is_regenerated(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome back")
+        self.assertIn("1 pages generated, 1 unchanged, 0 removed.", self.build())
+        with open(os.path.join(self.output, "index.html")) as f:
+            self.assertIn("Welcome back", f.read())
+
+    def test_changed_template_regenerates_everything(self):
+        self.build()
+        self.write(self.template, TEMPLATE + "<footer></footer>")
+        self.assertIn("2 pages generated, 0 unchanged, 0 removed.", self.build())
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.output, "index.html"))
+        self.assertIn("1 pages generated, 1 unchanged, 0 removed.", self.build())
+
+    def test_deleted_source_output_is_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertIn("0 pages generated, 1 unchanged, 1 removed.", self.build())
+        self.assertFalse(os.path.exists(os.path.join(self.output, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.output, "index.html")))
+
+    def test_corrupt_manifest_means_full_build(self):
+        self.build()
+        self.write(self.manifest_path, "{not json")
+        self.assertIn("2 pages generated, 0 unchanged, 0 removed.", self.build())
+
+
+if __name__ == "__main__":
+    unittest.main()
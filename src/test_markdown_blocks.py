@@ -1,10 +1,24 @@
+from io import StringIO
 import unittest
 
 from htmlnode import HTMLNode, Tags
 from leafnode import LeafNode
-from markdown_blocks import BlockType, block_to_block_type, block_to_html_node, text_to_children
+from markdown_blocks import (
+    INLINE_CACHE_SIZE,
+    BlockType,
+    block_to_block_type,
+    block_to_html_node,
+    cached_text_to_children,
+    configure_inline_cache,
+    inline_cache_counts,
+    iter_blocks,
+    iter_source_blocks,
+    markdown_to_html_node,
+    text_to_children,
+)
 from parentnode import ParentNode
 from testscenarios import StringConversionScenario, run_subtest_cases_equal
+from textnode import UrlResolver
 
 
 class TestBlockToBlockType(unittest.TestCase):
@@ -391,5 +405,104 @@ class TestMarkupToHTML(unittest.TestCase):
         run_subtest_cases_equal(self, block_to_html_node, test_cases)
 
 
+class TestStreamingBlocks(unittest.TestCase):
+    MARKDOWN = "# Title\n\n  Some **text**\non two lines  \n\n\n- one\n- two\n\n```\ncode\n```\n"
+
+    def test_iter_blocks(self):
+        expected = [
+            (BlockType.HEADING, ["# Title"]),
+            (BlockType.PARAGRAPH, ["Some **text**", "on two lines"]),
+            (BlockType.UNORDERED_LIST, ["- one", "- two"]),
+            (BlockType.CODE, ["```", "code", "```"]),
+        ]
+        self.assertEqual([(block.type, block.lines) for block in iter_blocks(StringIO(self.MARKDOWN))], expected)
+        self.assertEqual([(block.type, block.lines) for block in iter_source_blocks(self.MARKDOWN)], expected)
+
+    def test_source_blocks_are_spans_of_the_source(self):
+        blocks = list(iter_source_blocks(self.MARKDOWN))
+        self.assertTrue(all(block.source is self.MARKDOWN for block in blocks))
+        self.assertEqual(self.MARKDOWN[blocks[1].start:blocks[1].end], "Some **text**\non two lines")
+
+    def test_whitespace_only_last_line_is_stripped(self):
+        cases = {
+            "list": ("# T\n\n- a\n- b\n  \n\nPara", BlockType.UNORDERED_LIST, ["- a", "- b"], "<ul><li>a</li><li>b</li></ul>"),
+            "code": ("```\ncode\n```\n \t\n\nPara", BlockType.CODE, ["```", "code", "```"], "<pre><code>code\n</code></pre>"),
+        }
+        for name, (markdown, block_type, lines, html) in cases.items():
+            with self.subTest(name):
+                source_blocks = [(block.type, block.lines) for block in iter_source_blocks(markdown)]
+                self.assertIn((block_type, lines), source_blocks)
+                self.assertEqual(source_blocks, [(block.type, block.lines) for block in iter_blocks(StringIO(markdown))])
+                self.assertIn(html, markdown_to_html_node(markdown).to_html())
+
+    def test_iter_blocks_is_lazy(self):
+        def lines():
+            yield "# Title\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        block = next(iter_blocks(lines()))
+        self.assertEqual((block.type, block.lines), (BlockType.HEADING, ["# Title"]))
+
+    def test_basepath_resolves_urls_only(self):
+        markdown = (
+            "# [Home](/)\n\nSee ![map](/map.png) and `<a href=\"/x\">`\n\n"
+            "```\n<img src=\"/literal.png\">\n```\n\n- [abs](https://example.com/)\n"
+        )
+        self.assertEqual(
+            markdown_to_html_node(markdown, UrlResolver("/site/")).to_html(),
+            '<div><h1><a href="/site/">Home</a></h1>'
+            '<p>See <img src="/site/map.png" alt="map"></img> and <code>&lt;a href="/x"&gt;</code></p>'
+            '<pre><code>&lt;img src="/literal.png"&gt;\n</code></pre>'
+            '<ul><li><a href="https://example.com/">abs</a></li></ul></div>',
+        )
+
+    def test_text_is_escaped_once(self):
+        markdown = "# Fish & Chips\n\nIf a < b, **b > a**.\n\n```\nif a < b:\n```\n"
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><h1>Fish &amp; Chips</h1><p>If a &lt; b, <b>b &gt; a</b>.</p>"
+            "<pre><code>if a &lt; b:\n</code></pre></div>",
+        )
+
+    def test_markdown_to_html_node_from_lines(self):
+        self.assertEqual(
+            markdown_to_html_node(StringIO(self.MARKDOWN)).to_html(),
+            markdown_to_html_node(self.MARKDOWN).to_html(),
+        )
+
+
+class TestInlineMemo(unittest.TestCase):
+    def setUp(self):
+        configure_inline_cache(INLINE_CACHE_SIZE)
+        self.addCleanup(configure_inline_cache, INLINE_CACHE_SIZE)
+
+    def test_memoized_children(self):
+        text = "Back to [top](#top), **now**"
+        self.assertEqual(cached_text_to_children(text), text_to_children(text))
+        first = cached_text_to_children(text)
+        second = cached_text_to_children(text)
+        # separate lists sharing the same leaf nodes
+        self.assertIsNot(first, second)
+        self.assertTrue(all(a is b for a, b in zip(first, second)))
+        self.assertEqual(inline_cache_counts(), (2, 1))
+
+    def test_repeated_text_in_document(self):
+        markdown = "Disclaimer\n\n- Disclaimer\n\n> Disclaimer\n\nDisclaimer\n"
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(
+            html,
+            "<div><p>Disclaimer</p><ul><li>Disclaimer</li></ul>"
+            "<blockquote>Disclaimer</blockquote><p>Disclaimer</p></div>",
+        )
+        self.assertEqual(inline_cache_counts(), (3, 1))
+
+    def test_memo_off(self):
+        configure_inline_cache(0)
+        cached_text_to_children("same")
+        cached_text_to_children("same")
+        self.assertEqual(inline_cache_counts(), (0, 2))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+from contextlib import redirect_stdout
+import gzip
+from io import StringIO
+import os
+import tempfile
+import unittest
+
+from compression import precompress_dir
+from file_operations import sync_dir, write_if_changed
+from minify import CssMinifier, CssMinifyTransform, SavingsReport, minify_css, minify_html
+from template import Template
+
+CSS = """/* site styles */
+body {
+  font-family: "Open  Sans", serif;
+  margin: 0 auto;
+}
+
+h1,
+h2 > a:hover,
+p :first-child {
+  width: calc(100% - 2px);  /* keep
+  the gutter */
+  content: "a;b}";
+}
+"""
+MINIFIED_CSS = 'body{font-family:"Open  Sans",serif;margin:0 auto}h1,h2>a:hover,p :first-child{width:calc(100% - 2px);content:"a;b}"}'
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_whitespace_between_tags(self):
+        html = "\n<html>\n  <body>\n    <p>Two  words <b>bold</b></p>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html), "<html><body><p>Two  words <b>bold</b></p></body></html>")
+
+    def test_preformatted_content_is_kept(self):
+        html = "<div>\n  <pre><code>if x:\n    <span>y</span>\n</code></pre>\n  <code> <i>a</i> </code>\n</div>"
+        self.assertEqual(
+            minify_html(html),
+            "<div><pre><code>if x:\n    <span>y</span>\n</code></pre> <code> <i>a</i> </code> </div>",
+        )
+
+    def test_whitespace_between_inline_elements_is_collapsed(self):
+        html = '<nav>\n  <a href="/">Home</a>\n  <a href="/blog/">Blog</a>\n</nav>\n<p><b>bold</b>\n\t<i>italic</i></p>'
+        self.assertEqual(
+            minify_html(html),
+            '<nav> <a href="/">Home</a> <a href="/blog/">Blog</a> </nav><p><b>bold</b> <i>italic</i></p>',
+        )
+        self.assertEqual(
+            minify_html("<!DOCTYPE html>\n<html>\n<!-- nav -->\n<body></body></html>"),
+            "<!DOCTYPE html><html><!-- nav --><body></body></html>",
+        )
+
+    def test_minified_template(self):
+        text = '<head>\n  <link href="/a.css" />\n</head>\n<body>\n  {{ Content }}\n</body>\n'
+        template = Template.compile(text, "/site/", minify=True)
+        self.assertEqual(
+            template.render(Content="<p>x</p>"),
+            '<head><link href="/site/a.css" /></head><body>\n  <p>x</p>\n</body>',
+        )
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_minify(self):
+        self.assertEqual(minify_css(CSS), MINIFIED_CSS)
+
+    def test_any_chunking_gives_the_same_output(self):
+        for size in range(1, 12):
+            minifier = CssMinifier()
+            out = [minifier.feed(CSS[start:start + size]) for start in range(0, len(CSS), size)]
+            out.append(minifier.finish())
+            self.assertEqual("".join(out), MINIFIED_CSS, f"chunks of {size}")
+
+    def test_savings_report(self):
+        report = SavingsReport()
+        report.add(".css", 200, 150)
+        report.add(".css", 100, 50)
+        self.assertEqual(report.lines(), [".css: 2 files, 300 -> 200 bytes (100 saved, 33.3%)"])
+
+
+class TestSyncMinified(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = tmp.name
+        self.static = os.path.join(root, "static")
+        self.output = os.path.join(root, "docs")
+        self.record = os.path.join(root, ".build", "static.json")
+        write_if_changed(os.path.join(self.static, "index.css"), CSS.encode())
+        write_if_changed(os.path.join(self.static, "robots.txt"), b"User-agent: *\n")
+
+    def sync(self, minify: bool) -> str:
+        with redirect_stdout(StringIO()):
+            stats = sync_dir(self.static, self.output, self.record, transform=CssMinifyTransform() if minify else None)
+        return str(stats)
+
+    def read(self, rel_path: str) -> str:
+        with open(os.path.join(self.output, rel_path)) as f:
+            return f.read()
+
+    def test_css_is_minified_once(self):
+        self.assertEqual(self.sync(True), "2 copied, 0 unchanged, 0 deleted")
+        self.assertEqual(self.read("index.css"), MINIFIED_CSS)
+        self.assertEqual(self.read("robots.txt"), "User-agent: *\n")
+        self.assertEqual(self.sync(True), "0 copied, 2 unchanged, 0 deleted")
+
+    def test_turning_minify_off_copies_again(self):
+        self.sync(True)
+        self.assertEqual(self.sync(False), "1 copied, 1 unchanged, 0 deleted")
+        self.assertEqual(self.read("index.css"), CSS)
+
+    def test_precompressed_css_follows_minify(self):
+        # large enough to be precompressed
+        write_if_changed(os.path.join(self.static, "index.css"), (CSS * 20).encode())
+        for minify in (False, True, False, True):
+            with self.subTest(minify=minify):
+                self.sync(minify)
+                precompress_dir(self.output)
+                with gzip.open(os.path.join(self.output, "index.css.gz"), 'rt') as f:
+                    self.assertEqual(f.read(), self.read("index.css"))
+        self.assertEqual(self.sync(True), "0 copied, 2 unchanged, 0 deleted")
+
+
+if __name__ == "__main__":
+    unittest.main()
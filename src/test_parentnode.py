@@ -1,3 +1,5 @@
+from io import StringIO
+import sys
 import unittest
 
 from leafnode import LeafNode
@@ -33,3 +35,31 @@ class TestParentNode(unittest.TestCase):
             parent_node.to_html(),
             "<div><span><b>grandchild</b></span></div>",
         )
+
+    def test_render_into(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode("b", "one")]), ParentNode("li", [])])
+        expected = "<ul><li><b>one</b></li><li></li></ul>"
+
+        parts: list[str] = []
+        node.render_into(parts)
+        self.assertEqual("".join(parts), expected)
+
+        out = StringIO()
+        node.render_into(out)
+        self.assertEqual(out.getvalue(), expected)
+
+    def test_to_html_with_props(self):
+        node = ParentNode("div", [LeafNode(None, "text")], {"class": "note"})
+        self.assertEqual(node.to_html(), '<div class="note">text</div>')
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        node = ParentNode("b", [LeafNode(None, "x")])
+        for _ in range(depth - 1):
+            node = ParentNode("b", [node])
+        self.assertEqual(node.to_html(), "<b>" * depth + "x" + "</b>" * depth)
+
+    def test_invalid_descendant(self):
+        node = ParentNode("div", [ParentNode("p", None)])  # type: ignore
+        with self.assertRaises(ValueError):
+            node.to_html()
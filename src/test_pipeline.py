@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from pipeline import run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def test_results_in_order(self):
+        def read(item: int) -> int:
+            # later items finish reading first
+            time.sleep((10 - item) / 1000)
+            return item * 10
+
+        metrics = []
+        results = list(run_pipeline(range(10), read, lambda item, data: data + 1, lambda item, data: -data, metrics, depth=3))
+        self.assertEqual(results, [(item, -(item * 10 + 1)) for item in range(10)])
+        self.assertEqual([m.name for m in metrics], ["read", "write"])
+        self.assertLessEqual(max(m.peak for m in metrics), 3)
+
+    def test_errors_of_each_stage_are_yielded(self):
+        def fail_on(bad: int):
+            def stage(item: int, *data) -> int:
+                if item == bad:
+                    raise ValueError(item)
+                return item
+            return stage
+
+        results = dict(run_pipeline(range(5), fail_on(1), fail_on(2), fail_on(3), [], depth=2))
+        self.assertEqual(list(results), [0, 1, 2, 3, 4])
+        for item in (1, 2, 3):
+            self.assertIsInstance(results[item], ValueError)
+        self.assertEqual((results[0], results[4]), (0, 4))
+
+    def test_reads_stay_within_depth(self):
+        lock = threading.Lock()
+        unfinished = 0
+        most = 0
+
+        def read(item: int) -> int:
+            nonlocal unfinished, most
+            with lock:
+                unfinished += 1
+                most = max(most, unfinished)
+            return item
+
+        def process(item: int, data: int) -> int:
+            nonlocal unfinished
+            with lock:
+                unfinished -= 1
+            return data
+
+        results = list(run_pipeline(range(50), read, process, lambda item, data: data, [], depth=4))
+        self.assertEqual(len(results), 50)
+        # the queue, plus the item being processed
+        self.assertLessEqual(most, 4 + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
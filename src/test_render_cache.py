@@ -0,0 +1,82 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import tempfile
+import unittest
+
+from generator import generate_page
+from render_cache import RenderCache, RenderedArticle
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.cache = RenderCache(os.path.join(self.root, "cache"))
+
+    def test_round_trip(self):
+        key = self.cache.key(b"# Title\n")
+        self.assertIsNone(self.cache.get(key))
+        article = RenderedArticle("Title", "<div><h1>Title</h1></div>")
+        self.cache.put(key, article)
+        self.assertEqual(self.cache.get(key), article)
+        self.assertNotEqual(self.cache.key(b"# Title\n\n"), key)
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.entry_path(key))), [f"{key}.json"])
+
+    def test_unreadable_entry_is_a_miss(self):
+        key = self.cache.key(b"# Title\n")
+        self.cache.put(key, RenderedArticle("Title", ""))
+        with open(self.cache.entry_path(key), 'w') as f:
+            f.write("{not json")
+        with redirect_stdout(StringIO()):
+            self.assertIsNone(self.cache.get(key))
+
+    def test_trim_evicts_least_recently_used(self):
+        keys = [self.cache.key(str(idx).encode()) for idx in range(4)]
+        for age, key in enumerate(reversed(keys)):
+            self.cache.put(key, RenderedArticle("T", "x" * 100))
+            # older entries first, without relying on the clock's resolution
+            os.utime(self.cache.entry_path(key), ns=(age, age))
+        os.utime(self.cache.entry_path(keys[3]), ns=(10, 10))
+        self.cache.max_bytes = 2 * os.path.getsize(self.cache.entry_path(keys[0]))
+        self.assertEqual(self.cache.trim(), 2)
+        self.assertEqual([self.cache.get(key) is not None for key in keys], [True, False, False, True])
+        self.assertEqual(self.cache.trim(), 0)
+
+    def test_generate_page_reuses_article(self):
+        from_path = os.path.join(self.root, "page.md")
+        template_path = os.path.join(self.root, "template.html")
+        dest_path = os.path.join(self.root, "out", "page.html")
+        with open(from_path, 'w') as f:
+            f.write("# Hello\n\nA [link](/there).\n")
+        with open(template_path, 'w') as f:
+            f.write(TEMPLATE)
+
+        with redirect_stdout(StringIO()):
+            generate_page(from_path, template_path, dest_path, "/base/")
+            with open(dest_path) as f:
+                uncached = f.read()
+            generate_page(from_path, template_path, dest_path, "/base/", self.cache)
+            with open(dest_path) as f:
+                self.assertEqual(f.read(), uncached)
+
+            with open(from_path, 'rb') as f:
+                markdown = f.read()
+            self.assertIsNone(self.cache.get(self.cache.key(markdown)))
+            key = self.cache.key(markdown, "/base/")
+            self.assertEqual(
+                self.cache.get(key),
+                RenderedArticle("Hello", '<div><h1>Hello</h1><p>A <a href="/base/there">link</a>.</p></div>'),
+            )
+            # a hit never parses the markdown again
+            self.cache.put(key, RenderedArticle("Cached", '<a href="/base/cached">'))
+            generate_page(from_path, template_path, dest_path, "/base/", self.cache)
+        with open(dest_path) as f:
+            self.assertEqual(f.read(), '<title>Cached</title><body><a href="/base/cached"></body>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+from array import array
+from contextlib import redirect_stdout
+from io import StringIO
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from file_operations import Change, ChangeReport
+from search import (
+    SEARCH_DIR,
+    delta_decode,
+    delta_encode,
+    markdown_terms,
+    remove_search_index,
+    shard_name,
+    tokenize,
+    update_search_index,
+)
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = tmp.name
+        self.content = os.path.join(root, "content")
+        self.output = os.path.join(root, "docs")
+        self.record = os.path.join(root, ".build", "search.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write("index.md", "# Home\n\nWelcome to the **hobbit** hole.")
+        self.write("blog/tom.md", "# Tom\n\nOld Tom Bombadil, see [the hobbit](/blog/hobbit).")
+
+    def write(self, rel_path: str, text: str) -> None:
+        with open(os.path.join(self.content, rel_path), 'w') as f:
+            f.write(text)
+
+    def update(self) -> ChangeReport:
+        changes = ChangeReport(self.output)
+        with redirect_stdout(StringIO()):
+            update_search_index(self.content, self.output, self.record, "/site/", changes)
+        return changes
+
+    def load(self, name: str):
+        with open(os.path.join(self.output, SEARCH_DIR, name)) as f:
+            return json.load(f)
+
+    def lookup(self, term: str) -> list[str]:
+        docs = self.load("docs.json")
+        if not os.path.exists(os.path.join(self.output, SEARCH_DIR, shard_name(term))):
+            return []
+        shard = self.load(shard_name(term))
+        return [docs[doc_id][0] for doc_id in delta_decode(shard.get(term, []))]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Tom's _hat_, TOM & Númenor 1"), ["tom", "hat", "númenor"])
+        # lowercased "İ" is "i" and a combining dot, which splits the term, as it does in search.js
+        self.assertEqual(tokenize("İstanbul"), ["stanbul"])
+        self.assertEqual(markdown_terms("![a hobbit](/images/hole.png)"), ["hobbit"])
+        self.assertEqual(shard_name("númenor"), "6ec3ba.json")
+        self.assertEqual(delta_encode(array('I', [2, 3, 7])), [2, 1, 4])
+        self.assertEqual(delta_decode([2, 1, 4]), [2, 3, 7])
+
+    @unittest.skipUnless(shutil.which("node"), "needs node to run search.js")
+    def test_search_js_tokenizes_like_python(self):
+        texts = ["Tom's _hat_, TOM & Númenor 1", "İstanbul", "𝒜 𝒜𝒜 x𝒜 ab", "日本 語"]
+        with open(os.path.join(os.path.dirname(__file__), "search.js")) as f:
+            script = (
+                'globalThis.document = {currentScript: {src: "http://localhost/search/search.js"}};\n'
+                + f.read()
+                + f"\nconsole.log(JSON.stringify({json.dumps(texts)}.map(SiteSearch.tokenize)));"
+            )
+        result = subprocess.run(["node", "-"], input=script, capture_output=True, text=True, check=True)
+        # terms are counted in code points: a single astral letter like 𝒜 is too short in both
+        self.assertEqual(json.loads(result.stdout), [tokenize(text) for text in texts])
+
+    def test_lookup(self):
+        self.update()
+        self.assertEqual(self.lookup("hobbit"), ["/site/blog/tom.html", "/site/"])
+        self.assertEqual(self.lookup("bombadil"), ["/site/blog/tom.html"])
+        self.assertEqual(self.lookup("images"), [])
+        self.assertEqual(self.load("docs.json")[0], ["/site/blog/tom.html", "Tom"])
+
+    def test_only_changed_shards_are_rewritten(self):
+        self.update()
+        self.assertEqual(self.update().changes, {})
+        self.write("index.md", "# Home\n\nWelcome to the **hobbit** hole, Tom.")
+        changes = self.update()
+        self.assertEqual(changes.changes, {f"{SEARCH_DIR}/{shard_name('tom')}": Change.CHANGED})
+
+    def test_removed_page_frees_its_id(self):
+        self.update()
+        os.remove(os.path.join(self.content, "blog", "tom.md"))
+        self.update()
+        self.assertEqual(self.load("docs.json"), [None, ["/site/", "Home"]])
+        self.assertFalse(os.path.exists(os.path.join(self.output, SEARCH_DIR, shard_name("bombadil"))))
+        self.write("blog/new.md", "# New\n\nA hobbit")
+        self.update()
+        self.assertEqual(self.lookup("hobbit"), ["/site/blog/new.html", "/site/"])
+
+        with redirect_stdout(StringIO()):
+            remove_search_index(self.output, self.record)
+        self.assertFalse(os.path.exists(os.path.join(self.output, SEARCH_DIR)))
+        self.assertFalse(os.path.exists(self.record))
+
+
+if __name__ == "__main__":
+    unittest.main()
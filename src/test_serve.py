@@ -0,0 +1,53 @@
+import os
+import tempfile
+import threading
+import unittest
+from urllib.request import urlopen
+
+from serve import RELOAD_PATH, RELOAD_SCRIPT, ReloadBroadcaster, start_server
+
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.makedirs(os.path.join(tmp.name, "blog"))
+        with open(os.path.join(tmp.name, "blog", "index.html"), 'w') as f:
+            f.write("<html><body><p>post</p></body></html>")
+        with open(os.path.join(tmp.name, "index.css"), 'w') as f:
+            f.write("body {}")
+        self.broadcaster = ReloadBroadcaster()
+        server = start_server(tmp.name, 0, self.broadcaster, "/site/")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(self, path: str) -> bytes:
+        with urlopen(self.url + path, timeout=5) as response:
+            return response.read()
+
+    def test_pages_get_the_reload_script(self):
+        self.assertEqual(
+            self.get("/site/blog/"),
+            b"<html><body><p>post</p>" + RELOAD_SCRIPT + b"</body></html>",
+        )
+
+    def test_other_files_are_served_unchanged(self):
+        self.assertEqual(self.get("/site/index.css"), b"body {}")
+
+    def test_reload_events(self):
+        with urlopen(self.url + RELOAD_PATH, timeout=5) as events:
+            threading.Timer(0.1, self.broadcaster.publish, [["/site/blog/index.html"]]).start()
+            self.assertEqual(events.readline(), b'data: ["/site/blog/index.html"]\n')
+
+
+class TestReloadBroadcaster(unittest.TestCase):
+    def test_wait(self):
+        broadcaster = ReloadBroadcaster()
+        self.assertEqual(broadcaster.wait(0, 0.01), (0, ()))
+        broadcaster.publish(["/a"])
+        self.assertEqual(broadcaster.wait(0, 0.01), (1, ("/a",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
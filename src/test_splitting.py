@@ -1,5 +1,6 @@
+import random
 import unittest
-from splitting import UNMATCHED_DELIMITER_ERROR_MSG, extract_markdown_images, extract_markdown_links, markdown_to_blocks, split_node_on_delimiter, split_nodes_image, text_to_textnodes
+from splitting import UNMATCHED_DELIMITER_ERROR_MSG, extract_markdown_images, extract_markdown_links, markdown_to_blocks, split_node_on_delimiter, split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes
 from testscenarios import StringConversionScenario, run_subtest_cases_equal
 from textnode import DELIMITERS, TextNode, TextType
 
@@ -93,6 +94,64 @@ class TestSplitting(unittest.TestCase):
             text_to_textnodes(text)
         )
 
+    def test_text_to_textnodes_keeps_spans_literal(self):
+        self.assertEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("[x](y) and *this*", TextType.CODE),
+                TextNode("", TextType.TEXT),
+            ],
+            text_to_textnodes("see `[x](y) and *this*`")
+        )
+        self.assertEqual(
+            [
+                TextNode("", TextType.TEXT),
+                TextNode("snake_case", TextType.BOLD),
+                TextNode("", TextType.TEXT),
+            ],
+            text_to_textnodes("**snake_case**")
+        )
+
+    def test_text_to_textnodes_unmatched_delimiters(self):
+        # the error names the text that was being split when the delimiter didn't match
+        for text, delimiter, split_text in (
+            ("one ** two", "**", "one ** two"),
+            ("**bold** and _open", "_", " and _open"),
+            ("`code` and `open", "`", "`code` and `open"),
+            ("_italic **bold** italic_", "_", "_italic "),  # bold splits first
+            ("`a_b`", "_", "`a_b`"),  # italic splits before code
+            ("_a_ `open _b_", "`", " `open "),
+        ):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError) as cm:
+                    text_to_textnodes(text)
+                self.assertEqual(str(cm.exception), UNMATCHED_DELIMITER_ERROR_MSG.format(delimiter=delimiter, text=split_text))
+
+    def test_text_to_textnodes_matches_split_passes(self):
+        def split_passes(text: str) -> list[TextNode]:
+            text_nodes = [TextNode(text, TextType.TEXT)]
+            for text_type, delimiter in DELIMITERS.items():
+                text_nodes = split_nodes_delimiter(text_nodes, delimiter, text_type)
+            return [
+                split_node
+                for node in text_nodes
+                for split_node in (split_nodes_image(split_nodes_link([node])) if node.text_type == TextType.TEXT else [node])
+            ]
+
+        tokens = ("**", "_", "`", "*", "a", " ", "b c", "[x](y)", "![i](u)")
+        rnd = random.Random(5)
+        for _ in range(2000):
+            text = "".join(rnd.choice(tokens) for _ in range(rnd.randint(0, 12)))
+            with self.subTest(text=text):
+                try:
+                    expected = split_passes(text)
+                except ValueError as e:
+                    with self.assertRaises(ValueError) as cm:
+                        text_to_textnodes(text)
+                    self.assertEqual(str(cm.exception), str(e))
+                else:
+                    self.assertEqual(expected, text_to_textnodes(text))
+
     def test_markdown_to_blocks(self):
         SplitTestScenario = StringConversionScenario[list[str]]
 
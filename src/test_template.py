@@ -0,0 +1,78 @@
+from io import StringIO
+import os
+import tempfile
+import unittest
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+from template import Template, load_template, rewrite_urls
+from textnode import UrlResolver
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile(self):
+        template = Template.compile("<title>{{ Title }}</title><article>{{Content}}</article>")
+        self.assertEqual(template.segments, ("<title>", "</title><article>", "</article>"))
+        self.assertEqual(template.slots, ("Title", "Content"))
+
+    def test_compile_without_placeholders(self):
+        template = Template.compile("static")
+        self.assertEqual(template.segments, ("static",))
+        self.assertEqual(template.slots, ())
+        self.assertEqual(template.render(), "static")
+
+    def test_render(self):
+        template = Template.compile("<h1>{{ Title }}</h1>{{ Content }}<p>{{ Title }}</p>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<b>{{ Title }}</b>"),
+            "<h1>Hi</h1><b>{{ Title }}</b><p>Hi</p>",
+        )
+
+    def test_render_into_streams_nodes(self):
+        template = Template.compile('<title>{{ Title }}</title><a href="/">{{ Content }}</a>', "/site/")
+        content = ParentNode("p", [LeafNode("a", "home", {"href": "/"}), LeafNode(None, ' href="/ ')])
+        out = StringIO()
+        template.render_into(out, Title="Hi", Content=content)
+        # content URLs were resolved when the tree was built; only the template's own are rewritten
+        self.assertEqual(
+            out.getvalue(),
+            '<title>Hi</title><a href="/site/"><p><a href="/">home</a> href="/ </p></a>',
+        )
+        self.assertEqual(template.render(Title="Hi", Content=content), out.getvalue())
+
+    def test_render_missing_value(self):
+        template = Template.compile("{{ Title }}{{ Content }}")
+        with self.assertRaises(ValueError) as cm:
+            template.render(Title="Hi")
+        self.assertEqual(str(cm.exception), "No value for template placeholder(s) Content")
+
+    def test_basepath_is_applied_at_compile_time(self):
+        template = Template.compile('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render(Content='<a href="/raw">'),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/raw">',
+        )
+
+    def test_rewrite_urls(self):
+        self.assertEqual(rewrite_urls('<a href="/x">', UrlResolver('/')), '<a href="/x">')
+        self.assertEqual(rewrite_urls('<a href="/x"><img src="/y">', UrlResolver('/b/')), '<a href="/b/x"><img src="/b/y">')
+        self.assertEqual(rewrite_urls('<a href="https://x">', UrlResolver('/b/')), '<a href="https://x">')
+
+    def test_load_template_is_cached_until_modified(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, 'w') as f:
+                f.write("one {{ Content }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            self.assertIsNot(load_template(path, "/other/"), first)
+
+            with open(path, 'w') as f:
+                f.write("two {{ Content }}")
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.assertEqual(load_template(path).render(Content="!"), "two !")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,9 @@ from dataclasses import dataclass
 from typing import Optional
 import unittest
 
+from assets import StaticAssets
 from leafnode import LeafNode
-from textnode import Tags, TextNode, TextType, text_node_to_html_node
+from textnode import Tags, TextNode, TextType, UrlResolver, resolve_url, text_node_to_html_node
 
 
 class TestTextNode(unittest.TestCase):
@@ -95,6 +96,62 @@ class TestTextNode(unittest.TestCase):
                 self.assertEqual(html_node.value, expected.value)
                 self.assertEqual(html_node.props, expected.props)
 
+    def test_compact_nodes(self):
+        text_node = TextNode("text", TextType.BOLD)
+        with self.assertRaises(AttributeError):
+            text_node.text = "changed"  # type: ignore
+        self.assertFalse(hasattr(text_node, "__dict__"))
+
+        first = text_node_to_html_node(text_node)
+        second = text_node_to_html_node(TextNode("other", TextType.BOLD))
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertIs(first.tag, second.tag)
+        self.assertIs(type(first.tag), str)
+
+    def test_basepath(self):
+        urls = UrlResolver("/site/")
+        link = text_node_to_html_node(TextNode("home", TextType.LINK, "/blog/"), urls)
+        self.assertEqual(link.props, {'href': "/site/blog/"})
+        image = text_node_to_html_node(TextNode("pic", TextType.IMAGE, "/images/a.png"), urls)
+        self.assertEqual(image.props, {"src": "/site/images/a.png", "alt": "pic"})
+        code = text_node_to_html_node(TextNode('href="/x"', TextType.CODE), urls)
+        self.assertEqual(code.value, 'href="/x"')
+
+        self.assertEqual(resolve_url("/a", '/'), "/a")
+        self.assertEqual(resolve_url("https://example.com/a", "/site/"), "https://example.com/a")
+        self.assertEqual(resolve_url("//cdn.example.com/a.js", "/site/"), "//cdn.example.com/a.js")
+        self.assertEqual(resolve_url("relative/a", "/site/"), "relative/a")
+        self.assertEqual(resolve_url("#top", "/site/"), "#top")
+
+    def test_fingerprinted_assets(self):
+        assets = StaticAssets({"/images/a.png": "/images/a.0123456789.png"})
+        urls = UrlResolver("/site/", assets)
+        self.assertEqual(urls.resolve("/images/a.png"), "/site/images/a.0123456789.png")
+        self.assertEqual(urls.resolve("/images/a.png?raw=1"), "/site/images/a.0123456789.png?raw=1")
+        self.assertEqual(urls.resolve("/images/a.png#top"), "/site/images/a.0123456789.png#top")
+        self.assertEqual(urls.resolve("/images/b.png"), "/site/images/b.png")
+        self.assertEqual(urls.resolve("images/a.png"), "images/a.png")
+
+        self.assertEqual(urls, UrlResolver("/site/", StaticAssets(dict(assets.urls))))
+        self.assertEqual(hash(urls), hash(UrlResolver("/site/", StaticAssets(dict(assets.urls)))))
+        self.assertNotEqual(urls, UrlResolver("/site/"))
+        self.assertNotEqual(urls, UrlResolver("/", assets))
+
+    def test_image_sizes(self):
+        urls = UrlResolver("/site/", StaticAssets(image_sizes={"/images/a.png": (640, 480)}))
+        image = text_node_to_html_node(TextNode("pic", TextType.IMAGE, "/images/a.png?v=2"), urls)
+        self.assertEqual(image.props, {
+            "src": "/site/images/a.png?v=2",
+            "alt": "pic",
+            "width": "640",
+            "height": "480",
+            "loading": "lazy",
+            "decoding": "async",
+        })
+        remote = text_node_to_html_node(TextNode("pic", TextType.IMAGE, "https://example.com/images/a.png"), urls)
+        self.assertEqual(remote.props, {"src": "https://example.com/images/a.png", "alt": "pic"})
+        self.assertNotEqual(urls, UrlResolver("/site/", StaticAssets()))
+
     def test_unknown_text_type_raises_exception(self):
         invalid_node = TextNode("I am invalid!", 'haha') # type: ignore
         with self.assertRaises(ValueError) as cm:
@@ -0,0 +1,87 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import json
+import os
+import tempfile
+import unittest
+
+from generator import generate_page, generate_pages
+import tracing
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+MARKDOWN = "# Hello\n\nSome **bold** text and a [link](/somewhere).\n\n- one\n- two\n"
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(tracing.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.template_path = os.path.join(self.root, "template.html")
+        with open(self.template_path, 'w') as f:
+            f.write(TEMPLATE)
+        self.pages: list[tuple[str, str]] = []
+        for name in ("a", "b", "c"):
+            from_path = os.path.join(self.root, f"{name}.md")
+            with open(from_path, 'w') as f:
+                f.write(MARKDOWN)
+            self.pages.append((from_path, os.path.join(self.root, "out", f"{name}.html")))
+
+    def test_span_is_free_when_off(self):
+        self.assertIs(tracing.span("anything", path="x"), tracing.NO_SPAN)
+        self.assertIsNone(tracing.active())
+
+    def test_nested_spans(self):
+        tracer = tracing.start()
+        with tracing.span("outer"):
+            with tracing.span("inner", tracing.PAGE_CATEGORY, path="p"):
+                pass
+        self.assertEqual([event["name"] for event in tracer.events], ["inner", "outer"])
+        inner, outer = tracer.events
+        self.assertEqual(inner["args"], {"path": "p"})
+        self.assertNotIn("args", outer)
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        self.assertGreaterEqual(outer["ts"] + outer["dur"], inner["ts"] + inner["dur"])
+        self.assertIs(tracing.stop(), tracer)
+        self.assertIs(tracing.span("after"), tracing.NO_SPAN)
+
+    def test_traced_page_is_identical(self):
+        from_path, dest_path = self.pages[0]
+        for basepath in ('/', "/base/"):
+            with self.subTest(basepath=basepath), redirect_stdout(StringIO()):
+                generate_page(from_path, self.template_path, dest_path, basepath)
+                with open(dest_path) as f:
+                    expected = f.read()
+                tracer = tracing.start()
+                generate_page(from_path, self.template_path, dest_path, basepath)
+                tracing.stop()
+                with open(dest_path) as f:
+                    self.assertEqual(f.read(), expected)
+                # lines are read as blocks are parsed, and the tree renders straight into the template;
+                # the last block parse finds the end of the file
+                self.assertEqual(
+                    [event["name"] for event in tracer.events],
+                    ["block parse", "inline parse"] * 3 + ["block parse", "template", "write", "page"],
+                )
+
+    def test_pool_workers_send_events(self):
+        tracer = tracing.start()
+        with redirect_stdout(StringIO()):
+            errors = generate_pages(self.pages, self.template_path, '/', jobs=2)
+        self.assertEqual(errors, [None, None, None])
+        pages = [event["args"]["path"] for event in tracer.events if event["cat"] == tracing.PAGE_CATEGORY]
+        self.assertEqual(sorted(pages), [from_path for from_path, _ in self.pages])
+
+        trace_path = os.path.join(self.root, "trace.json")
+        tracer.write(trace_path)
+        with open(trace_path) as f:
+            self.assertEqual(len(json.load(f)["traceEvents"]), len(tracer.events))
+        summary = StringIO()
+        with redirect_stdout(summary):
+            tracer.print_summary(count=2)
+        self.assertIn("Slowest 2 of 3 pages:", summary.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
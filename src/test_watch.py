@@ -0,0 +1,153 @@
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import tempfile
+import threading
+import unittest
+
+from images import ImageSizeCache
+from manifest import BuildManifest
+from test_images import png
+from watch import RELOAD_ALL, InotifyWatcher, PollingWatcher, Rebuilder
+
+
+class TestRebuilder(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.output = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        manifest = BuildManifest.load(os.path.join(root, ".build", "manifest.json"))
+        self.rebuilder = Rebuilder(
+            self.content, self.static, self.template, self.output,
+            "/site/", manifest, os.path.join(root, ".build", "static.json"),
+        )
+        self.rebuild([self.template, os.path.join(self.static, "index.css")])
+
+    @staticmethod
+    def write(path: str, text: str) -> None:
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def rebuild(self, changed: list[str]) -> list[str]:
+        with redirect_stdout(StringIO()):
+            return self.rebuilder.rebuild(changed)
+
+    def test_changed_page_is_the_only_one_rebuilt(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post\n\nedited")
+        self.assertEqual(self.rebuild([post]), ["/site/blog/post.html"])
+        with open(os.path.join(self.output, "blog", "post.html")) as f:
+            self.assertIn("edited", f.read())
+
+    def test_unchanged_page_is_skipped(self):
+        self.assertEqual(self.rebuild([os.path.join(self.content, "index.md")]), [])
+
+    def test_deleted_page_is_removed(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        os.remove(post)
+        self.assertEqual(self.rebuild([post]), ["/site/blog/post.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "blog")))
+
+    def test_template_change_rebuilds_everything(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.rebuild([self.template]), [RELOAD_ALL])
+        with open(os.path.join(self.output, "index.html")) as f:
+            self.assertTrue(f.read().startswith("<h1>Home</h1>"))
+
+    def test_static_change_is_synced(self):
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { color: red }")
+        self.assertEqual(self.rebuild([css]), [RELOAD_ALL])
+        with open(os.path.join(self.output, "index.css")) as f:
+            self.assertEqual(f.read(), "body { color: red }")
+
+    def test_graph_links_static_outputs_to_their_sources(self):
+        css = os.path.join(self.static, "index.css")
+        self.assertEqual(self.rebuilder.graph().affected([css]), {os.path.join(self.output, "index.css")})
+        font = os.path.join(self.static, "fonts", "a.woff")
+        os.makedirs(os.path.dirname(font))
+        self.write(font, "font")
+        self.rebuild([font])
+        self.assertEqual(self.rebuilder.graph().affected([font]), {os.path.join(self.output, "fonts", "a.woff")})
+
+    def test_image_change_rebuilds_only_pages_showing_it(self):
+        image = os.path.join(self.static, "images", "a.png")
+        os.makedirs(os.path.dirname(image))
+        with open(image, 'wb') as f:
+            f.write(png(640, 480))
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post\n\n![a](/images/a.png)")
+        self.rebuilder.image_cache = ImageSizeCache(os.path.join(self.static, os.pardir, ".build", "images.json"))
+        self.rebuild([image, post])
+
+        with open(image, 'wb') as f:
+            f.write(png(320, 240))
+        self.assertEqual(self.rebuild([image]), [RELOAD_ALL, "/site/blog/post.html"])
+        with open(os.path.join(self.output, "blog", "post.html")) as f:
+            self.assertIn('width="320" height="240"', f.read())
+
+    def test_broken_page_raises_but_is_not_recorded(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "no title")
+        with self.assertRaises(RuntimeError):
+            self.rebuild([post])
+        self.write(post, "# Fixed")
+        self.assertEqual(self.rebuild([post]), ["/site/blog/post.html"])
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = os.path.join(tmp.name, "content")
+        os.makedirs(self.root)
+        self.page = os.path.join(self.root, "page.md")
+        self.template = os.path.join(tmp.name, "template.html")
+        self.sibling = os.path.join(tmp.name, "unrelated.txt")
+        for path in (self.page, self.template):
+            with open(path, 'w') as f:
+                f.write("one")
+
+    def change_soon(self, path: str) -> None:
+        def change():
+            with open(self.sibling, 'w') as f:
+                f.write("ignored")
+            with open(path, 'w') as f:
+                f.write("changed")
+        timer = threading.Timer(0.1, change)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_polling_watcher(self):
+        watcher = PollingWatcher([self.root, self.template], interval=0.02)
+        self.change_soon(self.page)
+        self.assertEqual(watcher.wait(), {self.page})
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.root, self.template])
+        except (OSError, AttributeError, TypeError):
+            self.skipTest("inotify is not available")
+        self.addCleanup(watcher.close)
+        self.change_soon(self.template)
+        self.assertEqual(watcher.wait(), {self.template})
+
+        new_dir = os.path.join(self.root, "new")
+        os.makedirs(new_dir)
+        with open(os.path.join(new_dir, "page.md"), 'w') as f:
+            f.write("one")
+        self.assertEqual(watcher.wait(), {os.path.join(new_dir, "page.md")})
+
+
+if __name__ == "__main__":
+    unittest.main()
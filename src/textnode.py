@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 from enum import StrEnum
+import sys
 from typing import Optional
 
+from assets import StaticAssets
 from leafnode import LeafNode
 
 class TextType(StrEnum):
@@ -20,6 +22,9 @@ class Tags(StrEnum):
     LINK = "a"
     IMAGE = "img"
 
+# plain, interned tag names so every leaf shares one string instead of converting the enum member again
+TAG_NAMES = {tag: sys.intern(str(tag)) for tag in Tags}
+
 DELIMITERS = {
     TextType.BOLD: "**",
     TextType.ITALIC: "_",
@@ -27,7 +32,7 @@ DELIMITERS = {
 }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TextNode:
     """Representation of inline text.
     """
@@ -45,19 +50,77 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
 
 
-def text_node_to_html_node(text_node: TextNode) -> LeafNode:
+def resolve_url(url: str, basepath: str) -> str:
+    """Point a root-relative URL at the site's basepath; other URLs stay as they are."""
+    if basepath == '/' or not url.startswith('/') or url.startswith('//'):
+        return url
+    return basepath + url[1:]
+
+
+class UrlResolver:
+    """Where the root-relative URLs in content are served from: below the basepath and,
+    for fingerprinted assets, under their content-hashed names.
+    Equal resolvers produce equal HTML, so they key the inline memo and the render cache."""
+
+    __slots__ = ("basepath", "assets", "key", "_hash")
+
+    def __init__(self, basepath: str = '/', assets: Optional[StaticAssets] = None):
+        self.basepath = basepath
+        self.assets = assets
+        self.key = basepath if assets is None else f"{basepath}\0{assets.digest}"
+        self._hash = hash(self.key)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, UrlResolver) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"UrlResolver({self.basepath!r}, {self.assets!r})"
+
+    def resolve(self, url: str) -> str:
+        if self.assets is not None and url.startswith('/'):
+            path, sep, rest = split_query(url)
+            url = self.assets.urls.get(path, path) + sep + rest
+        return resolve_url(url, self.basepath)
+
+    def image_size(self, url: str) -> Optional[tuple[int, int]]:
+        """Width and height of the static image a root-relative URL points at, if known."""
+        if self.assets is None or not url.startswith('/'):
+            return None
+        return self.assets.image_sizes.get(split_query(url)[0])
+
+
+def split_query(url: str) -> tuple[str, str, str]:
+    """Split a URL into its path, the separator and the query string or fragment after it."""
+    return url.partition('?') if '?' in url else url.partition('#')
+
+
+ROOT_URLS = UrlResolver()
+
+
+def text_node_to_html_node(text_node: TextNode, urls: UrlResolver = ROOT_URLS) -> LeafNode:
     match text_node.text_type:
         case TextType.TEXT:
             return LeafNode.text_only(text_node.text)
         case TextType.BOLD:
-            return LeafNode(str(Tags.BOLD), text_node.text)
+            return LeafNode(TAG_NAMES[Tags.BOLD], text_node.text)
         case TextType.ITALIC:
-            return LeafNode(str(Tags.ITALIC), text_node.text)
+            return LeafNode(TAG_NAMES[Tags.ITALIC], text_node.text)
         case TextType.CODE:
-            return LeafNode(str(Tags.CODE),text_node.text)
+            return LeafNode(TAG_NAMES[Tags.CODE],text_node.text)
         case TextType.LINK:
-            return LeafNode(str(Tags.LINK), text_node.text, {'href': text_node.url or ''})
+            return LeafNode(TAG_NAMES[Tags.LINK], text_node.text, {'href': urls.resolve(text_node.url or '')})
         case TextType.IMAGE:
-            return LeafNode(str(Tags.IMAGE), '', {"src": text_node.url or '', "alt": text_node.text or ''})
+            url = text_node.url or ''
+            props = {"src": urls.resolve(url), "alt": text_node.text or ''}
+            size = urls.image_size(url)
+            if size is not None:
+                # reserves the image's box before it loads, so the page doesn't shift around it
+                props["width"], props["height"] = str(size[0]), str(size[1])
+                props["loading"] = "lazy"
+                props["decoding"] = "async"
+            return LeafNode(TAG_NAMES[Tags.IMAGE], '', props)
         case _:
             raise ValueError(f"Unkown text type: {text_node.text_type}")
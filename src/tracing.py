@@ -0,0 +1,117 @@
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import threading
+import time
+from typing import Any, ContextManager, Iterator, Optional
+
+
+PAGE_CATEGORY = "page"
+STAGE_CATEGORY = "stage"
+QUEUE_CATEGORY = "queue"
+
+# returned by span() while tracing is off, so an untraced build only pays for a function call
+NO_SPAN = nullcontext()
+
+
+class Tracer:
+    """Collects complete ("X") events in Chrome trace-event format, viewable in chrome://tracing or Perfetto."""
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+
+    @contextmanager
+    def span(self, name: str, category: str, args: dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                # microseconds; perf_counter is the system-wide monotonic clock, so pool workers line up
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+            }
+            if args:
+                event["args"] = args
+            self.events.append(event)
+
+    def counter(self, name: str, category: str, values: dict[str, float]) -> None:
+        """Record a counter ("C") event, drawn as a graph of each value over time."""
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "C",
+            "ts": time.perf_counter_ns() / 1000,
+            "pid": os.getpid(),
+            "args": values,
+        })
+
+    def drain(self) -> list[dict[str, Any]]:
+        """Hand over the events recorded so far, e.g. from a pool worker to the parent."""
+        events, self.events = self.events, []
+        return events
+
+    def write(self, path: str) -> None:
+        trace_dir = os.path.dirname(path)
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def print_summary(self, count: int = 10) -> None:
+        pages = sorted(
+            (event for event in self.events if event["cat"] == PAGE_CATEGORY),
+            key=lambda event: event["dur"],
+            reverse=True,
+        )
+        stage_totals: dict[str, float] = defaultdict(float)
+        for event in self.events:
+            if event["cat"] == STAGE_CATEGORY:
+                stage_totals[event["name"]] += event["dur"]
+
+        print("Time per stage (summed over pages and workers):")
+        for name, total in sorted(stage_totals.items(), key=lambda item: item[1], reverse=True):
+            print(f"  {total / 1000:10.1f} ms  {name}")
+        if pages:
+            print(f"Slowest {min(count, len(pages))} of {len(pages)} pages:")
+            for event in pages[:count]:
+                print(f"  {event['dur'] / 1000:10.1f} ms  {event['args']['path']}")
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop() -> Optional[Tracer]:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, category: str = STAGE_CATEGORY, **args: Any) -> ContextManager[None]:
+    """Time the enclosed block as a span while tracing is on."""
+    if _tracer is None:
+        return NO_SPAN
+    return _tracer.span(name, category, args)
+
+
+def counter(name: str, category: str = QUEUE_CATEGORY, **values: float) -> None:
+    """Record the current values of a counter while tracing is on."""
+    if _tracer is not None:
+        _tracer.counter(name, category, values)
@@ -0,0 +1,327 @@
+import ctypes
+import ctypes.util
+from dataclasses import dataclass, field
+import os
+import select
+import struct
+import time
+from typing import Callable, Iterable, Optional, Protocol, Union
+
+from assets import DigestCache, StaticAssets, collect_static_assets
+from compression import precompress_dir
+from depgraph import DependencyGraph, load_static_files, page_inputs
+from file_operations import sync_dir, walk_files, walk_tree
+from generator import (
+    MD_EXT,
+    PageGenerationError,
+    generate_page,
+    generate_pages_recursive,
+    page_dest_path,
+    page_record,
+    template_inputs,
+)
+from images import ImageSizeCache
+from manifest import BuildManifest
+from minify import CssMinifyTransform
+from render_cache import RenderCache
+from search import update_search_index
+
+
+POLL_INTERVAL_SECONDS = 0.25
+# editors often save in several steps; wait this long for the rest of them
+DEBOUNCE_SECONDS = 0.05
+
+# changed output URL that means "every page"
+RELOAD_ALL = "*"
+
+
+class Watcher(Protocol):
+    def wait(self) -> set[str]:
+        """Block until something changes and return the changed paths."""
+        ...
+
+
+def snapshot(paths: Iterable[str]) -> dict[str, tuple[int, int]]:
+    """(mtime, size) of every file in or below paths."""
+    state: dict[str, tuple[int, int]] = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        if not os.path.isdir(path):
+            continue
+        for _, entry in walk_files(path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+class PollingWatcher:
+    def __init__(self, paths: Iterable[str], interval: float = POLL_INTERVAL_SECONDS):
+        self.paths = list(paths)
+        self.interval = interval
+        self.state = snapshot(self.paths)
+
+    def wait(self) -> set[str]:
+        while True:
+            time.sleep(self.interval)
+            state = snapshot(self.paths)
+            changed = {
+                path for path in state.keys() | self.state.keys()
+                if state.get(path) != self.state.get(path)
+            }
+            self.state = state
+            if changed:
+                return changed
+
+
+class InotifyWatcher:
+    """Linux inotify through libc, so changes are seen as soon as they are written."""
+
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, paths: Iterable[str]):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = list(paths)
+        self._dirs: dict[int, str] = {}
+        # single files are watched through their directory; events for siblings are ignored
+        self._files: set[str] = set()
+        self._roots: list[str] = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                self._roots.append(path)
+                self._watch_tree(path)
+            else:
+                self._files.add(os.path.normpath(path))
+                self._watch_dir(os.path.dirname(path) or os.curdir)
+
+    def _watch_dir(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = path
+
+    def _watch_tree(self, root: str) -> list[str]:
+        """Watch root and its subdirectories, returning the files already in them."""
+        files: list[str] = []
+        if not os.path.isdir(root):
+            # already gone again
+            return files
+        self._watch_dir(root)
+        for _, entry in walk_tree(root):
+            if entry.is_dir():
+                self._watch_dir(entry.path)
+            else:
+                files.append(entry.path)
+        return files
+
+    def _is_watched(self, path: str) -> bool:
+        return os.path.normpath(path) in self._files or any(is_below(path, root) for root in self._roots)
+
+    def _read_events(self) -> set[str]:
+        data = os.read(self.fd, 1 << 16)
+        changed: set[str] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost: report the watched roots so everything is rebuilt
+                changed.update(self.paths)
+                continue
+            if wd not in self._dirs:
+                continue
+            path = os.path.join(self._dirs[wd], name)
+            if not self._is_watched(path):
+                continue
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    changed.update(self._watch_tree(path))
+                continue
+            changed.add(path)
+        return changed
+
+    def wait(self) -> set[str]:
+        while True:
+            changed = self._read_events()
+            while select.select([self.fd], [], [], DEBOUNCE_SECONDS)[0]:
+                changed |= self._read_events()
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(paths: Iterable[str]) -> Union[InotifyWatcher, PollingWatcher]:
+    """Use inotify where the platform has it, polling otherwise."""
+    paths = list(paths)
+    try:
+        return InotifyWatcher(paths)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(paths)
+
+
+@dataclass
+class Rebuilder:
+    """Brings the output up to date with a set of changed source paths, touching as little as possible."""
+    dir_path_content: str
+    dir_path_static: str
+    template_path: str
+    dir_path_output: str
+    basepath: str
+    manifest: BuildManifest
+    static_record_path: str
+    jobs: int = 1
+    render_cache: Optional[RenderCache] = None
+    # with fingerprinting on, where fingerprint_assets keeps its record
+    fingerprint_record_path: Optional[str] = None
+    # with both set, static changes refresh the assets pages link to and the image sizes they declare
+    image_cache: Optional[ImageSizeCache] = None
+    assets: Optional[StaticAssets] = None
+    precompress: bool = False
+    # with --search, where update_search_index keeps its record
+    search_record_path: Optional[str] = None
+    minify: bool = False
+    # with fingerprinting on, the hashes of the static files, so only changed ones are hashed again
+    digest_cache: Optional[DigestCache] = None
+    # which pages use which inputs, built from the manifest when first needed
+    _graph: Optional[DependencyGraph] = field(default=None, init=False, repr=False)
+
+    def graph(self) -> DependencyGraph:
+        if self._graph is None:
+            self._graph = DependencyGraph.from_build(
+                self.manifest, self.template_path, self.dir_path_static, self.dir_path_output,
+                load_static_files(self.static_record_path),
+            )
+        return self._graph
+
+    def output_url(self, dest_path: str) -> str:
+        return self.basepath + os.path.relpath(dest_path, self.dir_path_output).replace(os.sep, "/")
+
+    def rebuild(self, changed: Iterable[str]) -> list[str]:
+        """Rebuild what the changed paths affect; returns the URLs of changed outputs, or [RELOAD_ALL]."""
+        changed = set(changed)
+        urls: list[str] = []
+        if any(is_same_path(path, self.dir_path_static) or is_below(path, self.dir_path_static) for path in changed):
+            transform = CssMinifyTransform() if self.minify else None
+            stats = sync_dir(self.dir_path_static, self.dir_path_output, self.static_record_path, transform=transform)
+            print(f"Static files: {stats}.")
+            if stats.copied or stats.deleted:
+                urls.append(RELOAD_ALL)
+                # the synced files may have come or gone
+                self._graph = None
+            if self.image_cache is not None:
+                assets = collect_static_assets(
+                    self.dir_path_static, self.dir_path_output, self.image_cache, self.fingerprint_record_path,
+                    digest_cache=self.digest_cache, transform=transform,
+                )
+                if assets != self.assets:
+                    # only the pages referencing a changed asset link to new hashed names or declare new sizes
+                    self.assets = assets
+                    affected = self.graph().affected(changed)
+                    changed.update(
+                        self.manifest.pages[dest_path].source for dest_path in affected if dest_path in self.manifest.pages
+                    )
+
+        if any(is_same_path(path, self.template_path) or is_same_path(path, self.dir_path_content) for path in changed):
+            # every page depends on the template; the manifest still skips what didn't change
+            generate_pages_recursive(
+                self.dir_path_content, self.template_path, self.dir_path_output, self.basepath,
+                self.manifest, self.jobs, self.render_cache, assets=self.assets, minify=self.minify,
+            )
+            self._graph = None
+            self.update_derived_outputs()
+            return [RELOAD_ALL]
+
+        # spell paths the way discover_pages does, so they match the manifest's
+        pages = sorted(
+            os.path.join(self.dir_path_content, os.path.relpath(path, self.dir_path_content))
+            for path in changed
+            if is_below(path, self.dir_path_content) and os.path.splitext(path)[1].lower() == MD_EXT
+        )
+        failures: list[tuple[str, BaseException]] = []
+        template_hash, template_urls = template_inputs(self.template_path, self.minify) if pages else ("", [])
+        for from_path in pages:
+            dest_path = page_dest_path(from_path, self.dir_path_content, self.dir_path_output)
+            if not os.path.isfile(from_path):
+                self.manifest.remove(dest_path, self.dir_path_output)
+                self.graph().remove(dest_path)
+                urls.append(self.output_url(dest_path))
+                continue
+            record = page_record(from_path, template_hash, template_urls, self.basepath, self.assets)
+            if self.manifest.is_fresh(dest_path, record):
+                continue
+            try:
+                change = generate_page(
+                    from_path, self.template_path, dest_path, self.basepath,
+                    self.render_cache, self.assets, self.minify,
+                )
+            except Exception as e:
+                failures.append((from_path, e))
+                continue
+            self.manifest.record(dest_path, record)
+            self.graph().add(dest_path, page_inputs(record, self.template_path, self.dir_path_static))
+            if change is not None:
+                urls.append(self.output_url(dest_path))
+        if pages:
+            self.manifest.save()
+        if urls:
+            self.update_derived_outputs()
+        if failures:
+            raise PageGenerationError(failures) from failures[0][1]
+        return urls
+
+    def update_derived_outputs(self) -> None:
+        """Refresh the outputs made from other outputs or from every page, after pages changed."""
+        if self.search_record_path is not None:
+            update_search_index(self.dir_path_content, self.dir_path_output, self.search_record_path, self.basepath)
+        if self.precompress:
+            precompress_dir(self.dir_path_output, self.jobs)
+
+
+def is_same_path(path: str, other: str) -> bool:
+    return os.path.normpath(path) == os.path.normpath(other)
+
+
+def is_below(path: str, root: str) -> bool:
+    return os.path.normpath(path).startswith(os.path.normpath(root) + os.sep)
+
+
+def watch(
+        rebuilder: Rebuilder,
+        watcher: Watcher,
+        on_rebuilt: Optional[Callable[[list[str]], None]] = None,
+    ) -> None:
+    """Rebuild on every change until interrupted."""
+    while True:
+        changed = watcher.wait()
+        start = time.perf_counter()
+        try:
+            urls = rebuilder.rebuild(changed)
+        except Exception as e:
+            # keep watching: the next save usually fixes it
+            print(f"Rebuild failed: {e}")
+            continue
+        print(f"Rebuilt {len(urls)} output(s) in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        if urls and on_rebuilt is not None:
+            on_rebuilt(urls)